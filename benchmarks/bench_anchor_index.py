@@ -0,0 +1,63 @@
+"""Compare :class:`AnchorIndex` queries with a linear scan over all anchors.
+
+Run from the repository root::
+
+    python benchmarks/bench_anchor_index.py --count 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from formatics.form import Anchor, AnchorIndex  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1_000_000, help="anchors to index")
+    parser.add_argument("--queries", type=int, default=10_000, help="query points for the index")
+    parser.add_argument("--baseline-queries", type=int, default=20, help="query points for the linear scan")
+    parser.add_argument("--k", type=int, default=8, help="neighbours per k-nearest query")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    extent = 1000.0
+    anchors = [
+        Anchor(name=f"a{i}", position=(rng.uniform(0, extent), rng.uniform(0, extent), rng.uniform(0, extent)))
+        for i in range(args.count)
+    ]
+    points = [(rng.uniform(0, extent), rng.uniform(0, extent), rng.uniform(0, extent)) for _ in range(args.queries)]
+
+    start = time.perf_counter()
+    index = AnchorIndex.build(anchors)
+    print(f"build:          {time.perf_counter() - start:8.2f} s  ({index!r})")
+
+    start = time.perf_counter()
+    index.nearest_many(points)
+    per_query = (time.perf_counter() - start) / len(points)
+    print(f"nearest:        {per_query * 1e6:8.1f} us/query")
+
+    start = time.perf_counter()
+    index.nearest_k_many(points, args.k)
+    print(f"nearest_k({args.k}):   {(time.perf_counter() - start) / len(points) * 1e6:8.1f} us/query")
+
+    radius = index.cell_size * 2
+    start = time.perf_counter()
+    index.within_many(points, radius)
+    print(f"within({radius:.1f}):   {(time.perf_counter() - start) / len(points) * 1e6:8.1f} us/query")
+
+    start = time.perf_counter()
+    for point in points[: args.baseline_queries]:
+        min(anchors, key=lambda anchor: math.dist(anchor.position, point))
+    linear = (time.perf_counter() - start) / args.baseline_queries
+    print(f"linear nearest: {linear * 1e6:8.1f} us/query  ({linear / per_query:.0f}x slower)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Compare memory of a list of :class:`Element` objects with an :class:`ElementTable`.
+
+Run from the repository root::
+
+    python benchmarks/bench_element_table.py --count 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from formatics.form import Element, ElementTable  # noqa: E402
+
+UNITS = ("m", "cm", "mm")
+
+
+def make_elements(count: int):
+    for i in range(count):
+        metadata = {"unit": UNITS[i % 3], "weight": i * 0.25, "batch": i // 1000}
+        if i % 10 == 0:
+            metadata["flag"] = True
+        yield Element(float(i), metadata)
+
+
+def traced(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1_000_000, help="elements to store")
+    args = parser.parse_args()
+
+    elements, list_bytes, list_time = traced(lambda: list(make_elements(args.count)))
+    del elements
+    table, table_bytes, table_time = traced(lambda: ElementTable(make_elements(args.count)))
+
+    print(f"list[Element]: {list_bytes / args.count:8.1f} bytes/element  (built in {list_time:.2f} s)")
+    print(f"ElementTable:  {table_bytes / args.count:8.1f} bytes/element  (built in {table_time:.2f} s)")
+    print(f"reduction:     {list_bytes / table_bytes:8.1f}x")
+
+    start = time.perf_counter()
+    selected = table.where(lambda weight: weight < args.count * 0.025, key="weight")
+    print(f"where(weight): {time.perf_counter() - start:8.2f} s for {len(selected)} rows")
+
+
+if __name__ == "__main__":
+    main()
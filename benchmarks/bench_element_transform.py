@@ -0,0 +1,67 @@
+"""Compare chained :meth:`Element.transform` styles in a hot loop.
+
+Run from the repository root::
+
+    python benchmarks/bench_element_transform.py --count 200000 --depth 10
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from formatics.form import Element, TransformPipeline  # noqa: E402
+
+METADATA = {"unit": "m", "source": "sensor-7", "scale": 1.0, "tags": ("raw",)}
+
+
+def step(value: int) -> int:
+    return value + 1
+
+
+def copying_chain(element: Element, depth: int) -> Element:
+    # Previous behaviour: a fresh metadata dict and element per step.
+    for _ in range(depth):
+        element = Element(value=step(element.value), metadata=element.metadata.copy())
+    return element
+
+
+def cow_chain(element: Element, depth: int) -> Element:
+    for _ in range(depth):
+        element = element.transform(step)
+    return element
+
+
+def lazy_chain(element: Element, depth: int) -> Element:
+    lazy = element.lazy()
+    for _ in range(depth):
+        lazy = lazy.transform(step)
+    return lazy.materialize()
+
+
+def measure(name: str, run, count: int) -> None:
+    elements = [Element(i, dict(METADATA)) for i in range(count)]
+    start = time.perf_counter()
+    results = [run(element) for element in elements]
+    elapsed = time.perf_counter() - start
+    print(f"{name:10s} {count / elapsed:12,.0f} chains/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=200_000, help="elements to transform")
+    parser.add_argument("--depth", type=int, default=10, help="transforms per chain")
+    args = parser.parse_args()
+
+    pipeline = TransformPipeline((step,) * args.depth)
+    measure("copying", lambda e: copying_chain(e, args.depth), args.count)
+    measure("transform", lambda e: cow_chain(e, args.depth), args.count)
+    measure("lazy", lambda e: lazy_chain(e, args.depth), args.count)
+    measure("pipeline", pipeline, args.count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Measure the memory cost of tracking many :class:`FileState` objects.
+
+Run from the repository root::
+
+    python benchmarks/bench_filestate_memory.py --count 200000
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from formatics.filestate import FileState  # noqa: E402
+
+
+def measure(count: int) -> float:
+    """Return the bytes allocated per FileState, excluding the path objects themselves."""
+    paths = [Path(f"/srv/deploy/pkg{i % 100}/module{i}.py") for i in range(count)]
+    for path in paths:
+        # Warm the cached string form so it is not charged to FileState.
+        str(path)
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    states = [FileState(path) for path in paths]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del states
+    return (after - before) / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=200_000, help="number of FileState objects to create")
+    args = parser.parse_args()
+
+    per_instance = measure(args.count)
+    print(f"FileState x {args.count:,}: {per_instance:.1f} bytes/instance")
+
+
+if __name__ == "__main__":
+    main()
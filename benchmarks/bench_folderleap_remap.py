@@ -0,0 +1,64 @@
+"""Compare bulk :meth:`FolderLeap.remap` with per-call :meth:`FolderLeap.apply`.
+
+Run from the repository root::
+
+    python benchmarks/bench_folderleap_remap.py --count 5000000
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Iterator
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from formatics.folderleap import FolderLeap  # noqa: E402
+
+SOURCE = "/srv/deploy/release-41"
+TARGET = "/srv/deploy/release-42"
+
+
+def generate_paths(count: int) -> Iterator[str]:
+    for i in range(count):
+        yield f"{SOURCE}/pkg{i % 1000}/sub{i % 37}/module{i}.py"
+
+
+def bench_remap(leap: FolderLeap, count: int) -> float:
+    start = time.perf_counter()
+    # Drain the generator without keeping results, as a streaming consumer would.
+    deque(leap.remap(generate_paths(count)), maxlen=0)
+    return count / (time.perf_counter() - start)
+
+
+def bench_apply(leap: FolderLeap, count: int) -> float:
+    start = time.perf_counter()
+    for path in generate_paths(count):
+        leap.apply(Path(path))
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=5_000_000, help="paths to remap in bulk")
+    parser.add_argument(
+        "--baseline-count",
+        type=int,
+        default=500_000,
+        help="paths to remap with the per-call apply() baseline",
+    )
+    args = parser.parse_args()
+
+    leap = FolderLeap(Path(SOURCE), Path(TARGET))
+    bulk = bench_remap(leap, args.count)
+    per_call = bench_apply(leap, args.baseline_count)
+
+    print(f"remap():  {args.count:>10,} paths  {bulk:>12,.0f} paths/s")
+    print(f"apply():  {args.baseline_count:>10,} paths  {per_call:>12,.0f} paths/s")
+    print(f"speedup:  {bulk / per_call:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
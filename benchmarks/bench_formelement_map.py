@@ -0,0 +1,79 @@
+"""Compare :meth:`FormElement.map` paths with per-element transforms.
+
+Run from the repository root::
+
+    python benchmarks/bench_formelement_map.py --count 2000000 --workers 4
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import math
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from formatics.form import Element, FormElement  # noqa: E402
+from formatics.form import elements as elements_module  # noqa: E402
+
+
+def poly(value):
+    return ((value * 0.5 - 3.0) * value + 1.25) * value / 7.0 + (value * value) ** 0.5
+
+
+def heavy(value):
+    # CPU-bound pure function, worth shipping to worker processes.
+    total = 0.0
+    for i in range(1, 200):
+        total += math.sin(value / i)
+    return total
+
+
+def heavy_array(values):
+    # The same computation written for whole NumPy arrays.
+    np = elements_module.np
+    total = np.zeros_like(values, dtype=float)
+    for i in range(1, 200):
+        total += np.sin(values / i)
+    return total
+
+
+def timed(label: str, count: int, run) -> None:
+    # Keep collector pauses over millions of new elements out of the comparison.
+    gc.disable()
+    start = time.perf_counter()
+    run()
+    gc.enable()
+    elapsed = time.perf_counter() - start
+    print(f"{label:28s} {elapsed:7.2f} s  {count / elapsed:14,.0f} values/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=2_000_000, help="elements in the form")
+    parser.add_argument("--heavy-count", type=int, default=100_000, help="elements for the CPU-heavy comparison")
+    parser.add_argument("--workers", type=int, default=4, help="processes for the pool path")
+    args = parser.parse_args()
+
+    form = FormElement([Element(float(i)) for i in range(args.count)])
+    timed("transform() per element", args.count, lambda: [e.transform(poly) for e in form.elements])
+    timed("map()", args.count, lambda: form.map(poly))
+    if elements_module.np is not None:
+        timed("map(vectorized=True)", args.count, lambda: form.map(poly, vectorized=True))
+    timed("sum(iter_compose())", args.count, lambda: sum(form.iter_compose()))
+
+    small = FormElement(form.elements[: args.heavy_count])
+    timed("heavy map()", args.heavy_count, lambda: small.map(heavy))
+    if elements_module.np is not None:
+        timed("heavy map(vectorized=True)", args.heavy_count, lambda: small.map(heavy_array, vectorized=True))
+    timed(
+        f"heavy map(workers={args.workers})",
+        args.heavy_count,
+        lambda: small.map(heavy, workers=args.workers, chunksize=4096),
+    )
+
+
+if __name__ == "__main__":
+    main()
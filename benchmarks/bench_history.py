@@ -0,0 +1,97 @@
+"""Measure History memory and get_recent() cost, unbounded vs ring buffer.
+
+Run from the repository root::
+
+    python benchmarks/bench_history.py --records 1000000 --capacity 10000
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from formatics.logs import History  # noqa: E402
+
+
+@dataclass
+class LegacyEntry:
+    # The previous entry layout: dataclass, datetime and an eager dict.
+    timestamp: datetime
+    action: str
+    element: Any
+    metadata: dict = field(default_factory=dict)
+
+
+def traced(run) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=1_000_000, help="events to record")
+    parser.add_argument("--capacity", type=int, default=10_000, help="ring buffer size")
+    args = parser.parse_args()
+
+    def legacy():
+        entries = []
+        for i in range(args.records):
+            entries.append(LegacyEntry(timestamp=datetime.now(), action="step", element=i, metadata={}))
+        return entries
+
+    def unbounded():
+        history = History()
+        for i in range(args.records):
+            history.record("step", i)
+        return history
+
+    def bounded():
+        history = History(capacity=args.capacity)
+        for i in range(args.records):
+            history.record("step", i)
+        return history
+
+    for label, run in (("legacy list", legacy), ("History()", unbounded), (f"History({args.capacity})", bounded)):
+        result, size, elapsed = traced(run)
+        print(f"{label:18s} {size / 2**20:8.1f} MiB retained  {args.records / elapsed:12,.0f} records/s")
+        del result
+
+    history = bounded()
+    start = time.perf_counter()
+    for _ in range(10_000):
+        history.get_recent(10)
+    print(f"get_recent(10)     {(time.perf_counter() - start) / 10_000 * 1e6:8.2f} us on a full ring buffer")
+
+    # Dashboard-style poll: "last 20 `move` events since T" over the full log.
+    history = History()
+    actions = ("move", "copy", "delete", "create")
+    for i in range(args.records):
+        history.record(actions[i % len(actions)], i)
+    since = history.entries[len(history) // 2].timestamp_ns
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        list(history.query("move", since=since, limit=20, newest_first=True))
+    indexed = (time.perf_counter() - start) / 1000
+
+    start = time.perf_counter()
+    for _ in range(3):
+        [e for e in history.entries if e.action == "move" and e.timestamp_ns >= since][-20:]
+    scanned = (time.perf_counter() - start) / 3
+    print(f"query(move, since, limit=20)  {indexed * 1e6:10.1f} us   linear scan {scanned * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
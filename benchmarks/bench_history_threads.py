@@ -0,0 +1,71 @@
+"""Compare multithreaded recording: ShardedHistory vs one History behind a lock.
+
+Run from the repository root::
+
+    python benchmarks/bench_history_threads.py --threads 16 --records 50000
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from formatics.logs import History, ShardedHistory  # noqa: E402
+
+
+class LockedHistory:
+    """Baseline: every record() serialises on one lock around a shared History."""
+
+    def __init__(self):
+        self.history = History()
+        self.lock = threading.Lock()
+
+    def record(self, action, element, **metadata):
+        with self.lock:
+            self.history.record(action, element, **metadata)
+
+
+def run(target, threads: int, records: int) -> float:
+    barrier = threading.Barrier(threads + 1)
+
+    def produce(worker: int) -> None:
+        barrier.wait()
+        record = target.record
+        for i in range(records):
+            record("move", i, worker=worker)
+
+    workers = [threading.Thread(target=produce, args=(w,)) for w in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return threads * records / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16, help="producer threads")
+    parser.add_argument("--records", type=int, default=50_000, help="records per thread")
+    args = parser.parse_args()
+
+    for threads in sorted({1, 4, args.threads}):
+        locked = run(LockedHistory(), threads, args.records)
+        sharded_history = ShardedHistory()
+        sharded = run(sharded_history, threads, args.records)
+        start = time.perf_counter()
+        merged = len(sharded_history)
+        merge_time = time.perf_counter() - start
+        print(
+            f"{threads:3d} threads  locked {locked:12,.0f} rec/s   sharded {sharded:12,.0f} rec/s"
+            f"   ({sharded / locked:.2f}x, merge of {merged:,} in {merge_time:.2f} s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
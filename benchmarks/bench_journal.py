@@ -0,0 +1,68 @@
+"""Measure Journal append throughput per fsync policy and timestamp seeks.
+
+Run from the repository root::
+
+    python benchmarks/bench_journal.py --records 500000
+"""
+from __future__ import annotations
+
+import argparse
+import pickle
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from formatics.logs import History, HistoryEntry, Journal  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=500_000, help="entries to journal")
+    parser.add_argument("--always-records", type=int, default=2_000, help="entries for the fsync=always run")
+    args = parser.parse_args()
+
+    entries = [
+        HistoryEntry(action="move", element=f"/srv/data/file{i}.bin", metadata={"size": i}, timestamp_ns=i * 1000)
+        for i in range(args.records)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for policy, count in (("never", args.records), ("batch", args.records), ("always", args.always_records)):
+            directory = Path(tmp, policy)
+            start = time.perf_counter()
+            with Journal(directory, fsync=policy, segment_size=16 << 20) as journal:
+                for entry in entries[:count]:
+                    journal.append(entry)
+            elapsed = time.perf_counter() - start
+            print(f"append fsync={policy:6s} {count / elapsed:12,.0f} records/s")
+
+        journal = Journal(Path(tmp, "batch"), segment_size=16 << 20)
+        reader = journal.reader()
+        segments = len(reader._segments)
+        start = time.perf_counter()
+        for i in range(1000):
+            next(iter(reader.seek(entries[(i * 7919) % args.records].timestamp_ns)))
+        print(f"seek by timestamp    {(time.perf_counter() - start) * 1e3:12.1f} us/seek over {segments} segments")
+
+        start = time.perf_counter()
+        count = sum(1 for _ in reader)
+        print(f"full scan            {count / (time.perf_counter() - start):12,.0f} records/s")
+        reader.close()
+        journal.close()
+
+        # Baseline: persisting the in-memory log by pickling it whole.
+        history = History()
+        for entry in entries:
+            history.append(entry)
+        start = time.perf_counter()
+        Path(tmp, "history.pkl").write_bytes(
+            pickle.dumps([(e.timestamp_ns, e.action, e.element, e.metadata) for e in history])
+        )
+        print(f"pickle whole log     {time.perf_counter() - start:12.3f} s per save")
+
+
+if __name__ == "__main__":
+    main()
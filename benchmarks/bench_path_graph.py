@@ -0,0 +1,87 @@
+"""Measure PathGraph.find_path(): one-sided vs bidirectional BFS, and the old list-queue search.
+
+Run from the repository root::
+
+    python benchmarks/bench_path_graph.py --nodes 1000000 --degree 3 --chain 20000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from formatics.paths import PathGraph  # noqa: E402
+
+
+def legacy_find_path(start, end):
+    # The previous implementation: list.pop(0) and a copied path per node.
+    if start == end:
+        return [start]
+    visited = set()
+    queue = [(start, [start])]
+    while queue:
+        current, path = queue.pop(0)
+        if current in visited:
+            continue
+        visited.add(current)
+        for neighbor in current.neighbors():
+            if neighbor == end:
+                return path + [neighbor]
+            if neighbor not in visited:
+                queue.append((neighbor, path + [neighbor]))
+    return None
+
+
+def timed(run) -> tuple:
+    start = time.perf_counter()
+    result = run()
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=1_000_000, help="nodes in the random graph")
+    parser.add_argument("--degree", type=int, default=3, help="out-edges per node")
+    parser.add_argument("--queries", type=int, default=20, help="random point-to-point lookups")
+    parser.add_argument("--chain", type=int, default=20_000, help="length of the chain for the legacy comparison")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    graph = PathGraph()
+    _, build = timed(lambda: [graph.add_node(i) for i in range(args.nodes)])
+    nodes = graph.nodes
+    start = time.perf_counter()
+    for node in nodes:
+        for _ in range(args.degree):
+            graph.connect_nodes(node, nodes[rng.randrange(args.nodes)])
+    build += time.perf_counter() - start
+    print(f"random graph: {args.nodes:,} nodes, {args.degree} out-edges each, built in {build:.1f} s")
+
+    pairs = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(args.queries)]
+    one_sided = two_sided = 0.0
+    for source, target in pairs:
+        path, elapsed = timed(lambda: graph.find_path(source, target))
+        one_sided += elapsed
+        both, elapsed = timed(lambda: graph.find_path(source, target, bidirectional=True))
+        two_sided += elapsed
+        assert (path is None) == (both is None) and (path is None or len(path) == len(both))
+    print(f"  BFS:            {one_sided / len(pairs) * 1e3:9.2f} ms per query")
+    print(f"  bidirectional:  {two_sided / len(pairs) * 1e3:9.2f} ms per query")
+
+    chain = PathGraph()
+    links = [chain.add_node(i) for i in range(args.chain)]
+    for source, target in zip(links, links[1:]):
+        chain.connect_nodes(source, target)
+    print(f"chain: {args.chain:,} nodes, end to end")
+    _, legacy = timed(lambda: legacy_find_path(links[0], links[-1]))
+    _, current = timed(lambda: chain.find_path(links[0], links[-1]))
+    print(f"  legacy:         {legacy * 1e3:9.2f} ms")
+    print(f"  BFS:            {current * 1e3:9.2f} ms ({legacy / current:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Measure Replay.state_at() against re-scanning the history from the start.
+
+Run from the repository root::
+
+    python benchmarks/bench_replay.py --records 1000000 --keys 1000 --queries 200
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from formatics.logs import History, HistoryEntry, Replay  # noqa: E402
+
+
+def balance(state, entry):
+    return (state or 0) + entry.metadata["delta"]
+
+
+def full_scan(history: History, element, t_ns: int):
+    state = None
+    for entry in history:
+        if entry.timestamp_ns > t_ns:
+            break
+        if entry.element == element:
+            state = balance(state, entry)
+    return state
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=1_000_000, help="entries in the history")
+    parser.add_argument("--keys", type=int, default=1_000, help="distinct elements")
+    parser.add_argument("--queries", type=int, default=200, help="random point-in-time lookups")
+    parser.add_argument("--every", type=int, default=10_000, help="checkpoint spacing in entries")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    history = History()
+    for i in range(args.records):
+        history.append(
+            HistoryEntry(
+                action="adjust",
+                element=rng.randrange(args.keys),
+                metadata={"delta": rng.randint(-5, 9)},
+                timestamp_ns=i * 1_000,
+            )
+        )
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    replay = Replay(history, apply=balance, every=args.every)
+    build = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    queries = [(rng.randrange(args.keys), rng.randrange(args.records) * 1_000) for _ in range(args.queries)]
+    start = time.perf_counter()
+    answers = [replay.state_at(element, t) for element, t in queries]
+    indexed = (time.perf_counter() - start) / len(queries)
+
+    sample = queries[: max(1, len(queries) // 20)]
+    start = time.perf_counter()
+    expected = [full_scan(history, element, t) for element, t in sample]
+    scan = (time.perf_counter() - start) / len(sample)
+    assert answers[: len(sample)] == expected
+
+    print(f"{args.records:,} entries, {args.keys:,} keys")
+    print(f"replay build:  {build:8.2f} s   {len(replay.checkpoints)} checkpoints, {memory / 2**20:.1f} MiB")
+    print(f"state_at:      {indexed * 1e3:8.3f} ms per lookup")
+    print(f"full scan:     {scan * 1e3:8.3f} ms per lookup ({scan / indexed:.0f}x slower)")
+
+
+if __name__ == "__main__":
+    main()
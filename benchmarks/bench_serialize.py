@@ -0,0 +1,63 @@
+"""Compare the binary form format with pickle for saving and opening forms.
+
+Run from the repository root::
+
+    python benchmarks/bench_serialize.py --count 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from formatics.form import Element, FormElement  # noqa: E402
+from formatics.serialize import dump_form, open_form  # noqa: E402
+
+
+def timed(label: str, run):
+    start = time.perf_counter()
+    result = run()
+    print(f"{label:30s} {time.perf_counter() - start:8.3f} s")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1_000_000, help="elements in the form")
+    parser.add_argument("--touch", type=int, default=1000, help="random elements to decode after opening")
+    args = parser.parse_args()
+
+    form = FormElement(
+        [Element(i * 0.5, {"unit": ("m", "cm")[i % 2], "batch": i // 1000}) for i in range(args.count)],
+        form_type="grid",
+    )
+    picks = random.Random(0).sample(range(args.count), min(args.touch, args.count))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        binary = Path(tmp, "form.fmf")
+        pickled = Path(tmp, "form.pkl")
+        timed("dump_form", lambda: dump_form(form, binary))
+        timed("pickle.dump", lambda: pickled.write_bytes(pickle.dumps(form, protocol=pickle.HIGHEST_PROTOCOL)))
+        print(f"{'size form / pickle':30s} {os.path.getsize(binary) / 2**20:8.1f} / {os.path.getsize(pickled) / 2**20:.1f} MiB")
+
+        def open_and_touch():
+            with open_form(binary) as form_file:
+                return [form_file[i].value for i in picks]
+
+        def unpickle_and_touch():
+            loaded = pickle.loads(pickled.read_bytes())
+            return [loaded.elements[i].value for i in picks]
+
+        timed(f"open_form + {len(picks)} reads", open_and_touch)
+        timed(f"pickle.load + {len(picks)} reads", unpickle_and_touch)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,33 +4,91 @@ Importing :mod:`filestate` from another script records the script's directory
 in the file itself using a ``# ORIGIN:`` tag. If the script is later run from a
 new directory, the module detects the leap, invokes a trigger, and updates the
 embedded origin.
+
+Setting ``FILESTATE_REGISTRY`` to a database path switches to the registry
+backend: origins are kept in a local SQLite index keyed by the script's
+``(st_dev, st_ino, path)`` and the script itself is never rewritten. The in-file
+tag remains the default and is still honoured as a fallback for scripts that
+were tagged before the registry was enabled.
 """
 from __future__ import annotations
 
-import inspect
 import os
-import subprocess
 import sys
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor, Future
 
 TAG = "# ORIGIN:"
 DISABLE_TRIGGER_ENV = "FILESTATE_DISABLE_TRIGGER"
 DISABLE_PRIME_ENV = "FILESTATE_DISABLE_AUTO_PRIME"
+REGISTRY_ENV = "FILESTATE_REGISTRY"
+LEAP_MODE_ENV = "FILESTATE_LEAP_MODE"
+DEFAULT_LEAP_MODE = "subprocess"
+
+# Upper bound on the bytes read when only the ``# ORIGIN:`` line is needed.
+_PEEK_LIMIT = 4096
+
+# Directory holding the standard library (and, below it, site-packages).
+_STDLIB_DIR = Path(os.__file__).resolve().parent
+
+# ``__file__`` string -> resolved existing path (or ``None``), shared across lookups.
+_RESOLVED_FILES: Dict[str, Optional[Path]] = {}
+
+__all__ = ["folderleap", "register_leap_handler", "add_leap_callback", "pending_leaps"]
+
+
+def _resolve_file(fname: str) -> Optional[Path]:
+    """Resolve a module ``__file__`` once and remember whether it exists."""
+    try:
+        return _RESOLVED_FILES[fname]
+    except KeyError:
+        pass
+    candidate = Path(fname).resolve()
+    resolved = candidate if candidate.exists() else None
+    _RESOLVED_FILES[fname] = resolved
+    return resolved
+
+
+def _iter_outer_globals() -> Iterator[dict]:
+    """Yield frame globals from the outermost frame inwards.
+
+    Walks raw ``f_back`` pointers instead of ``inspect.stack()``, which would
+    build a ``FrameInfo`` with source context for every frame. Consecutive frames
+    from the same module are collapsed so each module is examined once.
+    """
+    getframe = getattr(sys, "_getframe", None)
+    if getframe is None:
+        import inspect
+
+        frames = [info.frame for info in inspect.stack()]
+    else:
+        frames = []
+        frame = getframe(1)
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
 
-__all__ = ["folderleap"]
+    previous = None
+    for frame in reversed(frames):
+        module_globals = frame.f_globals
+        if module_globals is not previous:
+            previous = module_globals
+            yield module_globals
 
 
 def _get_calling_script() -> Optional[Path]:
     """Return the path to the first non-filestate module on the call stack."""
-    this_file = Path(__file__).resolve()
+    this_file = _resolve_file(__file__)
 
-    for frame_info in reversed(inspect.stack()):
-        fname = frame_info.frame.f_globals.get("__file__")
+    for module_globals in _iter_outer_globals():
+        fname = module_globals.get("__file__")
         if not fname:
             continue
-        candidate = Path(fname).resolve()
-        if candidate != this_file and candidate.exists():
+        candidate = _resolve_file(fname)
+        if candidate is not None and candidate != this_file:
             return candidate
     return None
 
@@ -45,19 +103,324 @@ def _read_origin(path: Path) -> Tuple[Optional[str], str]:
     return None, content
 
 
+def _peek_origin(path: "os.PathLike[str] | str") -> Optional[str]:
+    """Return the stored origin from the first line only, without reading the body."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        head = os.read(fd, _PEEK_LIMIT)
+    finally:
+        os.close(fd)
+    first_line = head.partition(b"\n")[0].decode("utf-8", errors="replace")
+    if first_line.startswith(TAG):
+        return first_line.split(":", 1)[1].strip()
+    return None
+
+
 def _write_origin(path: Path, origin: str, body: str) -> None:
-    """Rewrite *path* with the origin tag followed by the prior content."""
-    with path.open("w", encoding="utf-8") as handle:
-        handle.write(f"{TAG}{origin}\n")
-        handle.write(body)
+    """Atomically replace *path* with the origin tag followed by the prior content.
+
+    The new content goes to a sibling temp file which is fsynced and renamed
+    over *path*, so readers see either the old or the new script, never a
+    truncated one.
+    """
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.origin-tmp")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(f"{TAG}{origin}\n")
+            handle.write(body)
+            handle.flush()
+            os.fsync(handle.fileno())
+        try:
+            os.chmod(tmp_path, path.stat().st_mode & 0o7777)
+        except OSError:
+            pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(path.parent)
+
+
+def _fsync_directory(directory: Path) -> None:
+    """Flush the directory entry after a rename (best effort, POSIX only)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _lock_directory(directory: Path) -> Optional[int]:
+    """Take an exclusive advisory ``fcntl`` lock on *directory*.
+
+    The directory is locked rather than the script because the script's inode
+    is replaced on every update. Returns ``None`` where locking is unavailable.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return None
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _unlock_directory(fd: Optional[int]) -> None:
+    if fd is not None:
+        # Closing the descriptor releases the flock.
+        os.close(fd)
+
+
+def _update_origin(path: Path, origin: str) -> Tuple[Optional[str], bool]:
+    """Make *path* carry *origin*, serialised against concurrent imports.
+
+    Returns the previously stored origin and whether this call rewrote the
+    file. The tag is re-read under the lock, so when several processes race
+    only the first one writes and the rest find the tag already correct.
+    """
+    lock_fd = _lock_directory(path.parent)
+    try:
+        previous, body = _read_origin(path)
+        if previous == origin:
+            return previous, False
+        _write_origin(path, origin, body)
+        return previous, True
+    finally:
+        _unlock_directory(lock_fd)
+
+
+class _OriginRegistry:
+    """SQLite index of script origins keyed by ``(st_dev, st_ino, path)``.
+
+    Lookups go by device and inode first so a renamed script is still found,
+    then by path for files whose inode changed (for example after an editor
+    replaced them on save).
+    """
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS origins ("
+        " dev INTEGER NOT NULL,"
+        " ino INTEGER NOT NULL,"
+        " path TEXT NOT NULL,"
+        " origin TEXT NOT NULL,"
+        " PRIMARY KEY (dev, ino))"
+    )
+
+    def __init__(self, db_path: Path):
+        # Nothing touches the disk until the first lookup or store.
+        self._path = db_path
+        self._conn: Any = None
+
+    def _connection(self) -> Any:
+        if self._conn is None:
+            import sqlite3
+
+            created = not self._path.exists()
+            if created:
+                self._path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self._path), timeout=30.0)
+            if created:
+                self._create_schema()
+        return self._conn
+
+    def _create_schema(self) -> None:
+        # WAL mode is persistent, so it only needs setting when the file is new.
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(self._SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS origins_path ON origins (path)")
+
+    def lookup(self, path: Path, stat: os.stat_result) -> Optional[str]:
+        """Return the recorded origin directory for *path*, if any."""
+        import sqlite3
+
+        conn = self._connection()
+        try:
+            row = conn.execute(
+                "SELECT origin FROM origins WHERE dev = ? AND ino = ?",
+                (stat.st_dev, stat.st_ino),
+            ).fetchone()
+        except sqlite3.OperationalError:
+            # Another process created the file but has not set up the schema yet.
+            self._create_schema()
+            return None
+        if row is None:
+            row = conn.execute(
+                "SELECT origin FROM origins WHERE path = ?", (str(path),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def store(self, path: Path, stat: os.stat_result, origin: str) -> None:
+        """Record *origin* for *path*, replacing any stale entry for the same file."""
+        conn = self._connection()
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            conn.execute("DELETE FROM origins WHERE path = ?", (str(path),))
+            conn.execute(
+                "INSERT OR REPLACE INTO origins (dev, ino, path, origin) VALUES (?, ?, ?, ?)",
+                (stat.st_dev, stat.st_ino, str(path), origin),
+            )
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _open_registry() -> Optional[_OriginRegistry]:
+    """Return the registry configured via ``FILESTATE_REGISTRY``, or ``None`` for tag mode."""
+    location = os.getenv(REGISTRY_ENV)
+    if not location:
+        return None
+    return _OriginRegistry(Path(location).expanduser())
+
+
+LeapHandler = Callable[[Path, str, str], "Optional[Future[Any]]"]
+LeapCallback = Callable[[Path, "Future[Any]"], None]
+
+_LEAP_HANDLERS: Dict[str, LeapHandler] = {}
+_LEAP_CALLBACKS: List[LeapCallback] = []
+_PENDING_LEAPS: List[Tuple[Path, "Future[Any]"]] = []
+_EXECUTORS: Dict[str, "Executor"] = {}
 
 
-def _on_leap(path: Path, old_dir: str, new_dir: str) -> None:
+def register_leap_handler(mode: str, handler: LeapHandler) -> None:
+    """Register *handler* as the execution strategy for leap *mode*.
+
+    Handlers receive ``(path, old_dir, new_dir)``. They either finish the work
+    before returning ``None`` or hand back a ``Future`` for work still running.
+    Select a mode with ``FILESTATE_LEAP_MODE`` or the ``mode`` argument of
+    :func:`_on_leap`.
+    """
+    _LEAP_HANDLERS[mode] = handler
+
+
+def add_leap_callback(callback: LeapCallback) -> None:
+    """Call ``callback(path, future)`` when each deferred leap handler finishes.
+
+    Leaps dispatched before the callback was added (for example during the
+    import that primed the script) are reported too.
+    """
+    _LEAP_CALLBACKS.append(callback)
+    for path, future in _PENDING_LEAPS:
+        future.add_done_callback(lambda done, path=path: callback(path, done))
+
+
+def pending_leaps() -> List["Future[Any]"]:
+    """Return the futures of leap handlers dispatched by deferred modes."""
+    return [future for _, future in _PENDING_LEAPS]
+
+
+def _shared_executor(kind: str) -> "Executor":
+    """Return the process-wide executor for *kind*, creating it on first use.
+
+    Executors stay alive between leaps so later dispatches reuse warm workers;
+    ``concurrent.futures`` joins them at interpreter exit.
+    """
+    executor = _EXECUTORS.get(kind)
+    if executor is None:
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+        if kind == "process":
+            executor = ProcessPoolExecutor(mp_context=_pool_context())
+        else:
+            executor = ThreadPoolExecutor(thread_name_prefix="folderleap")
+        _EXECUTORS[kind] = executor
+    return executor
+
+
+def _pool_context() -> Any:
+    """Return the ``fork`` context for pooled leaps, or ``None`` where it is unavailable.
+
+    Spawn and forkserver workers re-import the parent's ``__main__`` as
+    ``__mp_main__``. Here that is the moved script itself, so its body would
+    run once more in every worker. Forked workers start from a copy of the
+    parent and import nothing.
+    """
+    import multiprocessing
+
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    return multiprocessing.get_context("fork")
+
+
+def _execute_script(path: str) -> None:
+    """Run *path* as ``__main__`` in the current interpreter."""
+    import runpy
+
+    runpy.run_path(path, run_name="__main__")
+
+
+def _run_subprocess(path: Path, old_dir: str, new_dir: str) -> None:
+    """Re-run the script in a fresh interpreter and wait for it (the default)."""
+    import subprocess
+
+    subprocess.run([sys.executable, str(path)], check=False)
+
+
+def _run_inprocess(path: Path, old_dir: str, new_dir: str) -> None:
+    """Re-run the script inside the importing interpreter via ``runpy``."""
+    _execute_script(str(path))
+
+
+def _run_pooled(path: Path, old_dir: str, new_dir: str) -> "Future[None]":
+    """Re-run the script on the shared, warm process pool without waiting.
+
+    Without ``fork`` (Windows) this falls back to the ``async`` handler.
+    """
+    if _pool_context() is None:
+        return _run_async(path, old_dir, new_dir)
+    return _shared_executor("process").submit(_execute_script, str(path))
+
+
+def _run_async(path: Path, old_dir: str, new_dir: str) -> "Future[None]":
+    """Re-run the script in a fresh interpreter from a background thread."""
+    return _shared_executor("thread").submit(_run_subprocess, path, old_dir, new_dir)
+
+
+register_leap_handler("subprocess", _run_subprocess)
+register_leap_handler("inprocess", _run_inprocess)
+register_leap_handler("pool", _run_pooled)
+register_leap_handler("async", _run_async)
+
+
+def _on_leap(
+    path: Path, old_dir: str, new_dir: str, mode: Optional[str] = None
+) -> "Optional[Future[Any]]":
     """Default handler executed when a folder leap is detected."""
     print(f"[folderleap] {path.name} moved:")
     print(f"  from: {old_dir}")
     print(f"    to: {new_dir}")
-    subprocess.run([sys.executable, str(path)], check=False)
+
+    mode = mode or os.getenv(LEAP_MODE_ENV) or DEFAULT_LEAP_MODE
+    handler = _LEAP_HANDLERS.get(mode)
+    if handler is None:
+        print(f"[folderleap] unknown leap mode {mode!r}; using {DEFAULT_LEAP_MODE!r}")
+        handler = _LEAP_HANDLERS[DEFAULT_LEAP_MODE]
+
+    # Flush before dispatching so output from the re-run cannot interleave with ours.
+    sys.stdout.flush()
+    future = handler(path, old_dir, new_dir)
+    if future is not None:
+        _PENDING_LEAPS.append((path, future))
+        for callback in _LEAP_CALLBACKS:
+            future.add_done_callback(lambda done, callback=callback: callback(path, done))
+    return future
 
 
 def folderleap() -> None:
@@ -84,20 +447,50 @@ def _auto_prime() -> None:
     if not calling_script or not calling_script.exists():
         return
 
+    # Never tag interpreter-owned files, e.g. when a pooled leap worker is
+    # spawned and the only frames on its stack belong to multiprocessing.
+    if _STDLIB_DIR in calling_script.parents:
+        return
+
     if debug_enabled:
         print(f"[filestate] detected script: {calling_script}")
 
     current_dir = str(calling_script.parent.resolve())
-    origin_dir, body = _read_origin(calling_script)
 
-    if origin_dir is None:
-        _write_origin(calling_script, current_dir, body)
+    registry = _open_registry()
+    if registry is not None:
+        try:
+            _prime_with_registry(registry, calling_script, current_dir)
+        finally:
+            registry.close()
         return
 
+    if _peek_origin(calling_script) == current_dir:
+        return
+
+    origin_dir, written = _update_origin(calling_script, current_dir)
+    # Trigger only from the process that performed the update, and only after
+    # the new tag is in place so a re-run of the script does not leap again.
+    if written and origin_dir is not None and not os.getenv(DISABLE_TRIGGER_ENV):
+        _on_leap(calling_script, origin_dir, current_dir)
+
+
+def _prime_with_registry(registry: _OriginRegistry, script: Path, current_dir: str) -> None:
+    """Registry-backed priming: one stat and one index lookup when nothing moved."""
+    stat = script.stat()
+    origin_dir = registry.lookup(script, stat)
+    if origin_dir is None:
+        # Honour tags written before the registry was enabled, then stop touching the file.
+        origin_dir = _peek_origin(script)
+        if origin_dir is None or origin_dir == current_dir:
+            registry.store(script, stat, current_dir)
+            return
+
     if current_dir != origin_dir:
+        # Store first so a re-run triggered by the handler sees the new origin.
+        registry.store(script, stat, current_dir)
         if not os.getenv(DISABLE_TRIGGER_ENV):
-            _on_leap(calling_script, origin_dir, current_dir)
-        _write_origin(calling_script, current_dir, body)
+            _on_leap(script, origin_dir, current_dir)
 
 
 if not os.getenv(DISABLE_PRIME_ENV):
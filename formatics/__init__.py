@@ -10,18 +10,24 @@ __author__ = "Nicholas Gerrans"
 
 from . import filestate
 from . import folderleap
+from . import lineage
+from . import snapshot
 from . import orbit
 from . import slot
 from . import form
 from . import paths
 from . import logs
+from . import serialize
 
 __all__ = [
     "filestate",
     "folderleap",
+    "lineage",
+    "snapshot",
     "orbit",
     "slot",
     "form",
     "paths",
     "logs",
+    "serialize",
 ]
@@ -0,0 +1,40 @@
+"""
+Formatics clock: Compact integer timestamps.
+
+Hot-path records store ``time.monotonic_ns()`` integers instead of
+``datetime`` objects; these helpers convert at the edges.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+# Wall-clock time (ns since the epoch) at monotonic zero, fixed at import.
+_EPOCH_OFFSET_NS = time.time_ns() - time.monotonic_ns()
+
+
+def monotonic_ns() -> int:
+    """Current monotonic time in nanoseconds."""
+    return time.monotonic_ns()
+
+
+def to_epoch_ns(ns: int) -> int:
+    """Convert a monotonic-ns timestamp to wall-clock ns since the epoch."""
+    return ns + _EPOCH_OFFSET_NS
+
+
+def from_epoch_ns(epoch_ns: int) -> int:
+    """Convert wall-clock ns since the epoch to the monotonic-ns timeline."""
+    return epoch_ns - _EPOCH_OFFSET_NS
+
+
+def to_datetime(ns: int) -> datetime:
+    """Convert a monotonic-ns timestamp to a local ``datetime``."""
+    seconds, rest = divmod(ns + _EPOCH_OFFSET_NS, 1_000_000_000)
+    return datetime.fromtimestamp(seconds) + timedelta(microseconds=rest // 1000)
+
+
+def from_datetime(moment: datetime) -> int:
+    """Convert a ``datetime`` to the monotonic-ns timeline used by :func:`monotonic_ns`."""
+    # Whole seconds and microseconds separately, so no precision is lost to floats.
+    whole = moment.replace(microsecond=0).timestamp()
+    return int(whole) * 1_000_000_000 + moment.microsecond * 1000 - _EPOCH_OFFSET_NS
@@ -5,30 +5,161 @@ This module provides core file state tracking within the Formatics framework,
 ensuring every element maintains its lineage and transformation path.
 """
 
+import hashlib
+import os
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import TYPE_CHECKING, Optional, Dict, Any, Tuple
 from datetime import datetime
 
+from ._clock import monotonic_ns, to_datetime
+
+if TYPE_CHECKING:
+    from .lineage import LineageStore
+
+# Read size used when fingerprinting file contents.
+_HASH_CHUNK = 1 << 20
+
+
+def content_hash(path: Path) -> str:
+    """Return the BLAKE2b hex digest of the file at *path*."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 
 class FileState:
-    """Track the state and origin of a file element."""
+    """Track the state and origin of a file element.
 
-    def __init__(self, path: Path, origin: Optional[Path] = None):
+    Instances use ``__slots__`` and an integer monotonic-ns timestamp, and
+    only allocate a metadata dict when it is first accessed, so millions of
+    them can be tracked cheaply.
+
+    Identity is the file's ``(st_dev, st_ino)`` pair plus an optional content
+    hash. It is filled in by :meth:`capture` (or passed explicitly) and lets
+    :meth:`track_move` tell a real move from a copy.
+    """
+
+    __slots__ = (
+        "path",
+        "origin",
+        "created_ns",
+        "dev",
+        "ino",
+        "content_hash",
+        "relation",
+        "lineage_id",
+        "_metadata",
+    )
+
+    def __init__(
+        self,
+        path: Path,
+        origin: Optional[Path] = None,
+        *,
+        dev: Optional[int] = None,
+        ino: Optional[int] = None,
+        content_hash: Optional[str] = None,
+    ):
         """
         Initialize FileState.
 
         Args:
             path: Current file path
             origin: Original file path (if moved/transformed)
+            dev: Device number of the file, if known
+            ino: Inode number of the file, if known
+            content_hash: Content digest of the file, if known
         """
-        self.path = Path(path)
-        self.origin = Path(origin) if origin else self.path
-        self.created_at = datetime.now()
-        self.metadata: Dict[str, Any] = {}
-
-    def track_move(self, new_path: Path) -> "FileState":
-        """Record a file movement, preserving origin."""
-        return FileState(path=new_path, origin=self.origin)
+        self.path = path if isinstance(path, Path) else Path(path)
+        if origin is None:
+            self.origin = self.path
+        else:
+            self.origin = origin if isinstance(origin, Path) else Path(origin)
+        self.created_ns = monotonic_ns()
+        self.dev = dev
+        self.ino = ino
+        self.content_hash = content_hash
+        # How this state was reached from its predecessor: "move", "copy" or None.
+        self.relation: Optional[str] = None
+        # File id in a LineageStore once the state is tracked there.
+        self.lineage_id: Optional[int] = None
+        self._metadata: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def capture(
+        cls, path: Path, origin: Optional[Path] = None, hash_content: bool = False
+    ) -> "FileState":
+        """Create a FileState whose identity is read from the file on disk."""
+        stat = os.stat(path)
+        return cls(
+            path,
+            origin,
+            dev=stat.st_dev,
+            ino=stat.st_ino,
+            content_hash=content_hash(Path(path)) if hash_content else None,
+        )
+
+    @property
+    def created_at(self) -> datetime:
+        """Creation time as a ``datetime`` (derived from ``created_ns``)."""
+        return to_datetime(self.created_ns)
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Free-form metadata, created on first access."""
+        if self._metadata is None:
+            self._metadata = {}
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, value: Dict[str, Any]) -> None:
+        self._metadata = value
+
+    def identity(self) -> Optional[Tuple[int, int]]:
+        """Return ``(st_dev, st_ino)`` if known."""
+        if self.dev is None or self.ino is None:
+            return None
+        return (self.dev, self.ino)
+
+    def track_move(self, new_path: Path, store: Optional["LineageStore"] = None) -> "FileState":
+        """Record a file movement, preserving origin.
+
+        When a :class:`~formatics.lineage.LineageStore` is given, the hop is
+        appended to this file's full chain there (tracking it first if needed).
+
+        When this state carries an identity and *new_path* exists, the new
+        state's identity is captured and ``relation`` is set. A matching
+        ``(st_dev, st_ino)`` means a move. A different inode while the old path
+        still exists means a copy. A different inode with the old path gone
+        counts as a (cross-device) move unless both content hashes are known
+        and differ.
+        """
+        moved = FileState(path=new_path, origin=self.origin)
+        if store is not None:
+            if self.lineage_id is None:
+                store.track(self)
+            store.record_move(self.lineage_id, moved.path)
+        moved.lineage_id = self.lineage_id
+        if self.identity() is None:
+            return moved
+
+        try:
+            stat = os.stat(moved.path)
+        except OSError:
+            return moved
+        moved.dev, moved.ino = stat.st_dev, stat.st_ino
+        if self.content_hash is not None:
+            moved.content_hash = content_hash(moved.path)
+
+        if moved.identity() == self.identity():
+            moved.relation = "move"
+        elif self.path.exists():
+            moved.relation = "copy"
+        elif self.content_hash is None or moved.content_hash == self.content_hash:
+            moved.relation = "move"
+        return moved
 
     def get_lineage(self) -> tuple[Path, Path]:
         """Return (origin, current) path tuple."""
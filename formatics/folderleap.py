@@ -4,10 +4,75 @@ Formatics folderleap: Navigate structural transformations across directories.
 Implements leap-aware navigation where folder moves preserve semantic context.
 """
 
-from pathlib import Path
-from typing import Optional, List
+import errno
+import os
+import shutil
+import stat
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path, PurePath
+from typing import TYPE_CHECKING, Dict, IO, Iterable, Iterator, Optional, List, Set, Union
 from .filestate import FileState
 
+if TYPE_CHECKING:
+    from .lineage import LineageStore
+
+# Journal record kinds written by FolderLeap.execute().
+_JOURNAL_STARTED = "started"
+_JOURNAL_COPIED = "copied"
+_JOURNAL_RENAMED = "renamed"
+_JOURNAL_COMPLETE = "complete"
+
+# Largest single copy_file_range/sendfile request.
+_COPY_CHUNK = 1 << 30
+
+
+def _copy_file(source: str, target: str) -> None:
+    """Copy one file, preferring kernel-side zero-copy transfer.
+
+    Uses ``os.copy_file_range`` where available, then ``os.sendfile``, then a
+    buffered user-space copy. Permission bits and timestamps are preserved.
+    Symlinks are recreated rather than followed.
+
+    Raises:
+        ValueError: If *source* is a FIFO, socket or device, which opening
+            would block on or read endlessly from
+    """
+    mode = os.lstat(source).st_mode
+    if stat.S_ISLNK(mode):
+        if os.path.lexists(target):
+            os.unlink(target)
+        os.symlink(os.readlink(source), target)
+        return
+    if not stat.S_ISREG(mode):
+        raise ValueError(f"{source!r} is not a regular file and cannot be copied")
+
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        size = os.fstat(src.fileno()).st_size
+        copied = 0
+        for transfer in (getattr(os, "copy_file_range", None), getattr(os, "sendfile", None)):
+            if transfer is None:
+                continue
+            try:
+                while copied < size:
+                    if transfer is os.sendfile:
+                        sent = transfer(dst.fileno(), src.fileno(), copied, min(_COPY_CHUNK, size - copied))
+                    else:
+                        sent = transfer(src.fileno(), dst.fileno(), min(_COPY_CHUNK, size - copied), copied, copied)
+                    if sent == 0:
+                        break
+                    copied += sent
+                break
+            except OSError:
+                # Unsupported for this pair of filesystems; restart with the next strategy.
+                copied = 0
+                dst.seek(0)
+                dst.truncate()
+        if copied < size:
+            src.seek(copied)
+            dst.seek(copied)
+            shutil.copyfileobj(src, dst)
+    shutil.copystat(source, target)
+
 
 class FolderLeap:
     """Manage folder-level transformations and leaps."""
@@ -23,6 +88,8 @@ class FolderLeap:
         self.source = Path(source)
         self.target = Path(target)
         self.tracked_files: List[FileState] = []
+        # str(path) -> tracked FileState, kept in step with tracked_files.
+        self._tracked_index: Dict[str, FileState] = {}
 
     def apply(self, file_path: Path) -> Path:
         """
@@ -37,9 +104,232 @@ class FolderLeap:
         relative = file_path.relative_to(self.source)
         return self.target / relative
 
+    def remap(self, paths: Iterable[Union[str, PurePath]]) -> Iterator[str]:
+        """
+        Lazily apply the leap to many paths using plain string prefix swaps.
+
+        Unlike :meth:`apply`, no ``Path`` objects are built per item, so this
+        suits relocations of millions of files. Paths must be normalized (as
+        produced by ``os.scandir``/``os.walk``); results are yielded as strings.
+
+        Args:
+            paths: Iterable of paths under the source directory
+
+        Yields:
+            Transformed path strings in the target directory
+
+        Raises:
+            ValueError: If a path is not inside the source directory
+        """
+        sep = os.sep
+        source = os.fspath(self.source)
+        source_prefix = source if source.endswith(sep) else source + sep
+        target = os.fspath(self.target)
+        target_prefix = target if target.endswith(sep) else target + sep
+        cut = len(source_prefix)
+
+        for path in paths:
+            text = path if type(path) is str else os.fspath(path)
+            if text.startswith(source_prefix):
+                yield target_prefix + text[cut:]
+            elif text == source:
+                yield target
+            else:
+                raise ValueError(f"{text!r} is not in the subpath of {source!r}")
+
+    def remap_stream(self, stream: IO[str]) -> Iterator[str]:
+        """
+        Remap a newline-separated stream of paths (e.g. a file listing).
+
+        Args:
+            stream: Text stream with one path per line
+
+        Yields:
+            Transformed paths, one per line, newline included
+        """
+        lines = (line.rstrip("\n") for line in stream)
+        for remapped in self.remap(line for line in lines if line):
+            yield remapped + "\n"
+
     def track_file(self, file_state: FileState) -> None:
         """Add file to leap tracking."""
         self.tracked_files.append(file_state)
+        self._tracked_index[str(file_state.path)] = file_state
+
+    def get_tracked(self, path: Union[str, PurePath]) -> Optional[FileState]:
+        """Return the tracked FileState for *path*, if any (O(1) lookup)."""
+        return self._tracked_index.get(os.fspath(path))
+
+    def execute(
+        self,
+        workers: int = 8,
+        journal: Optional[Path] = None,
+        store: Optional["LineageStore"] = None,
+    ) -> List[FileState]:
+        """
+        Perform the leap: relocate the source tree to the target directory.
+
+        When source and target live on the same device and the target does
+        not exist yet, the whole tree is moved with a single ``os.rename``.
+        Otherwise (or if the rename fails with ``EXDEV``) files are copied
+        by a bounded pool of *workers* using zero-copy transfers, then the
+        source tree is removed. Copying into an existing target is refused
+        with ``FileExistsError`` before any file is written if a source file
+        would overwrite one already there, and copying a tree that holds
+        FIFOs, sockets or devices is refused with ``ValueError``.
+
+        Progress is appended to a journal (one line per copied file), so
+        calling ``execute()`` again after an interruption skips finished files
+        and resumes where it stopped. The default journal lives next to the
+        target and is removed once the leap completes.
+
+        Every relocated file, and only those (files already in an existing
+        target are left alone), is registered with :meth:`track_file` as a
+        FileState whose origin is its old path, and tracked in *store* when a
+        lineage store is given.
+
+        Args:
+            workers: Maximum number of concurrent copy workers
+            journal: Journal file path (kept after completion if given)
+            store: Lineage store that records each file's move
+
+        Returns:
+            FileStates for the relocated files
+        """
+        journal_path = journal or self.target.parent / f".{self.target.name}.leap-journal"
+        done = _read_journal(journal_path)
+        # Paths relative to the target that were copied; None when the target
+        # is the renamed source tree and holds nothing else.
+        moved: Optional[Set[str]] = done.get(_JOURNAL_COPIED)
+
+        if _JOURNAL_COMPLETE not in done:
+            if not os.path.lexists(self.source) and os.path.isdir(self.target):
+                # Renamed before the journal entry was written; nothing left to move.
+                pass
+            elif _JOURNAL_RENAMED not in done and self._can_rename() and _rename(self.source, self.target):
+                _append_journal(journal_path, _JOURNAL_RENAMED, "")
+            elif _JOURNAL_RENAMED not in done:
+                moved = self._copy_tree(journal_path, done, workers)
+                shutil.rmtree(self.source)
+            _append_journal(journal_path, _JOURNAL_COMPLETE, "")
+
+        states = self._register_moved(store, moved)
+        if journal is None:
+            os.unlink(journal_path)
+        return states
+
+    def _can_rename(self) -> bool:
+        if os.path.lexists(self.target):
+            return False
+        target_parent = self.target.parent
+        target_parent.mkdir(parents=True, exist_ok=True)
+        return os.stat(self.source).st_dev == os.stat(target_parent).st_dev
+
+    def _copy_tree(self, journal_path: Path, done: Dict[str, Set[str]], workers: int) -> Set[str]:
+        """Copy every file not yet journaled; return all relative paths copied so far."""
+        source = os.fspath(self.source)
+        copied = done.get(_JOURNAL_COPIED, set())
+        pending = []
+        for dirpath, dirnames, filenames in os.walk(source):
+            rel_dir = os.path.relpath(dirpath, source)
+            target_dir = os.path.normpath(os.path.join(self.target, rel_dir))
+            os.makedirs(target_dir, exist_ok=True)
+            for name in dirnames:
+                if os.path.islink(os.path.join(dirpath, name)):
+                    # os.walk does not descend into directory symlinks; copy the link itself.
+                    filenames.append(name)
+            for name in filenames:
+                rel = os.path.normpath(os.path.join(rel_dir, name))
+                if rel not in copied:
+                    pending.append(rel)
+
+        special = [rel for rel in pending if not _is_copyable(os.path.join(source, rel))]
+        if special:
+            raise ValueError(
+                f"{len(special)} special file(s) (FIFOs, sockets or devices) cannot be copied "
+                f"from {self.source}, e.g. {special[0]!r}"
+            )
+        if _JOURNAL_STARTED not in done:
+            # Checked once, before the first write. A resumed copy may find its
+            # own half-written files in the target and must not refuse them.
+            clashes = [rel for rel in pending if os.path.lexists(os.path.join(self.target, rel))]
+            if clashes:
+                raise FileExistsError(
+                    f"{len(clashes)} file(s) would be overwritten in {self.target}, e.g. {clashes[0]!r}"
+                )
+            _append_journal(journal_path, _JOURNAL_STARTED, "")
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="folderleap") as pool, open(
+            journal_path, "a", encoding="utf-8"
+        ) as log:
+            futures = {
+                pool.submit(_copy_file, os.path.join(source, rel), os.path.join(self.target, rel)): rel
+                for rel in pending
+            }
+            for future in as_completed(futures):
+                future.result()
+                log.write(f"{_JOURNAL_COPIED}\t{futures[future]}\n")
+                log.flush()
+        return copied | set(pending)
+
+    def _register_moved(self, store: Optional["LineageStore"], moved: Optional[Set[str]]) -> List[FileState]:
+        target = os.fspath(self.target)
+        if moved is None:
+            moved_paths = [
+                os.path.join(dirpath, name)
+                for dirpath, _, filenames in os.walk(target)
+                for name in filenames
+            ]
+        else:
+            moved_paths = [os.path.join(target, rel) for rel in sorted(moved)]
+        back = FolderLeap(self.target, self.source)
+        states = []
+        for path, origin in zip(moved_paths, back.remap(moved_paths)):
+            state = FileState(Path(path), origin=Path(origin))
+            if store is not None:
+                store.track(state)
+            self.track_file(state)
+            states.append(state)
+        return states
 
     def __repr__(self) -> str:
         return f"FolderLeap({self.source} → {self.target})"
+
+
+def _rename(source: Path, target: Path) -> bool:
+    """Rename *source* to *target*; return False if that needs a copy after all."""
+    try:
+        os.rename(source, target)
+    except OSError as error:
+        # Bind mounts and overlay filesystems can share st_dev yet refuse the rename.
+        if error.errno != errno.EXDEV:
+            raise
+        return False
+    return True
+
+
+def _is_copyable(path: str) -> bool:
+    """Whether :func:`_copy_file` can copy *path*: a regular file or a symlink."""
+    mode = os.lstat(path).st_mode
+    return stat.S_ISREG(mode) or stat.S_ISLNK(mode)
+
+
+def _read_journal(path: Path) -> Dict[str, Set[str]]:
+    """Return journal records grouped by kind; missing journals are empty."""
+    records: Dict[str, Set[str]] = {}
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                if not line.endswith("\n"):
+                    # A torn final line from an interrupted write is ignored.
+                    break
+                kind, _, rel = line[:-1].partition("\t")
+                records.setdefault(kind, set()).add(rel)
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def _append_journal(path: Path, kind: str, rel: str) -> None:
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.write(f"{kind}\t{rel}\n")
@@ -4,7 +4,9 @@ Formatics form: Core element structure and composition.
 This module defines the fundamental form elements and their anchors.
 """
 
-from .elements import Element, FormElement
+from .elements import Element, FormElement, LazyElement, TransformPipeline
+from .table import ElementTable, ElementRow
 from .anchor import Anchor
+from .anchor_index import AnchorIndex
 
-__all__ = ["Element", "FormElement", "Anchor"]
+__all__ = ["Element", "FormElement", "LazyElement", "TransformPipeline", "ElementTable", "ElementRow", "Anchor", "AnchorIndex"]
@@ -0,0 +1,245 @@
+"""
+Formatics form anchor index: Spatial lookup of anchors.
+
+A uniform grid over anchor positions answers nearest, k-nearest and radius
+queries without scanning every anchor, and supports incremental updates as
+anchors are added and removed. Bulk builds use NumPy when it is installed.
+"""
+
+import heapq
+import math
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .anchor import Anchor
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; builds fall back to pure Python.
+    np = None
+
+Point = Tuple[float, float, float]
+Cell = Tuple[int, int, int]
+
+
+class AnchorIndex:
+    """Uniform-grid spatial index of :class:`Anchor` positions.
+
+    Anchors are bucketed by ``floor(position / cell_size)``. Queries visit
+    grid cells in growing shells around the query point and stop once no
+    unvisited cell can hold a closer anchor.
+    """
+
+    def __init__(self, cell_size: float = 1.0):
+        """
+        Initialize an empty index.
+
+        Args:
+            cell_size: Edge length of a grid cell; pick roughly the typical
+                spacing between anchors
+        """
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.cell_size = float(cell_size)
+        self._cells: Dict[Cell, List[Anchor]] = {}
+        self._where: Dict[int, Cell] = {}
+        self._lo: Optional[List[int]] = None
+        self._hi: Optional[List[int]] = None
+
+    @classmethod
+    def build(cls, anchors: Sequence[Anchor], cell_size: Optional[float] = None) -> "AnchorIndex":
+        """Build an index over *anchors* in one pass.
+
+        Without an explicit *cell_size*, one is chosen so that cells hold
+        about two anchors on average. Cell coordinates are computed in a single
+        vectorised step when NumPy is available.
+        """
+        positions = np.asarray([anchor.position for anchor in anchors], dtype=float) if np is not None else None
+        if cell_size is None:
+            if positions is not None and len(positions):
+                spans = (positions.max(axis=0) - positions.min(axis=0)).tolist()
+            else:
+                spans = _spans([anchor.position for anchor in anchors])
+            cell_size = _auto_cell_size(spans, len(anchors))
+        index = cls(cell_size)
+        if not anchors:
+            return index
+        if positions is None:
+            for anchor in anchors:
+                index._add(anchor, index._cell(anchor.position))
+            return index
+
+        cells = np.floor(positions / index.cell_size).astype(np.int64)
+        index._lo = cells.min(axis=0).tolist()
+        index._hi = cells.max(axis=0).tolist()
+        buckets = index._cells
+        where = index._where
+        for anchor, key in zip(anchors, map(tuple, cells.tolist())):
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = []
+            bucket.append(anchor)
+            where[id(anchor)] = key
+        return index
+
+    # -- maintenance --------------------------------------------------------
+
+    def _cell(self, point: Sequence[float]) -> Cell:
+        size = self.cell_size
+        return (math.floor(point[0] / size), math.floor(point[1] / size), math.floor(point[2] / size))
+
+    def _add(self, anchor: Anchor, key: Cell) -> None:
+        self._cells.setdefault(key, []).append(anchor)
+        self._where[id(anchor)] = key
+        if self._lo is None:
+            self._lo, self._hi = list(key), list(key)
+        else:
+            for axis in range(3):
+                self._lo[axis] = min(self._lo[axis], key[axis])
+                self._hi[axis] = max(self._hi[axis], key[axis])
+
+    def insert(self, anchor: Anchor) -> None:
+        """Add *anchor* (or re-index it after its position changed)."""
+        if id(anchor) in self._where:
+            self.remove(anchor)
+        self._add(anchor, self._cell(anchor.position))
+
+    def remove(self, anchor: Anchor) -> None:
+        """Remove *anchor* from the index.
+
+        Raises:
+            KeyError: If the anchor is not indexed
+        """
+        key = self._where.pop(id(anchor))
+        bucket = self._cells[key]
+        for i, candidate in enumerate(bucket):
+            if candidate is anchor:
+                bucket[i] = bucket[-1]
+                bucket.pop()
+                break
+        if not bucket:
+            del self._cells[key]
+
+    def __contains__(self, anchor: Anchor) -> bool:
+        return id(anchor) in self._where
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    # -- queries ------------------------------------------------------------
+
+    def _shell(self, center: Cell, ring: int) -> Iterable[Cell]:
+        """Yield the cells at Chebyshev distance *ring* from *center* that lie in the bounding box."""
+        cx, cy, cz = center
+        lo, hi = self._lo, self._hi
+        for x in range(max(cx - ring, lo[0]), min(cx + ring, hi[0]) + 1):
+            x_face = abs(x - cx) == ring
+            for y in range(max(cy - ring, lo[1]), min(cy + ring, hi[1]) + 1):
+                if x_face or abs(y - cy) == ring:
+                    zs: Iterable[int] = range(max(cz - ring, lo[2]), min(cz + ring, hi[2]) + 1)
+                else:
+                    zs = [z for z in ((cz - ring, cz + ring) if ring else (cz,)) if lo[2] <= z <= hi[2]]
+                for z in zs:
+                    yield (x, y, z)
+
+    def _ring_bounds(self, center: Cell) -> Tuple[int, int]:
+        """First and last ring around *center* that reach the bounding box."""
+        if self._lo is None:
+            return 0, -1
+        first = max(max(self._lo[axis] - center[axis], center[axis] - self._hi[axis], 0) for axis in range(3))
+        last = max(
+            max(abs(center[axis] - self._lo[axis]), abs(center[axis] - self._hi[axis])) for axis in range(3)
+        )
+        return first, last
+
+    def nearest_k(self, point: Point, k: int) -> List[Tuple[float, Anchor]]:
+        """Return up to *k* ``(distance, anchor)`` pairs closest to *point*, nearest first."""
+        if k <= 0 or not self._where:
+            return []
+        center = self._cell(point)
+        px, py, pz = point
+        best: List[Tuple[float, int, Anchor]] = []  # max-heap via negated distance
+        # Rings closer than the bounding box are empty; start where it begins.
+        ring, max_ring = self._ring_bounds(center)
+        size = self.cell_size
+        gaps = [
+            max(self._lo[axis] * size - point[axis], point[axis] - (self._hi[axis] + 1) * size, 0.0)
+            for axis in range(3)
+        ]
+        gap_total = sum(gap * gap for gap in gaps)
+        while ring <= max_ring:
+            for key in self._shell(center, ring):
+                for anchor in self._cells.get(key, ()):
+                    ax, ay, az = anchor.position
+                    dist = (ax - px) ** 2 + (ay - py) ** 2 + (az - pz) ** 2
+                    entry = (-dist, id(anchor), anchor)
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    elif dist < -best[0][0]:
+                        heapq.heapreplace(best, entry)
+            # A cell in a later ring is `ring * cell_size` away along some axis,
+            # and at least the gap to the bounding box along the others.
+            if len(best) == k:
+                reach = ring * size
+                bound = min(max(reach, gap) ** 2 + gap_total - gap * gap for gap in gaps)
+                if -best[0][0] <= bound:
+                    break
+            ring += 1
+        return [(math.sqrt(-neg), anchor) for neg, _, anchor in sorted(best, reverse=True)]
+
+    def nearest(self, point: Point) -> Optional[Anchor]:
+        """Return the anchor closest to *point*, or ``None`` if the index is empty."""
+        found = self.nearest_k(point, 1)
+        return found[0][1] if found else None
+
+    def within(self, point: Point, radius: float) -> List[Anchor]:
+        """Return all anchors within *radius* of *point*."""
+        if self._lo is None:
+            return []
+        # Only the part of the radius box that overlaps the bounding box can hold anchors.
+        lo = [max(a, b) for a, b in zip(self._cell([c - radius for c in point]), self._lo)]
+        hi = [min(a, b) for a, b in zip(self._cell([c + radius for c in point]), self._hi)]
+        px, py, pz = point
+        limit = radius * radius
+        found = []
+        for x in range(lo[0], hi[0] + 1):
+            for y in range(lo[1], hi[1] + 1):
+                for z in range(lo[2], hi[2] + 1):
+                    for anchor in self._cells.get((x, y, z), ()):
+                        ax, ay, az = anchor.position
+                        if (ax - px) ** 2 + (ay - py) ** 2 + (az - pz) ** 2 <= limit:
+                            found.append(anchor)
+        return found
+
+    def nearest_many(self, points: Iterable[Point]) -> List[Optional[Anchor]]:
+        """Batch form of :meth:`nearest`."""
+        return [self.nearest(point) for point in points]
+
+    def nearest_k_many(self, points: Iterable[Point], k: int) -> List[List[Tuple[float, Anchor]]]:
+        """Batch form of :meth:`nearest_k`."""
+        return [self.nearest_k(point, k) for point in points]
+
+    def within_many(self, points: Iterable[Point], radius: float) -> List[List[Anchor]]:
+        """Batch form of :meth:`within`."""
+        return [self.within(point, radius) for point in points]
+
+    def __repr__(self) -> str:
+        return f"AnchorIndex(anchors={len(self)}, cells={len(self._cells)}, cell_size={self.cell_size})"
+
+
+def _spans(positions: List[Point]) -> List[float]:
+    if not positions:
+        return [0.0, 0.0, 0.0]
+    return [max(p[axis] for p in positions) - min(p[axis] for p in positions) for axis in range(3)]
+
+
+def _auto_cell_size(spans: Sequence[float], count: int) -> float:
+    """Pick a cell size giving roughly two anchors per occupied cell."""
+    volume = 1.0
+    dims = 0
+    for span in spans:
+        if span > 0:
+            volume *= span
+            dims += 1
+    if count < 2 or not dims:
+        return 1.0
+    return (2.0 * volume / count) ** (1.0 / dims)
@@ -4,25 +4,199 @@ Formatics form elements: Fundamental structural units.
 Defines the base Element class and FormElement composition.
 """
 
-from typing import Any, Optional, Dict
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from dataclasses import dataclass, field
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; vectorized maps fall back to per-value calls.
+    np = None
+
+Transform = Callable[[Any], Any]
+
 
 @dataclass
 class Element:
-    """Base element in Formatics theory."""
+    """Base element in Formatics theory.
+
+    Elements derived with :meth:`transform` share their source's metadata
+    dict copy-on-write: each side copies it the first time its ``metadata``
+    is accessed, so chains that never touch metadata never copy it. Once a
+    dict has been handed out (read through ``metadata`` or passed in by the
+    caller), outside code may still mutate it, so deriving from that element
+    copies it eagerly, as :meth:`transform` always used to.
+    """
 
     value: Any
     metadata: Dict[str, Any] = field(default_factory=dict)
 
-    def transform(self, func) -> "Element":
+    def _derive(self, value: Any) -> "Element":
+        """Return a new element holding *value* and sharing this element's metadata."""
+        derived = Element.__new__(Element)
+        derived.value = value
+        derived._metadata_exposed = False
+        if self._metadata_exposed:
+            derived._metadata = dict(self._metadata)
+            derived._metadata_shared = False
+        else:
+            derived._metadata = self._metadata
+            derived._metadata_shared = self._metadata_shared = True
+        return derived
+
+    def transform(self, func: Transform) -> "Element":
         """Apply transformation to element value."""
-        return Element(value=func(self.value), metadata=self.metadata.copy())
+        return self._derive(func(self.value))
+
+    def lazy(self) -> "LazyElement":
+        """Start a deferred transform chain on this element."""
+        return LazyElement(self)
+
+    def __eq__(self, other: object) -> bool:
+        # Compares the stored dicts, so comparing never copies shared metadata.
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.value, self._metadata) == (other.value, other._metadata)
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        if "metadata" in state:
+            # Pickled before metadata became copy-on-write: a plain, unshared dict.
+            state = dict(state)
+            state["_metadata"] = state.pop("metadata")
+            state.setdefault("_metadata_shared", False)
+            state.setdefault("_metadata_exposed", False)
+        self.__dict__.update(state)
 
     def __repr__(self) -> str:
         return f"Element({self.value})"
 
 
+def _get_metadata(self: Element) -> Dict[str, Any]:
+    if self._metadata_shared:
+        self._metadata = dict(self._metadata)
+        self._metadata_shared = False
+    self._metadata_exposed = True
+    return self._metadata
+
+
+def _set_metadata(self: Element, value: Dict[str, Any]) -> None:
+    self._metadata = value
+    self._metadata_shared = False
+    self._metadata_exposed = True
+
+
+# Installed after @dataclass so the generated __init__, __eq__ and asdict()
+# still treat ``metadata`` as an ordinary field.
+Element.metadata = property(_get_metadata, _set_metadata, doc="Element metadata (copied on first access if shared).")
+
+
+def _fuse(funcs: Tuple[Transform, ...]) -> Transform:
+    """Compose *funcs* (applied left to right) into a single callable."""
+    if not funcs:
+        return lambda value: value
+    if len(funcs) == 1:
+        return funcs[0]
+
+    def fused(value: Any) -> Any:
+        for func in funcs:
+            value = func(value)
+        return value
+
+    return fused
+
+
+class TransformPipeline:
+    """Reusable, fused chain of value transforms.
+
+    Calling a pipeline on an element runs all recorded transforms as one
+    function and allocates a single result element, whose metadata is shared
+    copy-on-write with the input.
+    """
+
+    __slots__ = ("funcs", "_fused")
+
+    def __init__(self, funcs: Tuple[Transform, ...] = ()):
+        """
+        Initialize a pipeline.
+
+        Args:
+            funcs: Transforms to apply, in order
+        """
+        self.funcs = tuple(funcs)
+        self._fused: Optional[Transform] = None
+
+    def then(self, func: Transform) -> "TransformPipeline":
+        """Return a new pipeline with *func* appended."""
+        return TransformPipeline(self.funcs + (func,))
+
+    @property
+    def fused(self) -> Transform:
+        """The whole pipeline as a single value function."""
+        if self._fused is None:
+            self._fused = _fuse(self.funcs)
+        return self._fused
+
+    def __call__(self, element: Element) -> Element:
+        return element._derive(self.fused(element.value))
+
+    def __len__(self) -> int:
+        return len(self.funcs)
+
+    def __repr__(self) -> str:
+        return f"TransformPipeline(steps={len(self.funcs)})"
+
+
+class LazyElement:
+    """An element whose pending transforms run only when its value is needed.
+
+    Chaining :meth:`transform` records functions without calling them. The
+    first access to :attr:`value` runs the fused chain once and caches the
+    result; :meth:`materialize` turns the result into a plain
+    :class:`Element`.
+    """
+
+    __slots__ = ("source", "funcs", "_value", "_done")
+
+    def __init__(self, source: Element, funcs: Tuple[Transform, ...] = ()):
+        """
+        Initialize a lazy element.
+
+        Args:
+            source: Element the chain starts from
+            funcs: Transforms recorded so far, in order
+        """
+        self.source = source
+        self.funcs = funcs
+        self._value: Any = None
+        self._done = False
+
+    def transform(self, func: Transform) -> "LazyElement":
+        """Record *func*; nothing is evaluated yet."""
+        return LazyElement(self.source, self.funcs + (func,))
+
+    def pipeline(self) -> TransformPipeline:
+        """Return the recorded chain as a reusable pipeline."""
+        return TransformPipeline(self.funcs)
+
+    @property
+    def value(self) -> Any:
+        """Result of the chain, computed on first access."""
+        if not self._done:
+            self._value = _fuse(self.funcs)(self.source.value)
+            self._done = True
+        return self._value
+
+    def materialize(self) -> Element:
+        """Evaluate the chain and return it as an :class:`Element`."""
+        return self.source._derive(self.value)
+
+    def __repr__(self) -> str:
+        state = repr(self._value) if self._done else f"{len(self.funcs)} pending"
+        return f"LazyElement({state})"
+
+
 @dataclass
 class FormElement:
     """Composite element with structural form."""
@@ -38,5 +212,153 @@ class FormElement:
         """Compose elements into unified structure."""
         return [e.value for e in self.elements]
 
+    def iter_compose(self) -> Iterator[Any]:
+        """Yield element values one at a time instead of building a list."""
+        for element in self.elements:
+            yield element.value
+
+    def iter_map(
+        self,
+        func: Transform,
+        *,
+        vectorized: bool = False,
+        workers: Optional[int] = None,
+        chunksize: int = 65536,
+    ) -> Iterator[Element]:
+        """Lazily apply *func* to every element value, yielding new elements.
+
+        Values are processed in chunks of *chunksize*, and only a bounded
+        number of chunks is held in memory at a time. Each result shares its
+        source element's metadata copy-on-write, as with
+        :meth:`Element.transform`.
+
+        Args:
+            func: Value transform
+            vectorized: *func* also accepts a NumPy array and works
+                element-wise. Chunks holding only ints or only floats are
+                then passed as one array, provided the results match what
+                per-value calls would return (see :func:`_apply_vectorized`).
+                Otherwise, or without NumPy, *func* is called per value.
+            workers: Run chunks in a process pool of this size. *func* must be
+                a picklable, pure function
+            chunksize: Values per chunk
+        """
+        for derived in self._map_chunks(func, vectorized, workers, chunksize):
+            yield from derived
+
+    def _map_chunks(
+        self, func: Transform, vectorized: bool, workers: Optional[int], chunksize: int
+    ) -> Iterator[List[Element]]:
+        """Yield the derived elements for each chunk, in order."""
+        if chunksize <= 0:
+            raise ValueError("chunksize must be positive")
+        chunks = _chunks(self.elements, chunksize)
+        if workers is None:
+            for chunk in chunks:
+                yield _rewrap(chunk, _apply_chunk(func, [e.value for e in chunk], vectorized))
+            return
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk, values in _bounded_map(pool, func, chunks, vectorized, window=2 * workers):
+                yield _rewrap(chunk, values)
+
+    def map(
+        self,
+        func: Transform,
+        *,
+        vectorized: bool = False,
+        workers: Optional[int] = None,
+        chunksize: int = 65536,
+    ) -> "FormElement":
+        """Apply *func* across all elements and return a new form.
+
+        Takes the same options as :meth:`iter_map`.
+        """
+        elements: List[Element] = []
+        for derived in self._map_chunks(func, vectorized, workers, chunksize):
+            elements.extend(derived)
+        return FormElement(elements=elements, form_type=self.form_type)
+
     def __repr__(self) -> str:
         return f"FormElement(type={self.form_type}, count={len(self.elements)})"
+
+
+def _chunks(elements: Iterable[Element], size: int) -> Iterator[List[Element]]:
+    iterator = iter(elements)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _rewrap(chunk: List[Element], values: Iterable[Any]) -> List[Element]:
+    """Derive one element per value; :meth:`Element._derive` inlined for bulk use."""
+    new = Element.__new__
+    derived_chunk = []
+    append = derived_chunk.append
+    for element, value in zip(chunk, values):
+        derived = new(Element)
+        derived.value = value
+        derived._metadata_exposed = False
+        if element._metadata_exposed:
+            derived._metadata = dict(element._metadata)
+            derived._metadata_shared = False
+        else:
+            derived._metadata = element._metadata
+            derived._metadata_shared = element._metadata_shared = True
+        append(derived)
+    return derived_chunk
+
+
+def _apply_chunk(func: Transform, values: List[Any], vectorized: bool) -> List[Any]:
+    """Apply *func* to a chunk of values, as one array call when that gives the same results."""
+    if vectorized and np is not None and values:
+        result = _apply_vectorized(func, values)
+        if result is not None:
+            return result
+    return [func(value) for value in values]
+
+
+def _apply_vectorized(func: Transform, values: List[Any]) -> Optional[List[Any]]:
+    """Run *func* once over a chunk of only ints or only floats.
+
+    Returns ``None`` (so the caller falls back to per-value calls) whenever
+    the array result could differ from plain Python: mixed or other types,
+    ints outside int64, floating-point errors Python would raise, results
+    that are not numbers, and int64 overflow. Overflow is detected by also
+    evaluating int chunks in float64 and requiring both results to agree.
+    """
+    types = set(map(type, values))
+    if types != {int} and types != {float}:
+        return None
+    ints = types == {int}
+    try:
+        with np.errstate(all="raise"):
+            array = np.array(values, dtype=np.int64 if ints else np.float64)
+            result = np.asarray(func(array))
+            if result.shape != array.shape or result.dtype.kind not in "biuf":
+                return None
+            if ints and not np.array_equal(result, np.asarray(func(array.astype(np.float64)))):
+                return None
+    except (ArithmeticError, TypeError, ValueError):
+        return None
+    return result.tolist()
+
+
+def _bounded_map(
+    pool: Executor,
+    func: Transform,
+    chunks: Iterator[List[Element]],
+    vectorized: bool,
+    window: int,
+) -> Iterator[Tuple[List[Element], List[Any]]]:
+    """Run chunks through *pool* in order, keeping at most *window* in flight."""
+    in_flight: deque = deque()
+    for chunk in chunks:
+        in_flight.append((chunk, pool.submit(_apply_chunk, func, [e.value for e in chunk], vectorized)))
+        if len(in_flight) >= window:
+            done, future = in_flight.popleft()
+            yield done, future.result()
+    while in_flight:
+        done, future = in_flight.popleft()
+        yield done, future.result()
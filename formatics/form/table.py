@@ -0,0 +1,325 @@
+"""
+Formatics form table: Columnar storage for large element sets.
+
+An :class:`ElementTable` keeps elements as a struct of arrays: one column for
+values and one column per metadata key, each with a presence bitmap. This
+avoids a separate Python object and metadata dict for every element.
+"""
+
+from array import array
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from .elements import Element, FormElement, Transform
+
+_INT_MIN = -(1 << 63)
+_INT_MAX = (1 << 63) - 1
+
+
+def _typecode(value: Any) -> Optional[str]:
+    """Array typecode that can hold *value* exactly, or ``None``."""
+    if type(value) is int and _INT_MIN <= value <= _INT_MAX:
+        return "q"
+    if type(value) is float:
+        return "d"
+    return None
+
+
+class _Column:
+    """One column plus a bitmap of the rows that hold a value.
+
+    Storage starts as a typed ``array`` when the first value is a plain int
+    or float and falls back to a list once another kind of value appears.
+    Missing rows hold a zero (or ``None``) placeholder.
+    """
+
+    __slots__ = ("data", "present", "_nulls")
+
+    def __init__(self, rows: int = 0):
+        # ``data`` stays None (counting rows in ``_nulls``) until the first
+        # value arrives and picks the storage type.
+        self.data: Any = None
+        self.present = bytearray((rows + 7) // 8)
+        self._nulls = rows
+
+    def __len__(self) -> int:
+        return self._nulls if self.data is None else len(self.data)
+
+    def has(self, row: int) -> bool:
+        return bool(self.present[row >> 3] >> (row & 7) & 1)
+
+    def _prepare(self, value: Any) -> None:
+        """Make sure ``data`` can hold *value*, typing or widening it if needed."""
+        if self.data is None:
+            code = _typecode(value)
+            self.data = array(code, [0]) * self._nulls if code else [None] * self._nulls
+        elif isinstance(self.data, array) and _typecode(value) != self.data.typecode:
+            self.data = self.data.tolist()
+
+    def append(self, value: Any, present: bool = True) -> None:
+        row = len(self)
+        if row & 7 == 0:
+            self.present.append(0)
+        if not present:
+            if self.data is None:
+                self._nulls += 1
+            else:
+                self.data.append(0 if isinstance(self.data, array) else None)
+            return
+        self._prepare(value)
+        self.data.append(value)
+        self.present[row >> 3] |= 1 << (row & 7)
+
+    def get(self, row: int) -> Any:
+        return self.data[row]
+
+    def set(self, row: int, value: Any) -> None:
+        self._prepare(value)
+        self.data[row] = value
+        self.present[row >> 3] |= 1 << (row & 7)
+
+    def clear(self, row: int) -> None:
+        self.present[row >> 3] &= ~(1 << (row & 7)) & 0xFF
+        if isinstance(self.data, list):
+            self.data[row] = None
+
+    def rows(self) -> Iterator[int]:
+        """Yield the indices of rows that hold a value."""
+        for byte_index, byte in enumerate(self.present):
+            while byte:
+                low = byte & -byte
+                yield (byte_index << 3) + low.bit_length() - 1
+                byte ^= low
+
+    def take(self, indices: Sequence[int]) -> "_Column":
+        taken = _Column(len(indices))
+        data = self.data
+        if data is None:
+            return taken
+        if isinstance(data, array):
+            taken.data = array(data.typecode, [data[i] for i in indices])
+        else:
+            taken.data = [data[i] for i in indices]
+        present = bytearray((len(indices) + 7) // 8)
+        for new, old in enumerate(indices):
+            if self.present[old >> 3] >> (old & 7) & 1:
+                present[new >> 3] |= 1 << (new & 7)
+        taken.present = present
+        return taken
+
+    def nbytes(self) -> int:
+        if self.data is None:
+            return len(self.present)
+        if isinstance(self.data, array):
+            return self.data.itemsize * len(self.data) + len(self.present)
+        return 8 * len(self.data) + len(self.present)
+
+
+class RowMetadata(MutableMapping):
+    """Dict-like view of one row's metadata; writes go to the table's columns."""
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: "ElementTable", row: int):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, key: str) -> Any:
+        column = self._table._columns.get(key)
+        if column is None or not column.has(self._row):
+            raise KeyError(key)
+        return column.get(self._row)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._table._column(key).set(self._row, value)
+
+    def __delitem__(self, key: str) -> None:
+        column = self._table._columns.get(key)
+        if column is None or not column.has(self._row):
+            raise KeyError(key)
+        column.clear(self._row)
+
+    def __iter__(self) -> Iterator[str]:
+        row = self._row
+        return (key for key, column in self._table._columns.items() if column.has(row))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class ElementRow:
+    """Zero-copy view of one table row that behaves like an :class:`Element`."""
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table: "ElementTable", index: int):
+        self.table = table
+        self.index = index
+
+    @property
+    def value(self) -> Any:
+        column = self.table._values
+        return column.get(self.index) if column.has(self.index) else None
+
+    @value.setter
+    def value(self, value: Any) -> None:
+        if value is None:
+            self.table._values.clear(self.index)
+        else:
+            self.table._values.set(self.index, value)
+
+    @property
+    def metadata(self) -> RowMetadata:
+        return RowMetadata(self.table, self.index)
+
+    def transform(self, func: Transform) -> Element:
+        """Apply transformation to the row value, returning a standalone element."""
+        return Element(value=func(self.value), metadata=dict(self.metadata))
+
+    def to_element(self) -> Element:
+        """Copy this row out into a standalone :class:`Element`."""
+        return Element(value=self.value, metadata=dict(self.metadata))
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (Element, ElementRow)):
+            return self.value == other.value and dict(self.metadata) == dict(other.metadata)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Element({self.value})"
+
+
+class ElementTable:
+    """Struct-of-arrays store for many elements.
+
+    Values live in one column and each metadata key in its own column. Rows
+    without a key are marked in that column's presence bitmap instead of
+    storing a per-row dict. Plain int and float columns are kept in typed
+    arrays.
+    """
+
+    def __init__(self, elements: Iterable[Element] = (), form_type: Optional[str] = None):
+        """
+        Initialize a table.
+
+        Args:
+            elements: Elements to copy in as the initial rows
+            form_type: Form type carried over to :meth:`to_form`
+        """
+        self.form_type = form_type
+        self._rows = 0
+        self._values = _Column()
+        self._columns: Dict[str, _Column] = {}
+        self.extend(elements)
+
+    @classmethod
+    def from_form(cls, form: FormElement) -> "ElementTable":
+        """Build a table holding the elements of *form*."""
+        return cls(form.elements, form_type=form.form_type)
+
+    def to_form(self) -> FormElement:
+        """Materialize every row as an :class:`Element` in a new form."""
+        return FormElement(elements=[row.to_element() for row in self], form_type=self.form_type)
+
+    # -- building -----------------------------------------------------------
+
+    def _column(self, key: str) -> _Column:
+        column = self._columns.get(key)
+        if column is None:
+            column = self._columns[key] = _Column(self._rows)
+        return column
+
+    def append(self, value: Any, metadata: Optional[Dict[str, Any]] = None) -> int:
+        """Add a row and return its index."""
+        row = self._rows
+        self._values.append(value, value is not None)
+        metadata = metadata or {}
+        for key, column in self._columns.items():
+            if key in metadata:
+                column.append(metadata[key])
+            else:
+                column.append(None, False)
+        self._rows += 1
+        for key in metadata.keys() - self._columns.keys():
+            self._column(key).set(row, metadata[key])
+        return row
+
+    def extend(self, elements: Iterable[Element]) -> None:
+        """Append every element in *elements*."""
+        for element in elements:
+            self.append(element.value, element.metadata)
+
+    # -- access -------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def __getitem__(self, index: int) -> ElementRow:
+        if index < 0:
+            index += self._rows
+        if not 0 <= index < self._rows:
+            raise IndexError("row index out of range")
+        return ElementRow(self, index)
+
+    def __iter__(self) -> Iterator[ElementRow]:
+        for index in range(self._rows):
+            yield ElementRow(self, index)
+
+    @property
+    def keys(self) -> List[str]:
+        """Metadata keys that have a column."""
+        return list(self._columns)
+
+    def column(self, key: Optional[str] = None) -> List[Any]:
+        """Return a column as a list, with ``None`` for missing rows.
+
+        Args:
+            key: Metadata key, or ``None`` for the value column
+        """
+        column = self._values if key is None else self._columns.get(key)
+        if column is None:
+            return [None] * self._rows
+        if column.data is None:
+            return [None] * self._rows
+        values = list(column.data)
+        for row in range(self._rows):
+            if not column.has(row):
+                values[row] = None
+        return values
+
+    # -- filtering ----------------------------------------------------------
+
+    def take(self, indices: Sequence[int]) -> "ElementTable":
+        """Return a new table holding the given rows, in the given order."""
+        taken = ElementTable(form_type=self.form_type)
+        taken._rows = len(indices)
+        taken._values = self._values.take(indices)
+        taken._columns = {key: column.take(indices) for key, column in self._columns.items()}
+        return taken
+
+    def where(self, predicate: Callable[[Any], bool], key: Optional[str] = None) -> "ElementTable":
+        """Return the rows whose *key* column satisfies *predicate*.
+
+        Only that one column is scanned. Rows where it is missing are skipped.
+
+        Args:
+            predicate: Test applied to each present entry of the column
+            key: Metadata key, or ``None`` for the value column
+        """
+        column = self._values if key is None else self._columns.get(key)
+        if column is None or column.data is None:
+            return self.take([])
+        data = column.data
+        return self.take([row for row in column.rows() if predicate(data[row])])
+
+    # -- accounting ---------------------------------------------------------
+
+    def nbytes(self) -> int:
+        """Approximate bytes used by the column buffers (excluding boxed objects)."""
+        return self._values.nbytes() + sum(column.nbytes() for column in self._columns.values())
+
+    def __repr__(self) -> str:
+        return f"ElementTable(rows={self._rows}, columns={len(self._columns)})"
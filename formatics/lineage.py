@@ -0,0 +1,193 @@
+"""
+Formatics lineage: Full move chains for tracked file elements.
+
+Where :class:`~formatics.filestate.FileState` keeps only ``(origin, current)``,
+a :class:`LineageStore` records every hop a file makes. Path components are
+interned and directories form a shared prefix trie, so common directory
+prefixes are stored once; hops live in flat ``array`` columns with a
+parent pointer to the file's previous hop.
+"""
+
+import os
+from array import array
+from pathlib import Path, PurePath
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from .filestate import FileState
+
+PathLike = Union[str, PurePath]
+
+_NO_PARENT = -1
+
+
+class LineageStore:
+    """Interned, array-backed record of every move made by tracked files.
+
+    Columns (one entry per hop):
+
+    * ``hop_file``: id of the file that made the hop
+    * ``hop_dir``: interned directory the file landed in
+    * ``hop_name``: interned file name at that point
+    * ``hop_prev``: index of the same file's previous hop (``-1`` for the first)
+
+    A per-directory posting list of hop indices answers "which files passed
+    through X" without scanning all hops, and ``file_head`` gives each file's
+    latest hop so its chain is walked in O(chain length).
+    """
+
+    def __init__(self):
+        """Initialize an empty store."""
+        self._name_ids: Dict[str, int] = {}
+        self._names: List[str] = []
+
+        # Directory trie: (parent dir id, component id) -> dir id.
+        self._dir_ids: Dict[Tuple[int, int], int] = {}
+        # Directory string -> dir id, so repeat directories skip the trie walk.
+        self._dir_lookup: Dict[str, int] = {}
+        self._dir_parent = array("q")
+        self._dir_name = array("q")
+        self._dir_children: Dict[int, List[int]] = {}
+        self._dir_hops: Dict[int, array] = {}
+
+        self.hop_file = array("q")
+        self.hop_dir = array("q")
+        self.hop_name = array("q")
+        self.hop_prev = array("q")
+        self.file_head = array("q")
+
+    # -- interning ----------------------------------------------------------
+
+    def _intern_name(self, name: str) -> int:
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = len(self._names)
+            self._name_ids[name] = name_id
+            self._names.append(name)
+        return name_id
+
+    def _intern_dir(self, directory: str) -> int:
+        cached = self._dir_lookup.get(directory)
+        if cached is not None:
+            return cached
+        dir_id = _NO_PARENT
+        for part in PurePath(directory).parts:
+            key = (dir_id, self._intern_name(part))
+            child = self._dir_ids.get(key)
+            if child is None:
+                child = len(self._dir_parent)
+                self._dir_ids[key] = child
+                self._dir_parent.append(dir_id)
+                self._dir_name.append(key[1])
+                self._dir_children.setdefault(dir_id, []).append(child)
+            dir_id = child
+        self._dir_lookup[directory] = dir_id
+        return dir_id
+
+    def _find_dir(self, directory: PurePath) -> Optional[int]:
+        dir_id = _NO_PARENT
+        for part in directory.parts:
+            name_id = self._name_ids.get(part)
+            if name_id is None:
+                return None
+            dir_id = self._dir_ids.get((dir_id, name_id))
+            if dir_id is None:
+                return None
+        return dir_id
+
+    def _dir_path(self, dir_id: int) -> Path:
+        parts = []
+        while dir_id != _NO_PARENT:
+            parts.append(self._names[self._dir_name[dir_id]])
+            dir_id = self._dir_parent[dir_id]
+        return Path(*reversed(parts)) if parts else Path()
+
+    # -- recording ----------------------------------------------------------
+
+    def _append_hop(self, file_id: int, path: PathLike) -> int:
+        hop = len(self.hop_file)
+        directory, name = os.path.split(os.fspath(path))
+        dir_id = self._intern_dir(directory)
+        self.hop_file.append(file_id)
+        self.hop_dir.append(dir_id)
+        self.hop_name.append(self._intern_name(name))
+        self.hop_prev.append(self.file_head[file_id])
+        self.file_head[file_id] = hop
+        postings = self._dir_hops.get(dir_id)
+        if postings is None:
+            postings = self._dir_hops[dir_id] = array("q")
+        postings.append(hop)
+        return hop
+
+    def new_file(self, path: PathLike) -> int:
+        """Start a new chain at *path* and return the file id."""
+        file_id = len(self.file_head)
+        self.file_head.append(_NO_PARENT)
+        self._append_hop(file_id, path)
+        return file_id
+
+    def record_move(self, file_id: int, new_path: PathLike) -> int:
+        """Append a hop to *new_path* for *file_id*; return the hop index."""
+        return self._append_hop(file_id, new_path)
+
+    def track(self, state: FileState) -> int:
+        """Register *state* (origin first, if it differs) and link it to its chain."""
+        file_id = self.new_file(state.origin)
+        if state.path != state.origin:
+            self.record_move(file_id, state.path)
+        state.lineage_id = file_id
+        return file_id
+
+    # -- queries ------------------------------------------------------------
+
+    def _hop_path(self, hop: int) -> Path:
+        return self._dir_path(self.hop_dir[hop]) / self._names[self.hop_name[hop]]
+
+    def chain(self, file_id: int) -> List[Path]:
+        """Return every path *file_id* has occupied, oldest first."""
+        hops = []
+        hop = self.file_head[file_id]
+        while hop != _NO_PARENT:
+            hops.append(hop)
+            hop = self.hop_prev[hop]
+        return [self._hop_path(hop) for hop in reversed(hops)]
+
+    def lineage(self, state: FileState) -> List[Path]:
+        """Return the full chain for a tracked *state*."""
+        if state.lineage_id is None:
+            return [state.origin, state.path] if state.origin != state.path else [state.path]
+        return self.chain(state.lineage_id)
+
+    def current(self, file_id: int) -> Path:
+        """Return the latest path of *file_id*."""
+        return self._hop_path(self.file_head[file_id])
+
+    def _subtree(self, dir_id: int) -> Iterator[int]:
+        stack = [dir_id]
+        while stack:
+            current = stack.pop()
+            yield current
+            stack.extend(self._dir_children.get(current, ()))
+
+    def files_through(self, directory: PathLike, recursive: bool = False) -> List[int]:
+        """Return ids of files that were ever directly in *directory*.
+
+        With ``recursive=True`` files that passed through any subdirectory
+        count too. Cost depends on the matching hops (and, if recursive, the
+        size of the directory subtree), not on the total number of hops.
+        """
+        dir_id = self._find_dir(PurePath(directory))
+        if dir_id is None:
+            return []
+        dirs = self._subtree(dir_id) if recursive else (dir_id,)
+        files = set()
+        hop_file = self.hop_file
+        for current in dirs:
+            for hop in self._dir_hops.get(current, ()):
+                files.add(hop_file[hop])
+        return sorted(files)
+
+    def __len__(self) -> int:
+        return len(self.file_head)
+
+    def __repr__(self) -> str:
+        return f"LineageStore(files={len(self.file_head)}, hops={len(self.hop_file)})"
@@ -4,6 +4,8 @@ Formatics logs: Transformation history and audit trails.
 Maintains comprehensive records of element transformations.
 """
 
-from .history import History, HistoryEntry
+from .history import History, HistoryEntry, ShardedHistory
+from .journal import Journal, JournalReader
+from .replay import Checkpoint, Replay
 
-__all__ = ["History", "HistoryEntry"]
+__all__ = ["History", "HistoryEntry", "ShardedHistory", "Journal", "JournalReader", "Replay", "Checkpoint"]
@@ -4,55 +4,589 @@ Formatics history: Comprehensive transformation logging.
 Records and retrieves element transformation history.
 """
 
-from typing import Any, List, Optional
-from dataclasses import dataclass, field
+import itertools
+from itertools import chain
+import threading
+from array import array
+from bisect import bisect_left
+from operator import itemgetter
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 from datetime import datetime
 
+from .._clock import from_datetime, monotonic_ns, to_datetime
+
+if TYPE_CHECKING:
+    from .journal import Journal
+
 
-@dataclass
 class HistoryEntry:
-    """Single entry in transformation history."""
+    """Single entry in transformation history.
+
+    Entries use ``__slots__`` and store an integer monotonic-ns timestamp;
+    ``timestamp`` converts it to a ``datetime`` on access. An empty
+    metadata dict is only allocated when it is first accessed.
+    """
+
+    __slots__ = ("timestamp_ns", "action", "element", "_metadata")
+
+    def __init__(
+        self,
+        timestamp: Optional[datetime] = None,
+        action: str = "",
+        element: Any = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        *,
+        timestamp_ns: Optional[int] = None,
+    ):
+        """
+        Initialize HistoryEntry.
+
+        Args:
+            timestamp: When the event happened (defaults to now)
+            action: Action name
+            element: Element the action applied to
+            metadata: Extra fields recorded with the event
+            timestamp_ns: Monotonic-ns timestamp, instead of *timestamp*
+        """
+        if timestamp_ns is None:
+            timestamp_ns = monotonic_ns() if timestamp is None else from_datetime(timestamp)
+        self.timestamp_ns = timestamp_ns
+        self.action = action
+        self.element = element
+        self._metadata = metadata or None
+
+    @property
+    def timestamp(self) -> datetime:
+        """Event time as a ``datetime`` (derived from ``timestamp_ns``)."""
+        return to_datetime(self.timestamp_ns)
 
-    timestamp: datetime
-    action: str
-    element: Any
-    metadata: dict = field(default_factory=dict)
+    @timestamp.setter
+    def timestamp(self, value: datetime) -> None:
+        self.timestamp_ns = from_datetime(value)
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Free-form metadata, created on first access."""
+        if self._metadata is None:
+            self._metadata = {}
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, value: Dict[str, Any]) -> None:
+        self._metadata = value
+
+    def __setstate__(self, state: Any) -> None:
+        if isinstance(state, tuple):
+            # Current layout: (None, slot values).
+            state = state[1]
+        else:
+            # Pickled while HistoryEntry was a dataclass: a plain instance dict.
+            state = dict(state)
+            state["timestamp_ns"] = from_datetime(state.pop("timestamp"))
+            state["_metadata"] = state.pop("metadata", None) or None
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, HistoryEntry):
+            return NotImplemented
+        return (self.timestamp_ns, self.action, self.element, self.metadata) == (
+            other.timestamp_ns,
+            other.action,
+            other.element,
+            other.metadata,
+        )
 
     def __repr__(self) -> str:
         return f"HistoryEntry({self.action} at {self.timestamp.isoformat()})"
 
 
-class History:
-    """Maintains transformation history log."""
+TimeBound = Union[datetime, int, None]
+
+
+class _Postings:
+    """Ascending sequence numbers of one action's entries.
+
+    Evicted entries are always the oldest, so they are dropped by moving
+    ``head`` forward; the array is compacted once the dead prefix is as long
+    as the live part, so it never holds more than twice the live entries.
+    """
+
+    __slots__ = ("seqs", "head")
 
     def __init__(self):
-        """Initialize empty history."""
-        self.entries: List[HistoryEntry] = []
+        self.seqs = array("q")
+        self.head = 0
+
+    def drop_oldest(self) -> None:
+        self.head += 1
+        if self.head * 2 >= len(self.seqs):
+            del self.seqs[: self.head]
+            self.head = 0
+
+    def __len__(self) -> int:
+        return len(self.seqs) - self.head
+
+
+class _TimeView(Sequence):
+    """Timestamps of the entries numbered by *seqs*, for ``bisect``."""
+
+    __slots__ = ("_time_of", "_seqs")
+
+    def __init__(self, time_of: Callable[[int], int], seqs: Sequence[int]):
+        self._time_of = time_of
+        self._seqs = seqs
+
+    def __len__(self) -> int:
+        return len(self._seqs)
+
+    def __getitem__(self, index: int) -> int:
+        return self._time_of(self._seqs[index])
+
+
+class _EntryList(list):
+    """Snapshot returned by :attr:`History.entries`; in-place changes raise."""
+
+    __slots__ = ()
+
+    def _read_only(self, *args: Any, **kwargs: Any) -> None:
+        raise TypeError(
+            "History.entries is a snapshot; use History.append() or assign a new sequence to History.entries"
+        )
+
+    append = extend = insert = remove = pop = clear = sort = reverse = _read_only
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+class History:
+    """Maintains transformation history log.
+
+    By default the log grows without bound. With a *capacity* it becomes a
+    fixed-size ring buffer: once full, each new entry overwrites the oldest
+    one, which is first passed to *on_evict* (e.g. to spill it to disk).
+    With a *journal*, every appended entry is also written to disk.
+
+    Every entry gets a sequence number. Secondary indexes (per-action
+    posting lists of sequence numbers and a column of timestamps in
+    sequence order) let :meth:`query` find matches with ``bisect`` instead
+    of scanning the log. Indexes reflect each entry's action and timestamp
+    at the time it was appended.
+    """
+
+    def __init__(
+        self,
+        capacity: Optional[int] = None,
+        on_evict: Optional[Callable[[HistoryEntry], None]] = None,
+        journal: Optional["Journal"] = None,
+    ):
+        """
+        Initialize empty history.
+
+        Args:
+            capacity: Maximum number of entries kept, or ``None`` for unbounded
+            on_evict: Called with each entry dropped to make room
+            journal: Persistent journal that receives every appended entry
+        """
+        if capacity is not None and capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.on_evict = on_evict
+        self.journal = journal
+        self._reset()
+
+    def _reset(self) -> None:
+        capacity = self.capacity
+        self._entries: List[Optional[HistoryEntry]] = [] if capacity is None else [None] * capacity
+        self._times = array("q") if capacity is None else array("q", [0]) * capacity
+        # Ring buffer state: index of the oldest entry and number of entries held.
+        self._start = 0
+        self._size = 0
+        self._total = 0
+        self._postings: Dict[str, _Postings] = {}
+        self._last_ns: Optional[int] = None
+        # False once an entry arrives with an earlier timestamp than its predecessor.
+        self._time_sorted = True
+
+    @property
+    def entries(self) -> List[HistoryEntry]:
+        """Entries oldest first, as a new read-only list.
+
+        The list is a snapshot: methods that would change it in place (such
+        as ``append``) raise ``TypeError``, since they could never reach the
+        history. Assign a sequence of entries to ``entries`` to replace the
+        log; the indexes are rebuilt (and the journal, if any, is not
+        written).
+        """
+        return _EntryList(self)
+
+    @entries.setter
+    def entries(self, entries: Iterable[HistoryEntry]) -> None:
+        self._reset()
+        for entry in entries:
+            self._add(entry)
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        if "entries" in state:
+            # Pickled before the ring buffer and indexes existed: only the entry list.
+            self.__init__()
+            self.entries = state["entries"]
+            return
+        self.__dict__.update(state)
+
+    def append(self, entry: HistoryEntry) -> None:
+        """Add an existing entry, evicting the oldest if at capacity."""
+        if self.journal is not None:
+            self.journal.append(entry)
+        self._add(entry)
+
+    def _add(self, entry: HistoryEntry) -> None:
+        """Store and index *entry* in memory."""
+        seq = self._total
+        ns = entry.timestamp_ns
+        if self._last_ns is not None and ns < self._last_ns:
+            self._time_sorted = False
+        self._last_ns = ns
+        postings = self._postings.get(entry.action)
+        if postings is None:
+            postings = self._postings[entry.action] = _Postings()
+        postings.seqs.append(seq)
+        self._total += 1
+
+        if self.capacity is None:
+            self._entries.append(entry)
+            self._times.append(ns)
+            return
+        slot = seq % self.capacity
+        evicted = self._entries[slot] if self._size == self.capacity else None
+        self._entries[slot] = entry
+        self._times[slot] = ns
+        if evicted is None:
+            self._size += 1
+            return
+        self._start = (self._start + 1) % self.capacity
+        postings = self._postings[evicted.action]
+        postings.drop_oldest()
+        if not postings:
+            # Forget actions with no retained entries so the index stays bounded too.
+            del self._postings[evicted.action]
+        if self.on_evict is not None:
+            self.on_evict(evicted)
 
     def record(self, action: str, element: Any, **metadata) -> None:
         """Record a transformation event."""
-        entry = HistoryEntry(
-            timestamp=datetime.now(),
-            action=action,
-            element=element,
-            metadata=metadata
-        )
-        self.entries.append(entry)
+        self.append(HistoryEntry(action=action, element=element, metadata=metadata, timestamp_ns=monotonic_ns()))
 
     def get_recent(self, n: int = 10) -> List[HistoryEntry]:
         """Get n most recent entries."""
-        return self.entries[-n:]
+        if n <= 0:
+            return []
+        if self.capacity is None:
+            return self._entries[-n:]
+        n = min(n, self._size)
+        end = self._start + self._size
+        return [self._entries[i % self.capacity] for i in range(end - n, end)]
 
     def filter_by_action(self, action: str) -> List[HistoryEntry]:
         """Get all entries matching action type."""
-        return [e for e in self.entries if e.action == action]
+        return list(self.query(action=action))
+
+    # -- sequence cursor ----------------------------------------------------
+
+    @property
+    def first_seq(self) -> int:
+        """Sequence number of the oldest entry still held."""
+        return self._total - len(self)
+
+    @property
+    def end_seq(self) -> int:
+        """Sequence number the next appended entry will get."""
+        return self._total
+
+    def since_seq(self, seq: int) -> Iterator[HistoryEntry]:
+        """Lazily yield the entries numbered *seq* and later, oldest first.
+
+        Entries appended while iterating are not included. Use this to
+        resume reading where an earlier pass stopped (at its ``end_seq``);
+        unlike time bounds it never skips or repeats an entry.
+
+        Raises:
+            ValueError: If entries from *seq* on were already evicted
+        """
+        if seq < self.first_seq:
+            raise ValueError(f"entry {seq} was evicted; the oldest held is {self.first_seq}")
+        return map(self._entry, range(seq, self._total))
+
+    # -- indexed queries ----------------------------------------------------
+
+    def _entry(self, seq: int) -> HistoryEntry:
+        return self._entries[seq if self.capacity is None else seq % self.capacity]
+
+    def _time_of(self, seq: int) -> int:
+        return self._times[seq if self.capacity is None else seq % self.capacity]
+
+    def _locate(self, seqs: Sequence[int], lo: int, since: Optional[int], until: Optional[int]) -> range:
+        """Positions in *seqs* (from *lo*) of entries with ``since <= timestamp < until``."""
+        times = _TimeView(self._time_of, seqs)
+        if since is not None:
+            lo = bisect_left(times, since, lo)
+        hi = len(seqs) if until is None else bisect_left(times, until, lo)
+        return range(lo, max(lo, hi))
+
+    def query(
+        self,
+        action: Optional[str] = None,
+        since: TimeBound = None,
+        until: TimeBound = None,
+        limit: Optional[int] = None,
+        newest_first: bool = False,
+    ) -> Iterator[HistoryEntry]:
+        """Lazily yield entries matching *action* with ``since <= timestamp < until``.
+
+        Bounds may be ``datetime`` objects or monotonic-ns integers. Matching
+        entries are located by bisecting the indexes, so the cost grows with
+        the number of results, not with the size of the log. (If entries
+        were appended out of time order, time bounds fall back to a scan of
+        the candidates.)
+
+        Args:
+            action: Only entries with this action
+            since: Inclusive lower time bound
+            until: Exclusive upper time bound
+            limit: Stop after this many entries
+            newest_first: Yield the most recent matches first
+        """
+        since_ns = from_datetime(since) if isinstance(since, datetime) else since
+        until_ns = from_datetime(until) if isinstance(until, datetime) else until
+        if action is None:
+            seqs: Sequence[int] = range(self.first_seq, self._total)
+            head = 0
+        else:
+            postings = self._postings.get(action)
+            if postings is None:
+                return iter(())
+            seqs, head = postings.seqs, postings.head
+
+        if not self._time_sorted:
+            return self._scan(seqs[head:], since_ns, until_ns, limit, newest_first)
+        positions = self._locate(seqs, head, since_ns, until_ns)
+        if limit is not None:
+            limit = max(limit, 0)
+            positions = positions[max(len(positions) - limit, 0) :] if newest_first else positions[:limit]
+        # Copy just the matching sequence numbers so later appends cannot disturb iteration.
+        matched = seqs[positions.start : positions.stop]
+        if newest_first:
+            matched = reversed(matched)
+        return map(self._entry, matched)
+
+    def _scan(self, seqs, since, until, limit, newest_first) -> Iterator[HistoryEntry]:
+        """Fallback for logs whose entries were appended out of time order."""
+        if limit is not None and limit <= 0:
+            return
+        produced = 0
+        for seq in reversed(seqs) if newest_first else seqs:
+            ns = self._time_of(seq)
+            if (since is not None and ns < since) or (until is not None and ns >= until):
+                continue
+            yield self._entry(seq)
+            produced += 1
+            if produced == limit:
+                return
 
     def clear(self) -> None:
         """Clear all history."""
-        self.entries.clear()
+        self._reset()
+
+    def __iter__(self) -> Iterator[HistoryEntry]:
+        if self.capacity is None:
+            return iter(self._entries)
+        entries, capacity, start = self._entries, self.capacity, self._start
+        return (entries[(start + i) % capacity] for i in range(self._size))
+
+    def __len__(self) -> int:
+        return len(self._entries) if self.capacity is None else self._size
+
+    def __repr__(self) -> str:
+        if self.capacity is None:
+            return f"History(entries={len(self)})"
+        return f"History(entries={len(self)}, capacity={self.capacity})"
+
+
+class _Shard:
+    """One thread's append buffer, flat: ``[entry, seq, entry, seq, ...]``."""
+
+    __slots__ = ("thread", "rows", "lock")
+
+    def __init__(self, thread: threading.Thread):
+        self.thread = thread
+        self.rows: List[Any] = []
+        # Held while rows are removed (merging or trimming); appends never take it.
+        self.lock = threading.Lock()
+
+
+class ShardedHistory:
+    """History that many threads can record into without a shared lock.
+
+    Each thread appends to its own buffer, and a global ``itertools.count``
+    hands out sequence numbers; taking a number and appending the row
+    happen in one C-level call, so no row is ever half-written. Reads first
+    merge the buffers, in sequence order, into a regular :class:`History`,
+    so queries, indexes, capacity and journalling behave exactly as they do
+    there. A thread can be preempted between stamping its entry and drawing
+    its number, so merging raises any timestamp older than its predecessor's
+    to match; the merged log stays in time order.
+
+    With a *capacity*, a thread whose buffer reaches twice the capacity
+    drops its oldest rows down to *capacity* (they could never be among the
+    newest *capacity* entries) and passes them to *on_evict* from that
+    thread, so writer-only workloads stay bounded. With a journal, which
+    must see every entry, the writer merges instead.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, **kwargs):
+        """
+        Initialize empty sharded history.
+
+        Args:
+            capacity: Maximum number of merged entries kept
+            **kwargs: Further :class:`History` options (``on_evict``, ``journal``)
+        """
+        self._merged = History(capacity=capacity, **kwargs)
+        self._counter = itertools.count()
+        # Buffers hold two items per record and are trimmed at twice the capacity.
+        self._limit = None if capacity is None else 4 * capacity
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._registry_lock = threading.Lock()
+        self._merge_lock = threading.Lock()
+        self._pending: List[Tuple[HistoryEntry, int]] = []
+
+    def _shard(self) -> _Shard:
+        shard = _Shard(threading.current_thread())
+        with self._registry_lock:
+            self._shards.append(shard)
+        self._local.shard = shard
+        return shard
+
+    def record(self, action: str, element: Any, **metadata) -> None:
+        """Record a transformation event from any thread."""
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._shard()
+        entry = HistoryEntry(action=action, element=element, metadata=metadata, timestamp_ns=monotonic_ns())
+        rows = shard.rows
+        # zip() draws the sequence number inside list.extend(), so it cannot be
+        # taken without both items landing. The entry comes first so zip stops
+        # without drawing a number it would then discard. Storing the pair flat
+        # rather than as a tuple keeps the collector's work per record down.
+        rows.extend(chain.from_iterable(zip((entry,), self._counter)))
+        if self._limit is not None and len(rows) >= self._limit:
+            self._overflow(shard)
+
+    def _overflow(self, shard: _Shard) -> None:
+        merged = self._merged
+        if merged.journal is not None:
+            self.merge()
+            return
+        with shard.lock:
+            excess = len(shard.rows) - 2 * merged.capacity
+            dropped = shard.rows[0:excess:2] if excess > 0 else []
+            del shard.rows[: 2 * len(dropped)]
+        if merged.on_evict is not None:
+            for entry in dropped:
+                merged.on_evict(entry)
+
+    def merge(self) -> History:
+        """Move every record made so far into the merged log and return it."""
+        with self._merge_lock:
+            # Every number below the watermark was drawn before this point, and
+            # drawing a number appends its row, so those rows are all in a
+            # buffer already or were dropped by a trim. Later rows wait.
+            watermark = next(self._counter)
+            with self._registry_lock:
+                shards = list(self._shards)
+            pending = self._pending
+            for shard in shards:
+                # Checked before taking the rows: a thread still running here
+                # may append and exit before the rows are read.
+                finished = not shard.thread.is_alive()
+                with shard.lock:
+                    rows = shard.rows[:]
+                    # Slice deletion is a single operation, so concurrent appends are kept.
+                    del shard.rows[: len(rows)]
+                if rows:
+                    pending.extend(zip(rows[0::2], rows[1::2]))
+                elif finished:
+                    # A finished thread can no longer append, so its empty buffer can go.
+                    with self._registry_lock:
+                        self._shards.remove(shard)
+            pending.sort(key=itemgetter(1))
+            ready = 0
+            for _, seq in pending:
+                if seq > watermark:
+                    break
+                ready += 1
+            merged = self._merged
+            append = merged.append
+            last_ns = merged._last_ns
+            for entry, _ in pending[:ready]:
+                if last_ns is not None and entry.timestamp_ns < last_ns:
+                    entry.timestamp_ns = last_ns
+                last_ns = entry.timestamp_ns
+                append(entry)
+            del pending[:ready]
+            return self._merged
+
+    @property
+    def entries(self) -> List[HistoryEntry]:
+        """Merged entries in sequence order."""
+        return self.merge().entries
+
+    def get_recent(self, n: int = 10) -> List[HistoryEntry]:
+        """Get n most recent entries."""
+        return self.merge().get_recent(n)
+
+    def filter_by_action(self, action: str) -> List[HistoryEntry]:
+        """Get all entries matching action type."""
+        return self.merge().filter_by_action(action)
+
+    def query(self, *args, **kwargs) -> Iterator[HistoryEntry]:
+        """Merge, then run :meth:`History.query` on the merged log."""
+        return self.merge().query(*args, **kwargs)
+
+    @property
+    def first_seq(self) -> int:
+        """Merge, then return the merged log's :attr:`History.first_seq`."""
+        return self.merge().first_seq
+
+    @property
+    def end_seq(self) -> int:
+        """Merge, then return the merged log's :attr:`History.end_seq`."""
+        return self.merge().end_seq
+
+    def since_seq(self, seq: int) -> Iterator[HistoryEntry]:
+        """Merge, then run :meth:`History.since_seq` on the merged log."""
+        return self.merge().since_seq(seq)
+
+    def clear(self) -> None:
+        """Clear all history, including records not merged yet."""
+        with self._merge_lock:
+            with self._registry_lock:
+                shards = list(self._shards)
+            for shard in shards:
+                with shard.lock:
+                    del shard.rows[:]
+            self._pending.clear()
+            self._merged.clear()
+
+    def __iter__(self) -> Iterator[HistoryEntry]:
+        return iter(self.merge())
 
     def __len__(self) -> int:
-        return len(self.entries)
+        return len(self.merge())
 
     def __repr__(self) -> str:
-        return f"History(entries={len(self.entries)})"
+        return f"ShardedHistory(entries={len(self)}, shards={len(self._shards)})"
@@ -0,0 +1,594 @@
+"""
+Formatics journal: Persistent, append-only storage for history entries.
+
+A :class:`Journal` writes :class:`~formatics.logs.history.HistoryEntry`
+records to a directory of numbered segment files. Each record is length
+prefixed and checksummed. Writes are buffered and flushed in batches under a
+configurable fsync policy. Segments rotate by size. When a segment is sealed,
+a sparse timestamp index is written next to it, and small sealed segments
+are merged (optionally dropping expired records) on a background thread.
+A merged segment is named after the range of segments it replaces and only
+takes their place once it is renamed into the directory, so a crash during
+compaction never leaves records twice or an index for the wrong file.
+
+:class:`JournalReader` maps segments with ``mmap`` and decodes records as it
+iterates. Seeking by timestamp picks the segment from each segment's first
+record header, then bisects that segment's sparse index, so only the records
+near the requested time are read. That needs records in time order; once one
+is appended out of order the journal says so on disk and readers scan it
+whole instead.
+"""
+
+import mmap
+import os
+import pickle
+import struct
+import threading
+import zlib
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+from .._clock import from_datetime, from_epoch_ns, monotonic_ns, to_epoch_ns
+from .history import History, HistoryEntry
+
+PathLike = Union[str, os.PathLike]
+TimeBound = Union[datetime, int, None]
+
+_MAGIC = b"FMJRNL1\0"
+# payload length, CRC-32 of the payload, timestamp (ns since the epoch)
+_RECORD = struct.Struct("<IIq")
+_SEGMENT_SUFFIX = ".seg"
+_INDEX_SUFFIX = ".idx"
+_COMPACT_SUFFIX = ".compact"
+# Present once a record was appended with an earlier timestamp than one before it.
+_UNSORTED_MARKER = "UNSORTED"
+_FSYNC_POLICIES = ("always", "batch", "never")
+
+_SegmentFile = Tuple[int, int, Path]
+
+
+def _segment_name(number: int) -> str:
+    return f"{number:08d}{_SEGMENT_SUFFIX}"
+
+
+def _merged_name(first: int, last: int, generation: int) -> str:
+    return f"{first:08d}-{last:08d}.{generation}{_SEGMENT_SUFFIX}"
+
+
+def _parse_name(path: Path) -> Optional[Tuple[int, int, int]]:
+    """``(first, last, generation)`` for a segment file name, or ``None``.
+
+    Written segments are named ``NNNNNNNN.seg``; a merge of segments
+    ``first`` to ``last`` is named ``FFFFFFFF-LLLLLLLL.G.seg``.
+    """
+    numbers, _, generation = path.stem.partition(".")
+    first, _, last = numbers.partition("-")
+    if not first.isdigit() or bool(last) != bool(generation):
+        return None
+    if last and not (last.isdigit() and generation.isdigit()):
+        return None
+    return int(first), int(last or first), int(generation or 0)
+
+
+def _all_segments(directory: Path) -> Tuple[List[_SegmentFile], List[Path]]:
+    """Live segments as ``(first, last, path)`` in log order, and superseded segment files.
+
+    A segment is superseded once a merge covering its whole range (or the
+    same range, in a later generation) has been renamed into place.
+    """
+    found = []
+    for path in directory.glob(f"*{_SEGMENT_SUFFIX}"):
+        parsed = _parse_name(path)
+        if parsed is not None:
+            found.append((parsed, path))
+    # Covering segments sort before the ones they cover.
+    found.sort(key=lambda item: (item[0][0], -item[0][1], -item[0][2]))
+    live: List[_SegmentFile] = []
+    superseded: List[Path] = []
+    reach = -1
+    for (first, last, _), path in found:
+        if last <= reach:
+            superseded.append(path)
+            continue
+        live.append((first, last, path))
+        reach = last
+    return live, superseded
+
+
+def _list_segments(directory: Path) -> List[_SegmentFile]:
+    return _all_segments(directory)[0]
+
+
+def _fsync_directory(directory: Path) -> None:
+    """Make renames in *directory* durable (a no-op where directories cannot be opened)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _encode(entry: HistoryEntry) -> bytes:
+    payload = pickle.dumps((entry.action, entry.element, entry._metadata), protocol=pickle.HIGHEST_PROTOCOL)
+    return _RECORD.pack(len(payload), zlib.crc32(payload), to_epoch_ns(entry.timestamp_ns)) + payload
+
+
+def _decode(buffer, epoch_ns: int, start: int, stop: int) -> HistoryEntry:
+    action, element, metadata = pickle.loads(buffer[start:stop])
+    return HistoryEntry(action=action, element=element, metadata=metadata, timestamp_ns=from_epoch_ns(epoch_ns))
+
+
+def _scan(buffer, offset: int, end: int) -> Iterator[Tuple[int, int, int, int]]:
+    """Yield ``(offset, epoch_ns, payload_start, payload_end)`` for intact records.
+
+    Stops at the first truncated or corrupt record, which is where a crash
+    mid-write leaves the tail of the active segment.
+    """
+    while offset + _RECORD.size <= end:
+        length, crc, epoch_ns = _RECORD.unpack_from(buffer, offset)
+        start = offset + _RECORD.size
+        stop = start + length
+        if stop > end or zlib.crc32(buffer[start:stop]) != crc:
+            return
+        yield offset, epoch_ns, start, stop
+        offset = stop
+
+
+def _write_index(path: Path, index: array) -> None:
+    tmp = path.with_suffix(_INDEX_SUFFIX + ".tmp")
+    with open(tmp, "wb") as handle:
+        index.tofile(handle)
+    os.replace(tmp, path.with_suffix(_INDEX_SUFFIX))
+
+
+def _first_epoch(path: Path) -> int:
+    """Timestamp of a segment's first record (or 0 if it has none)."""
+    with open(path, "rb") as handle:
+        handle.seek(len(_MAGIC))
+        header = handle.read(_RECORD.size)
+    return _RECORD.unpack(header)[2] if len(header) == _RECORD.size else 0
+
+
+def _last_epoch(path: Path) -> Optional[int]:
+    """Timestamp of a sealed segment's last record, scanning on from its last index point."""
+    index = array("q")
+    with open(path.with_suffix(_INDEX_SUFFIX), "rb") as handle:
+        index.frombytes(handle.read())
+    last = None
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size <= len(_MAGIC):
+            return None
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for _, epoch_ns, _, _ in _scan(mapped, index[-1] if index else len(_MAGIC), len(mapped)):
+                last = epoch_ns
+    return last
+
+
+def _as_epoch(bound: TimeBound) -> Optional[int]:
+    if bound is None:
+        return None
+    return to_epoch_ns(from_datetime(bound) if isinstance(bound, datetime) else bound)
+
+
+class Journal:
+    """Append-only, segmented on-disk log of history entries.
+
+    Args:
+        directory: Where segment files live (created if missing)
+        segment_size: Rotate to a new segment once the active one reaches this many bytes
+        fsync: ``"always"`` fsyncs after every record, ``"batch"`` after every
+            buffer flush, ``"never"`` leaves durability to the OS
+        batch_bytes: Flush the write buffer once it holds this many bytes
+        batch_records: Flush the write buffer once it holds this many records
+        index_every: Record one sparse-index point every this many records
+        retention_ns: During compaction, drop records older than this many
+            nanoseconds (``None`` keeps everything)
+        compact_after: Start a background compaction once this many small
+            sealed segments exist (``0`` disables automatic compaction)
+    """
+
+    def __init__(
+        self,
+        directory: PathLike,
+        segment_size: int = 64 << 20,
+        fsync: str = "batch",
+        batch_bytes: int = 1 << 20,
+        batch_records: int = 4096,
+        index_every: int = 256,
+        retention_ns: Optional[int] = None,
+        compact_after: int = 8,
+    ):
+        if fsync not in _FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {_FSYNC_POLICIES}")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+        self.fsync = fsync
+        self.batch_bytes = batch_bytes
+        self.batch_records = batch_records
+        self.index_every = index_every
+        self.retention_ns = retention_ns
+        self.compact_after = compact_after
+
+        self._lock = threading.Lock()
+        # Held while segments are renamed or deleted, so readers see a stable list.
+        self._files_lock = threading.Lock()
+        self._buffer = bytearray()
+        self._buffered = 0
+        self._compactor: Optional[threading.Thread] = None
+        self._sorted = not (self.directory / _UNSORTED_MARKER).exists()
+        self._last_epoch: Optional[int] = None
+        self._remove_leftovers()
+        self._open_active()
+
+    def _remove_leftovers(self) -> None:
+        """Delete what an interrupted compaction left behind."""
+        _, superseded = _all_segments(self.directory)
+        for path in superseded:
+            path.unlink()
+            path.with_suffix(_INDEX_SUFFIX).unlink(missing_ok=True)
+        for path in self.directory.glob(f"*{_COMPACT_SUFFIX}"):
+            path.unlink()
+        for path in self.directory.glob(f"*{_INDEX_SUFFIX}*"):
+            # Temporary index files, and indexes whose merged segment never landed.
+            if path.suffix != _INDEX_SUFFIX or not path.with_suffix(_SEGMENT_SUFFIX).exists():
+                path.unlink()
+
+    # -- writing ------------------------------------------------------------
+
+    def _open_active(self) -> None:
+        segments = _list_segments(self.directory)
+        if segments and not segments[-1][2].with_suffix(_INDEX_SUFFIX).exists():
+            self._number, _, path = segments.pop()
+        else:
+            self._number = segments[-1][1] + 1 if segments else 1
+            path = self.directory / _segment_name(self._number)
+        if segments and self._sorted:
+            self._last_epoch = _last_epoch(segments[-1][2])
+        self._handle = open(path, "a+b")
+        self._index = array("q")
+        self._records = 0
+        self._handle.seek(0, os.SEEK_END)
+        if self._handle.tell() == 0:
+            self._handle.write(_MAGIC)
+            self._size = len(_MAGIC)
+            return
+        # Reopening after a restart: rebuild the sparse index and cut off a torn tail.
+        with mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            end = len(_MAGIC)
+            for offset, epoch_ns, _, stop in _scan(mapped, len(_MAGIC), len(mapped)):
+                self._note_record(offset, epoch_ns)
+                end = stop
+        self._handle.truncate(end)
+        self._handle.seek(end)
+        self._size = end
+
+    def _note_record(self, offset: int, epoch_ns: int) -> None:
+        if self._records % self.index_every == 0:
+            self._index.extend((epoch_ns, offset))
+        self._records += 1
+        if self._last_epoch is not None and epoch_ns < self._last_epoch:
+            if self._sorted:
+                self._mark_unsorted()
+        else:
+            self._last_epoch = epoch_ns
+
+    def _mark_unsorted(self) -> None:
+        """Record on disk, before the out-of-order record itself, that seeking is unsafe."""
+        with open(self.directory / _UNSORTED_MARKER, "wb") as handle:
+            os.fsync(handle.fileno())
+        _fsync_directory(self.directory)
+        self._sorted = False
+
+    def append(self, entry: HistoryEntry) -> None:
+        """Buffer *entry* for writing, flushing according to the batch settings."""
+        record = _encode(entry)
+        with self._lock:
+            if self._size + len(self._buffer) + len(record) > self.segment_size and self._records:
+                self._rotate()
+            self._note_record(self._size + len(self._buffer), to_epoch_ns(entry.timestamp_ns))
+            self._buffer += record
+            self._buffered += 1
+            if (
+                self.fsync == "always"
+                or len(self._buffer) >= self.batch_bytes
+                or self._buffered >= self.batch_records
+            ):
+                self._flush()
+
+    def record(self, action: str, element, **metadata) -> HistoryEntry:
+        """Create, journal and return a new entry."""
+        entry = HistoryEntry(action=action, element=element, metadata=metadata, timestamp_ns=monotonic_ns())
+        self.append(entry)
+        return entry
+
+    def _flush(self) -> None:
+        if self._buffer:
+            self._handle.write(self._buffer)
+            self._size += len(self._buffer)
+            self._buffer.clear()
+            self._buffered = 0
+        self._handle.flush()
+        if self.fsync != "never":
+            os.fsync(self._handle.fileno())
+
+    def flush(self) -> None:
+        """Write buffered records to the active segment now."""
+        with self._lock:
+            self._flush()
+
+    def rotate(self) -> None:
+        """Seal the active segment (writing its index) and start a new one."""
+        with self._lock:
+            if self._records:
+                self._rotate()
+
+    def _rotate(self) -> None:
+        self._flush()
+        if self.fsync == "never":
+            os.fsync(self._handle.fileno())
+        path = Path(self._handle.name)
+        self._handle.close()
+        _write_index(path, self._index)
+        self._number += 1
+        self._handle = open(self.directory / _segment_name(self._number), "a+b")
+        self._handle.write(_MAGIC)
+        self._size = len(_MAGIC)
+        self._index = array("q")
+        self._records = 0
+        if self.compact_after and len(self._small_sealed()) >= self.compact_after:
+            self.compact(wait=False)
+
+    def close(self) -> None:
+        """Flush, fsync and close the active segment; wait for compaction."""
+        with self._lock:
+            if self._handle.closed:
+                return
+            self._flush()
+            os.fsync(self._handle.fileno())
+            self._handle.close()
+        if self._compactor is not None:
+            self._compactor.join()
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # -- compaction ---------------------------------------------------------
+
+    def _small_sealed(self) -> List[_SegmentFile]:
+        return [
+            segment
+            for segment in _list_segments(self.directory)
+            if segment[1] < self._number and segment[2].stat().st_size < self.segment_size // 2
+        ]
+
+    def compact(self, wait: bool = True) -> None:
+        """Merge runs of small sealed segments and drop expired records.
+
+        With ``wait=False`` the work runs on a background thread. At most
+        one compaction runs at a time.
+        """
+        if self._compactor is not None and self._compactor.is_alive():
+            if wait:
+                self._compactor.join()
+            return
+        self._compactor = threading.Thread(target=self._compact, name="journal-compact", daemon=True)
+        self._compactor.start()
+        if wait:
+            self._compactor.join()
+
+    def _compact(self) -> None:
+        cutoff = None
+        if self.retention_ns is not None:
+            cutoff = to_epoch_ns(monotonic_ns()) - self.retention_ns
+        sealed = [segment for segment in _list_segments(self.directory) if segment[1] < self._number]
+        groups: List[List[_SegmentFile]] = []
+        current: List[_SegmentFile] = []
+        current_size = 0
+        for segment in sealed:
+            size = segment[2].stat().st_size
+            if current and current_size + size > self.segment_size:
+                groups.append(current)
+                current, current_size = [], 0
+            current.append(segment)
+            current_size += size
+        if current:
+            groups.append(current)
+        for group in groups:
+            if len(group) > 1 or (cutoff is not None and _first_epoch(group[0][2]) < cutoff):
+                self._merge(group, cutoff)
+
+    def _merge(self, group: List[_SegmentFile], cutoff: Optional[int]) -> None:
+        generation = 1 + max(_parse_name(path)[2] for _, _, path in group)
+        target = self.directory / _merged_name(group[0][0], group[-1][1], generation)
+        tmp = target.with_suffix(_COMPACT_SUFFIX)
+        index = array("q")
+        kept = 0
+        with open(tmp, "wb") as out:
+            out.write(_MAGIC)
+            for _, _, path in group:
+                with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    for offset, epoch_ns, _, stop in _scan(mapped, len(_MAGIC), len(mapped)):
+                        if cutoff is not None and epoch_ns < cutoff:
+                            continue
+                        if kept % self.index_every == 0:
+                            index.extend((epoch_ns, out.tell()))
+                        out.write(mapped[offset:stop])
+                        kept += 1
+            out.flush()
+            os.fsync(out.fileno())
+        # The index goes first: it is ignored until the segment is renamed into
+        # place, and from then on the segment supersedes the whole group.
+        _write_index(target, index)
+        with self._files_lock:
+            os.replace(tmp, target)
+            _fsync_directory(self.directory)
+            for _, _, path in group:
+                path.unlink()
+                path.with_suffix(_INDEX_SUFFIX).unlink(missing_ok=True)
+            if not kept:
+                # Nothing left to supersede, so the empty segment can go too.
+                target.unlink()
+                target.with_suffix(_INDEX_SUFFIX).unlink()
+
+    # -- reading ------------------------------------------------------------
+
+    def history(self, capacity: Optional[int] = None, **kwargs) -> History:
+        """Rebuild a :class:`History` from disk, attached to this journal.
+
+        Extra keyword arguments are passed to :class:`History`. With a
+        *capacity* only the newest entries are kept in memory.
+        """
+        with self.reader() as reader:
+            history = History(capacity=capacity, **kwargs)
+            for entry in reader:
+                history.append(entry)
+        history.journal = self
+        return history
+
+    def reader(self) -> "JournalReader":
+        """Flush pending records and return a reader over the journal."""
+        self.flush()
+        return JournalReader(self.directory, self)
+
+    def __repr__(self) -> str:
+        return f"Journal({self.directory}, segment={self._number})"
+
+
+class _Segment:
+    """A memory-mapped segment plus its sparse index (if sealed)."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as handle:
+            size = os.fstat(handle.fileno()).st_size
+            self.map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.index = array("q")
+        index_path = path.with_suffix(_INDEX_SUFFIX)
+        if index_path.exists():
+            with open(index_path, "rb") as handle:
+                self.index.frombytes(handle.read())
+        self.times = self.index[0::2]
+
+    def first_epoch(self) -> Optional[int]:
+        if self.map is None or len(self.map) < len(_MAGIC) + _RECORD.size:
+            return None
+        return _RECORD.unpack_from(self.map, len(_MAGIC))[2]
+
+    def start_offset(self, since: Optional[int]) -> int:
+        """Offset of the last indexed record at or before *since*."""
+        if since is None or not self.index:
+            return len(_MAGIC)
+        position = bisect_right(self.times, since) - 1
+        return self.index[2 * position + 1] if position >= 0 else len(_MAGIC)
+
+    def close(self) -> None:
+        if self.map is not None:
+            self.map.close()
+
+
+class JournalReader:
+    """Iterate over journalled entries through ``mmap``.
+
+    Segments present when the reader is created are mapped lazily and
+    released on :meth:`close`.
+    """
+
+    def __init__(self, directory: PathLike, journal: Optional[Journal] = None):
+        """
+        Initialize a reader.
+
+        Args:
+            directory: Journal directory
+            journal: Writer in this process, whose compaction lock is honoured
+        """
+        self.directory = Path(directory)
+        self._journal = journal
+        self._segments: List[_Segment] = []
+        self._sorted = True
+        self._open_segments()
+
+    def _open_segments(self) -> None:
+        lock = self._journal._files_lock if self._journal is not None else None
+        if lock is not None:
+            lock.acquire()
+        try:
+            self._segments = [_Segment(path) for _, _, path in _list_segments(self.directory)]
+            self._sorted = not (self.directory / _UNSORTED_MARKER).exists()
+            if self._journal is not None and self._segments:
+                # The active segment has no index file yet; borrow the writer's.
+                active = self._segments[-1]
+                with self._journal._lock:
+                    if active.path.name == _segment_name(self._journal._number):
+                        active.index = array("q", self._journal._index)
+                        active.times = active.index[0::2]
+        finally:
+            if lock is not None:
+                lock.release()
+
+    def iter_range(self, since: TimeBound = None, until: TimeBound = None) -> Iterator[HistoryEntry]:
+        """Yield entries with ``since <= timestamp < until``, in the order they were appended.
+
+        Bounds may be ``datetime`` objects or monotonic-ns integers. If the
+        journal holds records appended out of time order, every record is
+        checked rather than seeking to *since* and stopping at *until*.
+        """
+        since_ns, until_ns = _as_epoch(since), _as_epoch(until)
+        if not self._sorted:
+            return self._filter(since_ns, until_ns)
+        return self._seek(since_ns, until_ns)
+
+    def _filter(self, since_ns: Optional[int], until_ns: Optional[int]) -> Iterator[HistoryEntry]:
+        for segment in self._segments:
+            if segment.map is None:
+                continue
+            for _, epoch_ns, start, stop in _scan(segment.map, len(_MAGIC), len(segment.map)):
+                if (since_ns is not None and epoch_ns < since_ns) or (until_ns is not None and epoch_ns >= until_ns):
+                    continue
+                yield _decode(segment.map, epoch_ns, start, stop)
+
+    def _seek(self, since_ns: Optional[int], until_ns: Optional[int]) -> Iterator[HistoryEntry]:
+        segments = self._segments
+        first = 0
+        if since_ns is not None:
+            starts = [segment.first_epoch() for segment in segments]
+            # The segment holding `since` is the last one that starts at or before it.
+            for i, start in enumerate(starts):
+                if start is not None and start <= since_ns:
+                    first = i
+        for segment in segments[first:]:
+            if segment.map is None:
+                continue
+            for _, epoch_ns, start, stop in _scan(segment.map, segment.start_offset(since_ns), len(segment.map)):
+                if until_ns is not None and epoch_ns >= until_ns:
+                    return
+                if since_ns is not None and epoch_ns < since_ns:
+                    continue
+                yield _decode(segment.map, epoch_ns, start, stop)
+
+    def seek(self, since: TimeBound) -> Iterator[HistoryEntry]:
+        """Yield entries from timestamp *since* onwards."""
+        return self.iter_range(since=since)
+
+    def __iter__(self) -> Iterator[HistoryEntry]:
+        return self.iter_range()
+
+    def close(self) -> None:
+        for segment in self._segments:
+            segment.close()
+        self._segments = []
+
+    def __enter__(self) -> "JournalReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,263 @@
+"""
+Formatics replay: Reconstruct element state at any point in a history.
+
+A :class:`Replay` folds :class:`~formatics.logs.history.History` entries into
+per-element state and checkpoints the states that changed every N entries or
+T seconds. Asking for an element's state at time *t* loads the closest
+checkpoint at or before *t* and replays only the entries after it.
+"""
+
+from bisect import bisect_right
+from datetime import datetime
+from itertools import takewhile
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Set, Union
+
+from .._clock import from_datetime
+from .history import History, HistoryEntry, ShardedHistory
+
+TimeBound = Union[datetime, int, None]
+Reducer = Callable[[Any, HistoryEntry], Any]
+KeyFunc = Callable[[HistoryEntry], Hashable]
+
+
+def _element_key(element: Any) -> Hashable:
+    try:
+        hash(element)
+    except TypeError:
+        return id(element)
+    return element
+
+
+def default_key(entry: HistoryEntry) -> Hashable:
+    """Identify the element an entry is about.
+
+    Uses ``metadata["element_id"]`` when present, otherwise the element
+    itself if it is hashable, otherwise its ``id()``.
+    """
+    metadata = entry._metadata
+    if metadata and "element_id" in metadata:
+        return metadata["element_id"]
+    return _element_key(entry.element)
+
+
+def latest_value(state: Any, entry: HistoryEntry) -> Any:
+    """Default reducer: an element's state is the value most recently recorded for it."""
+    return entry.element
+
+
+class Checkpoint:
+    """States that changed between the previous checkpoint and this one.
+
+    The checkpoint sits before the history entry numbered ``seq``, which
+    is stamped ``timestamp_ns``; ``states`` holds only the elements whose
+    state changed since the previous retained checkpoint.
+    """
+
+    __slots__ = ("seq", "timestamp_ns", "states")
+
+    def __init__(self, seq: int, timestamp_ns: Optional[int], states: Dict[Hashable, Any]):
+        self.seq = seq
+        self.timestamp_ns = timestamp_ns
+        self.states = states
+
+    def __repr__(self) -> str:
+        return f"Checkpoint(seq={self.seq}, elements={len(self.states)})"
+
+
+class Replay:
+    """Checkpointed replay of a :class:`History` or :class:`ShardedHistory`.
+
+    Entries are read in sequence order with ``history.since_seq()`` and
+    folded with ``apply(state, entry)``. The first entry seen for an element
+    gets ``state=None``. A checkpoint is taken every *every* entries, or once
+    *interval* seconds of log time have passed, whichever comes first, and
+    stores just the states changed since the previous checkpoint. At most
+    *max_checkpoints* are kept: when the limit is hit every other checkpoint
+    is merged into the next one and the spacing doubles. Memory therefore
+    stays bounded by the number of state changes, while the spacing, and
+    with it the longest replay tail, grows linearly: about
+    ``2 * N / max_checkpoints`` entries for a log of N entries.
+
+    Lookups at a point in time need the log in timestamp order (a merged
+    :class:`ShardedHistory` always is); the latest state does not.
+
+    States are stored by reference. A reducer that mutates a state in place
+    (instead of returning a new one) would corrupt earlier checkpoints.
+    """
+
+    def __init__(
+        self,
+        history: Union[History, ShardedHistory],
+        apply: Reducer = latest_value,
+        key: KeyFunc = default_key,
+        every: int = 10_000,
+        interval: Optional[float] = None,
+        max_checkpoints: int = 256,
+    ):
+        """
+        Initialize a replay and fold in the entries already recorded.
+
+        Args:
+            history: Log to replay. With a bounded history, call
+                :meth:`update` before entries are evicted
+            apply: Reducer producing an element's next state from an entry
+            key: Maps an entry to the element it describes
+            every: Checkpoint spacing in entries
+            interval: Checkpoint spacing in seconds of log time
+            max_checkpoints: Upper bound on retained checkpoints
+        """
+        if every <= 0 or max_checkpoints < 2:
+            raise ValueError("every must be positive and max_checkpoints at least 2")
+        self.history = history
+        self.apply = apply
+        self.key = key
+        self.every = every
+        self.interval_ns = None if interval is None else int(interval * 1e9)
+        self.max_checkpoints = max_checkpoints
+
+        start = history.first_seq
+        self._states: Dict[Hashable, Any] = {}
+        self._changed: Set[Hashable] = set()
+        self._position = start
+        self._last_ns: Optional[int] = None
+        self._time_sorted = True
+        self._checkpoints: List[Checkpoint] = [Checkpoint(start, None, {})]
+        self._checkpoint_times: List[int] = []
+        self.update()
+
+    # -- building -----------------------------------------------------------
+
+    def update(self) -> int:
+        """Fold in entries recorded since the last call; return how many."""
+        history = self.history
+        if self._position < history.first_seq:
+            raise ValueError("entries were evicted from the history before they were replayed")
+        states, changed, apply, key = self._states, self._changed, self.apply, self.key
+        position, last_ns, time_sorted = self._position, self._last_ns, self._time_sorted
+        last = self._checkpoints[-1]
+        for entry in history.since_seq(position):
+            timestamp_ns = entry.timestamp_ns
+            if last.timestamp_ns is None:
+                last.timestamp_ns = timestamp_ns
+                self._checkpoint_times.append(timestamp_ns)
+            elif position - last.seq >= self.every or (
+                self.interval_ns is not None and timestamp_ns - last.timestamp_ns >= self.interval_ns
+            ):
+                last = self._checkpoint(position, timestamp_ns)
+            if last_ns is not None and timestamp_ns < last_ns:
+                time_sorted = False
+            last_ns = timestamp_ns
+            element = key(entry)
+            states[element] = apply(states.get(element), entry)
+            changed.add(element)
+            position += 1
+        processed = position - self._position
+        self._position, self._last_ns, self._time_sorted = position, last_ns, time_sorted
+        return processed
+
+    def _checkpoint(self, seq: int, timestamp_ns: int) -> Checkpoint:
+        states = self._states
+        checkpoint = Checkpoint(seq, timestamp_ns, {element: states[element] for element in self._changed})
+        self._changed.clear()
+        self._checkpoints.append(checkpoint)
+        self._checkpoint_times.append(timestamp_ns)
+        if len(self._checkpoints) > self.max_checkpoints:
+            self._thin()
+        return checkpoint
+
+    def _thin(self) -> None:
+        """Merge every other checkpoint into the next one (keeping the first and last) and double the spacing."""
+        checkpoints = self._checkpoints
+        kept = [checkpoints[0]]
+        dropped: Optional[Dict[Hashable, Any]] = None
+        for index in range(1, len(checkpoints)):
+            checkpoint = checkpoints[index]
+            if index % 2 and index != len(checkpoints) - 1:
+                dropped = checkpoint.states
+                continue
+            if dropped:
+                dropped.update(checkpoint.states)
+                checkpoint.states = dropped
+            dropped = None
+            kept.append(checkpoint)
+        self._checkpoints = kept
+        self._checkpoint_times = [checkpoint.timestamp_ns for checkpoint in kept]
+        self.every *= 2
+        if self.interval_ns is not None:
+            self.interval_ns *= 2
+
+    # -- queries ------------------------------------------------------------
+
+    def _until_ns(self, t: TimeBound) -> Optional[int]:
+        """*t* in monotonic ns, or ``None`` when the latest state answers it."""
+        if t is None or self._last_ns is None:
+            return None
+        if not self._time_sorted:
+            raise ValueError("time lookups need a history appended in timestamp order")
+        t_ns = from_datetime(t) if isinstance(t, datetime) else t
+        return None if t_ns >= self._last_ns else t_ns
+
+    def _base(self, t_ns: int) -> int:
+        """Index of the last checkpoint at or before *t_ns* whose tail is still in the history."""
+        index = max(bisect_right(self._checkpoint_times, t_ns) - 1, 0)
+        if self._checkpoints[index].seq < self.history.first_seq:
+            raise ValueError("the entries after the nearest checkpoint were evicted")
+        return index
+
+    def _tail(self, index: int, t_ns: int) -> Iterator[HistoryEntry]:
+        """Entries after checkpoint *index* with ``timestamp <= t_ns``."""
+        return takewhile(lambda entry: entry.timestamp_ns <= t_ns, self.history.since_seq(self._checkpoints[index].seq))
+
+    def state_at(self, element: Any, t: TimeBound = None) -> Any:
+        """State of *element* after every entry with ``timestamp <= t``.
+
+        Args:
+            element: Element key, as produced by the ``key`` function (an
+                unhashable element is looked up by ``id()``)
+            t: ``datetime`` or monotonic-ns bound. ``None`` means the latest state
+
+        Returns:
+            The reduced state, or ``None`` if the element had no entries by then
+        """
+        self.update()
+        target = _element_key(element)
+        t_ns = self._until_ns(t)
+        if t_ns is None:
+            return self._states.get(target)
+        index = self._base(t_ns)
+        checkpoints = self._checkpoints
+        state = None
+        for back in range(index, 0, -1):
+            states = checkpoints[back].states
+            if target in states:
+                state = states[target]
+                break
+        key, apply = self.key, self.apply
+        for entry in self._tail(index, t_ns):
+            if key(entry) == target:
+                state = apply(state, entry)
+        return state
+
+    def states_at(self, t: TimeBound = None) -> Dict[Hashable, Any]:
+        """States of all elements after every entry with ``timestamp <= t``."""
+        self.update()
+        t_ns = self._until_ns(t)
+        if t_ns is None:
+            return dict(self._states)
+        index = self._base(t_ns)
+        states: Dict[Hashable, Any] = {}
+        for checkpoint in self._checkpoints[1 : index + 1]:
+            states.update(checkpoint.states)
+        key, apply = self.key, self.apply
+        for entry in self._tail(index, t_ns):
+            element = key(entry)
+            states[element] = apply(states.get(element), entry)
+        return states
+
+    @property
+    def checkpoints(self) -> List[Checkpoint]:
+        """Retained checkpoints, oldest first."""
+        return list(self._checkpoints)
+
+    def __repr__(self) -> str:
+        return f"Replay(position={self._position}, checkpoints={len(self._checkpoints)}, every={self.every})"
@@ -4,9 +4,20 @@ Formatics orbit: Element circulation and transformation cycles.
 Defines how elements orbit through states and transformations.
 """
 
-from typing import List, Optional, Any
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
 from dataclasses import dataclass
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; OrbitSet falls back to array/bytearray.
+    np = None
+
+# What OrbitSet.advance()/reset() accept to pick elements: all (None), a
+# slice/range, a boolean mask, or an iterable of element indices.
+Selection = Union[None, slice, range, Sequence[bool], Iterable[int]]
+
 
 @dataclass
 class Orbit:
@@ -33,3 +44,345 @@ class Orbit:
 
     def __repr__(self) -> str:
         return f"Orbit(element={self.element}, state={self.current_state()})"
+
+
+class OrbitSet:
+    """Many elements sharing one orbit, stored and advanced in bulk.
+
+    The state list is interned once for the whole set and each element's
+    ``current_index`` lives in a compact integer column: a ``bytearray`` for
+    up to 256 states (advanced with C-level ``translate``), otherwise a NumPy
+    array when available or an ``array('I')``. With NumPy installed, masks
+    and index lists are applied in one vectorized step on every backend.
+    Like :meth:`Orbit.advance`, advancing stops at the final state.
+
+    A selection names a set of elements: an index listed more than once
+    still moves its element a single state, on every backend.
+    """
+
+    def __init__(self, states: Sequence[str], elements: Iterable[Any] = (), use_numpy: Optional[bool] = None):
+        """
+        Initialize an orbit set.
+
+        Args:
+            states: The shared state cycle
+            elements: Initial elements, all starting at state 0
+            use_numpy: Force (or forbid) the NumPy backend; by default it is
+                used only for more than 256 states, where the bytearray
+                backend does not apply
+        """
+        if not states:
+            raise ValueError("an orbit needs at least one state")
+        self.states = tuple(states)
+        self.elements: List[Any] = list(elements)
+        self._last = len(self.states) - 1
+        if use_numpy is None:
+            use_numpy = np is not None and len(self.states) > 256
+        self._numpy = use_numpy
+        if self._numpy and np is None:
+            raise ImportError("NumPy is not installed")
+
+        count = len(self.elements)
+        if self._numpy:
+            self._buffer = np.zeros(count, dtype=np.int32)
+            self._indices = self._buffer[:count]
+        elif len(self.states) <= 256:
+            self._indices = bytearray(count)
+            self._step = bytes(min(i + 1, self._last) for i in range(256))
+        else:
+            self._indices = array("I", bytes(4 * count))
+
+    def add(self, element: Any) -> int:
+        """Append *element* at the initial state; return its index."""
+        self.elements.append(element)
+        if self._numpy:
+            size = len(self._indices)
+            if size == len(self._buffer):
+                # Grow geometrically so repeated add() stays amortised O(1).
+                grown = np.zeros(max(16, 2 * size), dtype=np.int32)
+                grown[:size] = self._indices
+                self._buffer = grown
+            self._indices = self._buffer[: size + 1]
+        else:
+            self._indices.append(0)
+        return len(self.elements) - 1
+
+    def current_state(self, index: int) -> str:
+        """Get the current state of element *index*."""
+        return self.states[int(self._indices[index])]
+
+    def orbit(self, index: int) -> Orbit:
+        """Return a standalone :class:`Orbit` snapshot of element *index*."""
+        return Orbit(element=self.elements[index], states=list(self.states), current_index=int(self._indices[index]))
+
+    def _selected(self, where: Selection) -> Union[slice, Sequence[int]]:
+        """Normalise *where* to a slice or to element indices.
+
+        Index lists come back as an ``np.intp`` array when NumPy is
+        available (so every backend can apply them in one vectorized step)
+        and as a list of distinct indices otherwise. Boolean masks, given
+        as bools or ``np.bool_``, must cover every element.
+
+        Raises:
+            TypeError: If *where* is none of the accepted forms
+            ValueError: If a mask's length differs from the set's
+            IndexError: If an index is out of range
+        """
+        if where is None:
+            return slice(None)
+        if isinstance(where, range):
+            return slice(where.start, where.stop, where.step)
+        if isinstance(where, slice):
+            return where
+        count = len(self.elements)
+        if not hasattr(where, "__len__"):
+            where = list(where)
+        if np is not None:
+            keys = np.asarray(where)
+            if not keys.size and keys.dtype.kind not in "biu":
+                # np.asarray([]) is float64; an empty selection is just no indices.
+                keys = keys.astype(np.intp)
+            if keys.ndim != 1 or keys.dtype.kind not in "biu":
+                raise TypeError("a selection is a slice, a boolean mask or element indices")
+            if keys.dtype.kind == "b":
+                if len(keys) != count:
+                    raise ValueError(f"mask has {len(keys)} entries for {count} elements")
+                return np.flatnonzero(keys)
+            keys = keys.astype(np.intp)
+            if len(keys) and (keys.min() < -count or keys.max() >= count):
+                raise IndexError("element index out of range")
+            # Repeated indices are fine: fancy-index assignment moves each element once.
+            return np.where(keys < 0, keys + count, keys)
+        where = list(where)
+        if where and isinstance(where[0], bool):
+            if len(where) != count:
+                raise ValueError(f"mask has {len(where)} entries for {count} elements")
+            return [i for i, chosen in enumerate(where) if chosen]
+        # Same rule as NumPy fancy-index assignment: each element once, however often listed.
+        return list(dict.fromkeys(_in_range(i, count) for i in where))
+
+    def _column(self) -> Any:
+        """The state indices as a NumPy array sharing their memory (NumPy required)."""
+        indices = self._indices
+        if self._numpy:
+            return indices
+        return np.frombuffer(indices, dtype=np.uint8 if isinstance(indices, bytearray) else np.dtype(indices.typecode))
+
+    def advance(self, where: Selection = None) -> None:
+        """Move the selected elements one state forward (stopping at the end)."""
+        key = self._selected(where)
+        indices = self._indices
+        if isinstance(key, slice) and isinstance(indices, bytearray):
+            indices[key] = indices[key].translate(self._step)
+        elif self._last == 0:
+            return
+        elif np is not None:
+            column = self._column()
+            # Capped before adding so a uint8 column cannot wrap around.
+            column[key] = np.minimum(column[key], self._last - 1) + 1
+        else:
+            last = self._last
+            for i in range(len(indices))[key] if isinstance(key, slice) else key:
+                if indices[i] < last:
+                    indices[i] += 1
+
+    def reset(self, where: Selection = None) -> None:
+        """Return the selected elements to the initial state."""
+        key = self._selected(where)
+        indices = self._indices
+        if np is not None:
+            self._column()[key] = 0
+        elif isinstance(key, slice):
+            indices[key] = bytes(len(indices[key])) if isinstance(indices, bytearray) else array(
+                "I", bytes(4 * len(indices[key]))
+            )
+        else:
+            for i in key:
+                indices[i] = 0
+
+    def histogram(self) -> Dict[str, int]:
+        """Return how many elements are in each state."""
+        if self._numpy:
+            counts = np.bincount(self._indices, minlength=len(self.states)).tolist()
+        elif isinstance(self._indices, bytearray):
+            counts = [self._indices.count(i) for i in range(len(self.states))]
+        else:
+            counts = [0] * len(self.states)
+            for index in self._indices:
+                counts[index] += 1
+        return dict(zip(self.states, counts))
+
+    def __len__(self) -> int:
+        return len(self.elements)
+
+    def __repr__(self) -> str:
+        return f"OrbitSet(states={len(self.states)}, elements={len(self.elements)})"
+
+
+def _in_range(index: int, count: int) -> int:
+    """Resolve a possibly negative element index, as list indexing would."""
+    if not -count <= index < count:
+        raise IndexError("element index out of range")
+    return index + count if index < 0 else index
+
+
+# A state's outgoing transitions: none (terminal), one successor for the
+# default label, or a successor per label (branching).
+Transitions = Mapping[str, Union[None, str, Mapping[str, str]]]
+
+
+class OrbitMachine:
+    """A compiled orbit state graph, shared by every element that runs on it.
+
+    Unlike :class:`Orbit`, the graph may contain cycles and branches (one
+    successor per transition label). Each label is compiled into a successor
+    table plus binary-lifting jump tables (``2**k`` steps), so
+    ``advance(state, n)`` costs O(log n) lookups instead of n calls. States
+    with no transition for a label stay where they are, mirroring
+    :meth:`Orbit.advance` stopping at the final state.
+    """
+
+    DEFAULT_LABEL = "next"
+
+    def __init__(self, transitions: Transitions, start: Optional[str] = None):
+        """
+        Compile a state graph.
+
+        Args:
+            transitions: ``{state: successor | {label: successor} | None}``
+            start: Initial state (defaults to the first state listed)
+        """
+        names: Dict[str, int] = {}
+        for state, targets in transitions.items():
+            names.setdefault(state, len(names))
+            for target in _targets(targets).values():
+                names.setdefault(target, len(names))
+        if not names:
+            raise ValueError("an orbit machine needs at least one state")
+
+        self.states: Tuple[str, ...] = tuple(names)
+        self.index: Dict[str, int] = names
+        self.start = self.index[start] if start is not None else 0
+
+        labels = {label for targets in transitions.values() for label in _targets(targets)}
+        labels.add(self.DEFAULT_LABEL)
+        self._jumps: Dict[str, List[array]] = {}
+        # Jump tables grow lazily; the lock keeps machines shared between threads consistent.
+        self._lock = threading.Lock()
+        for label in labels:
+            successor = array("I", range(len(self.states)))
+            for state, targets in transitions.items():
+                target = _targets(targets).get(label)
+                if target is not None:
+                    successor[names[state]] = names[target]
+            self._jumps[label] = [successor]
+
+    @classmethod
+    def from_states(cls, states: Sequence[str], cyclic: bool = False) -> "OrbitMachine":
+        """Compile a linear orbit (as used by :class:`Orbit`), optionally closed into a cycle."""
+        transitions: Dict[str, Optional[str]] = {a: b for a, b in zip(states, states[1:])}
+        transitions[states[-1]] = states[0] if cyclic else None
+        return cls(transitions, start=states[0])
+
+    @property
+    def labels(self) -> List[str]:
+        """Transition labels known to the machine."""
+        return sorted(self._jumps)
+
+    def _table(self, label: str, level: int) -> array:
+        """Return the jump table for ``2**level`` steps, building it on demand."""
+        try:
+            tables = self._jumps[label]
+        except KeyError:
+            raise KeyError(f"unknown transition label {label!r}") from None
+        if len(tables) <= level:
+            with self._lock:
+                while len(tables) <= level:
+                    half = tables[-1]
+                    tables.append(array("I", [half[i] for i in half]))
+        return tables[level]
+
+    def step(self, state: int, n: int = 1, label: str = DEFAULT_LABEL) -> int:
+        """Return the state index reached from *state* after *n* steps."""
+        if n < 0:
+            raise ValueError("orbits only advance forward")
+        level = 0
+        while n:
+            if n & 1:
+                state = self._table(label, level)[state]
+            n >>= 1
+            level += 1
+        return state
+
+    def step_many(self, states: Sequence[int], n: int = 1, label: str = DEFAULT_LABEL) -> List[int]:
+        """Advance a batch of state indices by *n* steps with shared jump tables."""
+        current = list(states)
+        level = 0
+        while n:
+            if n & 1:
+                table = self._table(label, level)
+                current = [table[state] for state in current]
+            n >>= 1
+            level += 1
+        return current
+
+    def cycle_info(self, state: Union[int, str], label: str = DEFAULT_LABEL) -> Tuple[int, int]:
+        """Return ``(tail, period)`` of the path starting at *state*.
+
+        ``tail`` is the number of steps before the path enters its cycle and
+        ``period`` the cycle length. A terminal state is a cycle of period 1.
+        """
+        current = self.index[state] if isinstance(state, str) else state
+        successor = self._table(label, 0)
+        seen: Dict[int, int] = {}
+        while current not in seen:
+            seen[current] = len(seen)
+            current = successor[current]
+        tail = seen[current]
+        return tail, len(seen) - tail
+
+    def period(self, state: Union[int, str], label: str = DEFAULT_LABEL) -> int:
+        """Cycle length eventually reached from *state*."""
+        return self.cycle_info(state, label)[1]
+
+    def orbit(self, element: Any, state: Optional[str] = None) -> "MachineOrbit":
+        """Place *element* on this machine, at *state* or the start state."""
+        return MachineOrbit(element, self, self.start if state is None else self.index[state])
+
+    def __repr__(self) -> str:
+        return f"OrbitMachine(states={len(self.states)}, labels={self.labels})"
+
+
+class MachineOrbit:
+    """An element's position on a shared :class:`OrbitMachine`."""
+
+    __slots__ = ("element", "machine", "current_index")
+
+    def __init__(self, element: Any, machine: OrbitMachine, current_index: int):
+        self.element = element
+        self.machine = machine
+        self.current_index = current_index
+
+    def advance(self, n: int = 1, label: str = OrbitMachine.DEFAULT_LABEL) -> str:
+        """Move *n* steps along *label* in O(log n); return the new state."""
+        self.current_index = self.machine.step(self.current_index, n, label)
+        return self.current_state()
+
+    def current_state(self) -> str:
+        """Get current orbital state."""
+        return self.machine.states[self.current_index]
+
+    def reset(self) -> None:
+        """Reset orbit to the machine's start state."""
+        self.current_index = self.machine.start
+
+    def __repr__(self) -> str:
+        return f"MachineOrbit(element={self.element}, state={self.current_state()})"
+
+
+def _targets(targets: Union[None, str, Mapping[str, str]]) -> Mapping[str, str]:
+    if targets is None:
+        return {}
+    if isinstance(targets, str):
+        return {OrbitMachine.DEFAULT_LABEL: targets}
+    return targets
@@ -4,28 +4,149 @@ Formatics path graph: Structural navigation graphs.
 Implements graph-based path tracking and element relationships.
 """
 
-from typing import Any, List, Optional, Set
+import collections.abc
+from collections import deque
+from typing import AbstractSet, Any, Dict, Iterable, Iterator, List, Optional, Set
 from dataclasses import dataclass, field
 
 
+class _NodeSet(collections.abc.Set):
+    """Read-only view of a node's incoming edges."""
+
+    __slots__ = ("_nodes",)
+
+    def __init__(self, nodes: Set["Node"]):
+        self._nodes = nodes
+
+    @classmethod
+    def _from_iterable(cls, nodes: Iterable["Node"]) -> Set["Node"]:
+        return set(nodes)
+
+    def __contains__(self, node: object) -> bool:
+        return node in self._nodes
+
+    def __iter__(self) -> Iterator["Node"]:
+        return iter(self._nodes)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __repr__(self) -> str:
+        return f"{{{', '.join(map(repr, self._nodes))}}}"
+
+
+class _EdgeSet(set):
+    """A node's outgoing edges: a set whose changes also update each target's ``incoming``.
+
+    Operators that build a new set (``|``, ``&``, ``copy()``...) return plain
+    sets, so only the node's own edge set keeps the two directions linked.
+    """
+
+    __slots__ = ("_owner",)
+
+    def __init__(self, owner: "Node"):
+        self._owner = owner
+
+    def add(self, node: "Node") -> None:
+        set.add(self, node)
+        node._in.add(self._owner)
+
+    def discard(self, node: "Node") -> None:
+        if node in self:
+            set.discard(self, node)
+            node._in.discard(self._owner)
+
+    def remove(self, node: "Node") -> None:
+        set.remove(self, node)
+        node._in.discard(self._owner)
+
+    def pop(self) -> "Node":
+        node = set.pop(self)
+        node._in.discard(self._owner)
+        return node
+
+    def clear(self) -> None:
+        for node in self:
+            node._in.discard(self._owner)
+        set.clear(self)
+
+    def update(self, *others: Iterable["Node"]) -> None:
+        for other in others:
+            for node in other:
+                self.add(node)
+
+    def difference_update(self, *others: Iterable["Node"]) -> None:
+        for other in others:
+            for node in list(other):
+                self.discard(node)
+
+    def intersection_update(self, *others: Iterable["Node"]) -> None:
+        for node in set.difference(self, set.intersection(self, *others)):
+            self.discard(node)
+
+    def symmetric_difference_update(self, other: Iterable["Node"]) -> None:
+        for node in set(other):
+            if node in self:
+                self.discard(node)
+            else:
+                self.add(node)
+
+    def __ior__(self, other: AbstractSet["Node"]) -> "_EdgeSet":
+        if not isinstance(other, AbstractSet):
+            return NotImplemented
+        self.update(other)
+        return self
+
+    def __iand__(self, other: AbstractSet["Node"]) -> "_EdgeSet":
+        if not isinstance(other, AbstractSet):
+            return NotImplemented
+        self.intersection_update(other)
+        return self
+
+    def __isub__(self, other: AbstractSet["Node"]) -> "_EdgeSet":
+        if not isinstance(other, AbstractSet):
+            return NotImplemented
+        self.difference_update(other)
+        return self
+
+    def __ixor__(self, other: AbstractSet["Node"]) -> "_EdgeSet":
+        if not isinstance(other, AbstractSet):
+            return NotImplemented
+        self.symmetric_difference_update(other)
+        return self
+
+
 @dataclass
 class Node:
-    """A node in the Formatics path graph."""
+    """A node in the Formatics path graph.
+
+    ``edges`` is an ordinary mutable set, and every change to it (or
+    assignment of a new set) is mirrored in the targets' ``incoming``, a
+    read-only view of the nodes with an edge to this one.
+    """
 
     value: Any
     edges: Set["Node"] = field(default_factory=set)
+    incoming: AbstractSet["Node"] = field(init=False, compare=False, repr=False)
 
     def connect(self, other: "Node") -> None:
         """Create edge to another node."""
-        self.edges.add(other)
+        # What _EdgeSet.add does, without the extra method call.
+        set.add(self._out, other)
+        other._in.add(self)
 
     def disconnect(self, other: "Node") -> None:
         """Remove edge to another node."""
-        self.edges.discard(other)
+        set.discard(self._out, other)
+        other._in.discard(self)
 
     def neighbors(self) -> List["Node"]:
         """Get all connected nodes."""
-        return list(self.edges)
+        return list(self._out)
+
+    def predecessors(self) -> List["Node"]:
+        """Get all nodes with an edge to this one."""
+        return list(self._in)
 
     def __hash__(self) -> int:
         return id(self)
@@ -34,6 +155,29 @@ class Node:
         return f"Node({self.value}, edges={len(self.edges)})"
 
 
+def _get_edges(self: Node) -> Set[Node]:
+    return self._out
+
+
+def _set_edges(self: Node, targets: Iterable[Node]) -> None:
+    out = self.__dict__.get("_out")
+    if out is None:
+        # First assignment, from the generated __init__.
+        self._out = _EdgeSet(self)
+        self._in: Set[Node] = set()
+        self.incoming = _NodeSet(self._in)
+    elif out:
+        targets = list(targets)  # *targets* may be this very set
+        out.clear()
+    for target in targets:
+        self.connect(target)
+
+
+# Installed after @dataclass so the generated __init__ and __eq__ still treat
+# ``edges`` as an ordinary field.
+Node.edges = property(_get_edges, _set_edges, doc="Outgoing edges; changes also update the targets' ``incoming``.")
+
+
 class PathGraph:
     """Graph structure for Formatics paths."""
 
@@ -51,28 +195,75 @@ class PathGraph:
         """Create directed edge between nodes."""
         source.connect(target)
 
-    def find_path(self, start: Node, end: Node) -> Optional[List[Node]]:
-        """Find path between two nodes (BFS)."""
-        if start == end:
-            return [start]
-
-        visited = set()
-        queue = [(start, [start])]
+    def find_path(self, start: Node, end: Node, bidirectional: bool = False) -> Optional[List[Node]]:
+        """
+        Find a shortest path between two nodes (BFS).
 
-        while queue:
-            current, path = queue.pop(0)
-            if current in visited:
-                continue
-
-            visited.add(current)
+        Args:
+            start: Node the path starts at
+            end: Node the path ends at
+            bidirectional: Search forward from *start* and backward from
+                *end* at the same time, expanding the smaller frontier first.
+                Usually visits far fewer nodes on large graphs
 
-            for neighbor in current.neighbors():
-                if neighbor == end:
-                    return path + [neighbor]
-                if neighbor not in visited:
-                    queue.append((neighbor, path + [neighbor]))
+        Returns:
+            Nodes from *start* to *end* inclusive, or ``None`` if unreachable
+        """
+        if start is end:
+            return [start]
+        if bidirectional:
+            return _bidirectional_path(start, end)
 
+        parents: Dict[Node, Node] = {start: start}
+        queue = deque([start])
+        while queue:
+            current = queue.popleft()
+            for neighbor in current._out:
+                if neighbor in parents:
+                    continue
+                parents[neighbor] = current
+                if neighbor is end:
+                    return _walk(parents, end)[::-1]
+                queue.append(neighbor)
         return None
 
     def __repr__(self) -> str:
         return f"PathGraph(nodes={len(self.nodes)})"
+
+
+def _walk(parents: Dict[Node, Node], node: Node) -> List[Node]:
+    """Follow parent pointers from *node* back to the root of the search."""
+    path = [node]
+    while parents[node] is not node:
+        node = parents[node]
+        path.append(node)
+    return path
+
+
+def _bidirectional_path(start: Node, end: Node) -> Optional[List[Node]]:
+    forward: Dict[Node, Node] = {start: start}
+    backward: Dict[Node, Node] = {end: end}
+    forward_frontier = [start]
+    backward_frontier = [end]
+
+    # Expand one whole level at a time. The first node reached by both
+    # searches then lies on a shortest path.
+    while forward_frontier and backward_frontier:
+        if len(forward_frontier) <= len(backward_frontier):
+            frontier, seen, other, attr = forward_frontier, forward, backward, "_out"
+        else:
+            frontier, seen, other, attr = backward_frontier, backward, forward, "_in"
+        next_frontier = []
+        for current in frontier:
+            for neighbor in getattr(current, attr):
+                if neighbor in seen:
+                    continue
+                seen[neighbor] = current
+                if neighbor in other:
+                    return _walk(forward, neighbor)[::-1] + _walk(backward, neighbor)[1:]
+                next_frontier.append(neighbor)
+        if seen is forward:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+    return None
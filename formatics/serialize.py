@@ -0,0 +1,461 @@
+"""
+Formatics serialize: Compact binary files for forms and histories.
+
+Elements are written as fixed-width records with typed value slots, all
+strings are interned into one table, and variable-size data (metadata,
+length-prefixed bytes and fallback pickles) lives in a separate block that
+is addressed with 64-bit offsets. Writing streams the records and spools
+the variable block through a temporary file, so memory use does not grow
+with the size of the output. Files are opened with
+``mmap``, so opening one costs O(1) whatever its size. Elements and entries
+are decoded only when they are accessed.
+
+Layout::
+
+    magic (8 bytes) | header length (u32) | header
+    records | variable block | string table (offsets + UTF-8 blob)
+"""
+
+import mmap
+import os
+import pickle
+import shutil
+import struct
+import tempfile
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from ._clock import from_epoch_ns, to_datetime, to_epoch_ns
+from .form.elements import Element, FormElement
+from .logs.history import History, HistoryEntry
+
+PathLike = Union[str, os.PathLike]
+
+_MAGIC = b"FMFORM2\0"
+_KIND_FORM = 1
+_KIND_HISTORY = 2
+
+# kind, record count, form type (string id + 1, 0 for None),
+# records offset, variable block offset, string table offset
+_HEADER = struct.Struct("<BxxxQIQQQ")
+_HEADER_LENGTH = struct.Struct("<I")
+# value tag, metadata count, value payload, metadata offset
+_ELEMENT = struct.Struct("<B3xI8sQ")
+# timestamp (ns since the epoch), action string id, element tag,
+# element payload, metadata offset, metadata count
+_ENTRY = struct.Struct("<qIB3x8sQI4x")
+# key string id, value tag, value payload
+_META = struct.Struct("<IB3x8s")
+# Key id of a metadata pair whose key is not a str: the value payload is
+# then a pickled ``(key, value)`` tuple, so the key keeps its type.
+_PICKLED_KEY = 0xFFFFFFFF
+_OFFSET = struct.Struct("<Q")
+_INT = struct.Struct("<q")
+_FLOAT = struct.Struct("<d")
+
+# Variable-block bytes kept in memory before the writer spills to a temporary file.
+_SPOOL_LIMIT = 16 << 20
+
+_NONE, _TRUE, _FALSE, _INT_TAG, _FLOAT_TAG, _STR, _BYTES, _PICKLE, _ELEMENT_TAG = range(9)
+_EMPTY = bytes(8)
+
+
+class _StringTable:
+    """Interns strings while writing."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def intern(self, text: str) -> int:
+        string_id = self.ids.get(text)
+        if string_id is None:
+            string_id = self.ids[text] = len(self.strings)
+            self.strings.append(text)
+        return string_id
+
+    def write(self, handle: BinaryIO) -> None:
+        encoded = [text.encode("utf-8", "surrogatepass") for text in self.strings]
+        handle.write(struct.pack("<I", len(encoded)))
+        offset = 0
+        for raw in encoded:
+            handle.write(_OFFSET.pack(offset))
+            offset += len(raw)
+        handle.write(_OFFSET.pack(offset))
+        for raw in encoded:
+            handle.write(raw)
+
+
+class _Writer:
+    """Shared state for encoding values into records and the variable block."""
+
+    def __init__(self):
+        self.strings = _StringTable()
+        self.var = tempfile.SpooledTemporaryFile(max_size=_SPOOL_LIMIT)
+        self.var_size = 0
+
+    def append(self, data: bytes) -> int:
+        """Add *data* to the variable block; return its offset there."""
+        offset = self.var_size
+        self.var.write(data)
+        self.var_size += len(data)
+        return offset
+
+    def _blob(self, data: bytes) -> bytes:
+        offset = self.append(_OFFSET.pack(len(data)))
+        self.append(data)
+        return _OFFSET.pack(offset)
+
+    def value(self, value: Any) -> Tuple[int, bytes]:
+        """Encode *value* as ``(tag, 8-byte payload)``."""
+        kind = type(value)
+        if value is None:
+            return _NONE, _EMPTY
+        if kind is bool:
+            return (_TRUE if value else _FALSE), _EMPTY
+        if kind is int and -(1 << 63) <= value < (1 << 63):
+            return _INT_TAG, _INT.pack(value)
+        if kind is float:
+            return _FLOAT_TAG, _FLOAT.pack(value)
+        if kind is str:
+            return _STR, _INT.pack(self.strings.intern(value))
+        if kind is bytes:
+            return _BYTES, self._blob(value)
+        return _PICKLE, self._blob(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def metadata(self, metadata: Dict[Any, Any]) -> Tuple[int, int]:
+        """Encode *metadata* into the variable block; return ``(offset, count)``.
+
+        Str keys are interned; any other key is pickled together with its
+        value, so ints, tuples and the like come back unchanged.
+        """
+        if not metadata:
+            return 0, 0
+        encoded = bytearray()
+        for key, item in metadata.items():
+            if type(key) is str:
+                tag, payload = self.value(item)
+                encoded += _META.pack(self.strings.intern(key), tag, payload)
+            else:
+                pair = pickle.dumps((key, item), protocol=pickle.HIGHEST_PROTOCOL)
+                encoded += _META.pack(_PICKLED_KEY, _PICKLE, self._blob(pair))
+        # Nested blobs were appended while encoding, so place the pairs after them.
+        return self.append(encoded), len(metadata)
+
+    def element(self, element: Element) -> bytes:
+        tag, payload = self.value(element.value)
+        meta_offset, meta_count = self.metadata(element.metadata)
+        return _ELEMENT.pack(tag, meta_count, payload, meta_offset)
+
+
+def _write_file(path: PathLike, kind: int, form_type: Optional[str], writer: _Writer, records: Iterable[bytes]) -> int:
+    header_at = len(_MAGIC) + _HEADER_LENGTH.size
+    tmp = f"{os.fspath(path)}.tmp"
+    count = 0
+    with writer.var, open(tmp, "wb") as handle:
+        handle.write(_MAGIC)
+        handle.write(_HEADER_LENGTH.pack(_HEADER.size))
+        handle.write(bytes(_HEADER.size))
+        records_at = handle.tell()
+        for record in records:
+            handle.write(record)
+            count += 1
+        var_at = handle.tell()
+        writer.var.seek(0)
+        shutil.copyfileobj(writer.var, handle, 1 << 20)
+        strings_at = handle.tell()
+        form_id = 0 if form_type is None else writer.strings.intern(form_type) + 1
+        writer.strings.write(handle)
+        handle.seek(header_at)
+        handle.write(_HEADER.pack(kind, count, form_id, records_at, var_at, strings_at))
+    os.replace(tmp, path)
+    return count
+
+
+def dump_elements(elements: Iterable[Element], path: PathLike, form_type: Optional[str] = None) -> int:
+    """Stream *elements* into a form file at *path*; return how many were written."""
+    writer = _Writer()
+    return _write_file(path, _KIND_FORM, form_type, writer, (writer.element(e) for e in elements))
+
+
+def dump_form(form: FormElement, path: PathLike) -> int:
+    """Write *form* to *path*."""
+    return dump_elements(form.elements, path, form.form_type)
+
+
+def dump_history(history: History, path: PathLike) -> int:
+    """Write every entry of *history* to *path*.
+
+    Entry elements that are :class:`Element` instances are stored inline as
+    element records in the variable block; other values use the normal
+    value encoding.
+    """
+    writer = _Writer()
+
+    def records() -> Iterator[bytes]:
+        for entry in history:
+            if isinstance(entry.element, Element):
+                offset = writer.append(writer.element(entry.element))
+                tag, payload = _ELEMENT_TAG, _INT.pack(offset)
+            else:
+                tag, payload = writer.value(entry.element)
+            meta_offset, meta_count = writer.metadata(entry.metadata)
+            action = writer.strings.intern(entry.action)
+            yield _ENTRY.pack(to_epoch_ns(entry.timestamp_ns), action, tag, payload, meta_offset, meta_count)
+
+    return _write_file(path, _KIND_HISTORY, None, writer, records())
+
+
+class _MappedFile:
+    """An mmapped formatics file with lazily decoded strings."""
+
+    kind = 0
+    record = _ELEMENT
+
+    def __init__(self, path: PathLike):
+        with open(path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        if self._view[: len(_MAGIC)] != _MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a formatics file")
+        (header_size,) = _HEADER_LENGTH.unpack_from(self._view, len(_MAGIC))
+        header_at = len(_MAGIC) + _HEADER_LENGTH.size
+        kind, self._count, form_id, self._records_at, self._var_at, strings_at = _HEADER.unpack_from(
+            self._view, header_at
+        )
+        if header_size < _HEADER.size or kind != self.kind:
+            self.close()
+            raise ValueError(f"{path} does not hold a {type(self).__name__} payload")
+        (self._string_count,) = struct.unpack_from("<I", self._view, strings_at)
+        self._offsets_at = strings_at + 4
+        self._blob_at = self._offsets_at + (self._string_count + 1) * _OFFSET.size
+        self._strings: Dict[int, str] = {}
+        self._form_id = form_id
+
+    def string(self, string_id: int) -> str:
+        text = self._strings.get(string_id)
+        if text is None:
+            start, end = struct.unpack_from("<QQ", self._view, self._offsets_at + string_id * _OFFSET.size)
+            raw = self._view[self._blob_at + start : self._blob_at + end]
+            text = self._strings[string_id] = str(raw, "utf-8", "surrogatepass")
+        return text
+
+    def _blob(self, payload: bytes) -> memoryview:
+        start = self._var_at + _OFFSET.unpack(payload)[0]
+        (length,) = _OFFSET.unpack_from(self._view, start)
+        start += _OFFSET.size
+        return self._view[start : start + length]
+
+    def value(self, tag: int, payload: bytes) -> Any:
+        if tag == _INT_TAG:
+            return _INT.unpack(payload)[0]
+        if tag == _FLOAT_TAG:
+            return _FLOAT.unpack(payload)[0]
+        if tag == _STR:
+            return self.string(_INT.unpack(payload)[0])
+        if tag == _NONE:
+            return None
+        if tag == _TRUE or tag == _FALSE:
+            return tag == _TRUE
+        if tag == _BYTES:
+            return bytes(self._blob(payload))
+        if tag == _PICKLE:
+            return pickle.loads(self._blob(payload))
+        if tag == _ELEMENT_TAG:
+            return ElementView(self, self._var_at + _INT.unpack(payload)[0])
+        raise ValueError(f"unknown value tag {tag}")
+
+    def metadata(self, offset: int, count: int) -> Dict[Any, Any]:
+        start = self._var_at + offset
+        result = {}
+        for key, tag, payload in _META.iter_unpack(self._view[start : start + count * _META.size]):
+            if key == _PICKLED_KEY:
+                key, value = pickle.loads(self._blob(payload))
+                result[key] = value
+            else:
+                result[self.string(key)] = self.value(tag, payload)
+        return result
+
+    def _record_at(self, index: int) -> int:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("record index out of range")
+        return self._records_at + index * self.record.size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        """Release the mapping. Views taken from the file become invalid."""
+        self._view.release()
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class ElementView:
+    """Lazy, read-only element backed by a record in a mapped file."""
+
+    __slots__ = ("_file", "_offset")
+
+    def __init__(self, file: _MappedFile, offset: int):
+        self._file = file
+        self._offset = offset
+
+    @property
+    def value(self) -> Any:
+        tag, _, payload, _ = _ELEMENT.unpack_from(self._file._view, self._offset)
+        return self._file.value(tag, payload)
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        _, count, _, offset = _ELEMENT.unpack_from(self._file._view, self._offset)
+        return self._file.metadata(offset, count)
+
+    def to_element(self) -> Element:
+        """Decode into a standalone :class:`Element`."""
+        return Element(value=self.value, metadata=self.metadata)
+
+    def transform(self, func) -> Element:
+        """Apply transformation to element value."""
+        return Element(value=func(self.value), metadata=self.metadata)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (Element, ElementView)):
+            return self.value == other.value and self.metadata == other.metadata
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Element({self.value})"
+
+
+class FormFile(_MappedFile):
+    """A form file opened for lazy, zero-copy reading."""
+
+    kind = _KIND_FORM
+    record = _ELEMENT
+
+    @property
+    def form_type(self) -> Optional[str]:
+        return None if self._form_id == 0 else self.string(self._form_id - 1)
+
+    def __getitem__(self, index: int) -> ElementView:
+        return ElementView(self, self._record_at(index))
+
+    def __iter__(self) -> Iterator[ElementView]:
+        for index in range(self._count):
+            yield ElementView(self, self._records_at + index * _ELEMENT.size)
+
+    def values(self) -> Iterator[Any]:
+        """Yield element values without building views."""
+        for tag, _, payload, _ in _ELEMENT.iter_unpack(
+            self._view[self._records_at : self._records_at + self._count * _ELEMENT.size]
+        ):
+            yield self.value(tag, payload)
+
+    def to_form(self) -> FormElement:
+        """Decode the whole file into a :class:`FormElement`."""
+        return FormElement(elements=[view.to_element() for view in self], form_type=self.form_type)
+
+    def __repr__(self) -> str:
+        return f"FormFile(type={self.form_type}, count={self._count})"
+
+
+class EntryView:
+    """Lazy, read-only history entry backed by a record in a mapped file."""
+
+    __slots__ = ("_file", "_offset")
+
+    def __init__(self, file: _MappedFile, offset: int):
+        self._file = file
+        self._offset = offset
+
+    def _fields(self) -> tuple:
+        return _ENTRY.unpack_from(self._file._view, self._offset)
+
+    @property
+    def timestamp_ns(self) -> int:
+        """Monotonic-ns timestamp, on this process's timeline."""
+        return from_epoch_ns(self._fields()[0])
+
+    @property
+    def timestamp(self) -> datetime:
+        return to_datetime(self.timestamp_ns)
+
+    @property
+    def action(self) -> str:
+        return self._file.string(self._fields()[1])
+
+    @property
+    def element(self) -> Any:
+        _, _, tag, payload, _, _ = self._fields()
+        return self._file.value(tag, payload)
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        _, _, _, _, offset, count = self._fields()
+        return self._file.metadata(offset, count)
+
+    def to_entry(self) -> HistoryEntry:
+        """Decode into a standalone :class:`HistoryEntry`."""
+        element = self.element
+        if isinstance(element, ElementView):
+            element = element.to_element()
+        return HistoryEntry(
+            action=self.action, element=element, metadata=self.metadata, timestamp_ns=self.timestamp_ns
+        )
+
+    def __repr__(self) -> str:
+        return f"HistoryEntry({self.action} at {self.timestamp.isoformat()})"
+
+
+class HistoryFile(_MappedFile):
+    """A history file opened for lazy, zero-copy reading."""
+
+    kind = _KIND_HISTORY
+    record = _ENTRY
+
+    def __getitem__(self, index: int) -> EntryView:
+        return EntryView(self, self._record_at(index))
+
+    def __iter__(self) -> Iterator[EntryView]:
+        for index in range(self._count):
+            yield EntryView(self, self._records_at + index * _ENTRY.size)
+
+    def to_history(self) -> History:
+        """Decode the whole file into a :class:`History`."""
+        history = History()
+        for view in self:
+            history.append(view.to_entry())
+        return history
+
+    def __repr__(self) -> str:
+        return f"HistoryFile(entries={self._count})"
+
+
+def open_form(path: PathLike) -> FormFile:
+    """Map a form file written by :func:`dump_form` or :func:`dump_elements`."""
+    return FormFile(path)
+
+
+def open_history(path: PathLike) -> HistoryFile:
+    """Map a history file written by :func:`dump_history`."""
+    return HistoryFile(path)
+
+
+def load_form(path: PathLike) -> FormElement:
+    """Read a form file fully into memory."""
+    with open_form(path) as form_file:
+        return form_file.to_form()
+
+
+def load_history(path: PathLike) -> History:
+    """Read a history file fully into memory."""
+    with open_history(path) as history_file:
+        return history_file.to_history()
@@ -4,9 +4,12 @@ Formatics slot: Positional anchors for elements in structural space.
 Slots define where elements fit within the Formatics framework.
 """
 
-from typing import Optional, Any
+from typing import Any, Iterable, Iterator, List, Optional
 from dataclasses import dataclass
 
+_WORD = 64
+_FULL = (1 << _WORD) - 1
+
 
 @dataclass
 class Slot:
@@ -33,3 +36,197 @@ class Slot:
     def __repr__(self) -> str:
         status = f"filled with {self.element}" if self.is_filled() else "empty"
         return f"Slot(pos={self.position}, {status})"
+
+
+class SlotArray:
+    """A fixed row of N slots with O(1) allocation and release.
+
+    Elements live in one flat list rather than one :class:`Slot` per position.
+    Free positions are tracked in a hierarchical bitmap: bit ``i`` of level 0
+    is set when slot ``i`` is empty, and each higher level has one bit per
+    64-bit word below it, set when that word has any free slot. Finding the
+    first empty slot descends the levels with word-level bit scans, which is
+    a handful of steps even for millions of slots.
+    """
+
+    def __init__(self, size: int):
+        """
+        Initialize an array of *size* empty slots.
+
+        Args:
+            size: Number of positions
+        """
+        if size < 0:
+            raise ValueError("size must be non-negative")
+        self.size = size
+        self._elements: List[Optional[Any]] = [None] * size
+        self._filled = 0
+
+        self._levels: List[List[int]] = []
+        bits = size
+        while True:
+            words, rest = divmod(bits, _WORD)
+            level = [_FULL] * words
+            if rest:
+                level.append((1 << rest) - 1)
+            self._levels.append(level)
+            if len(level) <= 1:
+                break
+            bits = len(level)
+
+    # -- bitmap maintenance -------------------------------------------------
+
+    def _mark(self, index: int, free: bool) -> None:
+        """Set slot *index* free or used, propagating word transitions upwards."""
+        for level in self._levels:
+            word, bit = divmod(index, _WORD)
+            before = level[word]
+            after = before | (1 << bit) if free else before & ~(1 << bit)
+            level[word] = after
+            # Upper levels only change when a word flips between empty and non-empty.
+            if (before == 0) == (after == 0):
+                return
+            index = word
+
+    def _mark_range(self, start: int, stop: int, free: bool) -> None:
+        """Set slots ``[start, stop)`` free or used with whole-word operations."""
+        leaf = self._levels[0]
+        changed = []
+        first, last = start // _WORD, (stop - 1) // _WORD
+        for word in range(first, last + 1):
+            lo = start - word * _WORD if word == first else 0
+            hi = stop - word * _WORD if word == last else _WORD
+            mask = ((1 << (hi - lo)) - 1) << lo
+            before = leaf[word]
+            after = before | mask if free else before & ~mask
+            leaf[word] = after
+            if (before == 0) != (after == 0):
+                changed.append(word)
+        for word in changed:
+            self._mark_upper(word, free)
+
+    def _mark_upper(self, index: int, free: bool) -> None:
+        for level in self._levels[1:]:
+            word, bit = divmod(index, _WORD)
+            before = level[word]
+            after = before | (1 << bit) if free else before & ~(1 << bit)
+            level[word] = after
+            if (before == 0) == (after == 0):
+                return
+            index = word
+
+    def _check(self, index: int) -> int:
+        if not 0 <= index < self.size:
+            raise IndexError(f"slot {index} out of range for {self.size} slots")
+        return index
+
+    # -- queries ------------------------------------------------------------
+
+    def find_first_empty(self) -> Optional[int]:
+        """Return the lowest empty position, or ``None`` if every slot is filled."""
+        index = 0
+        for level in reversed(self._levels):
+            word = level[index] if index < len(level) else 0
+            if not word:
+                return None
+            index = index * _WORD + ((word & -word).bit_length() - 1)
+        return index
+
+    def is_filled(self, index: int) -> bool:
+        """Check if slot *index* contains an element."""
+        word, bit = divmod(self._check(index), _WORD)
+        return not (self._levels[0][word] >> bit) & 1
+
+    def get(self, index: int) -> Optional[Any]:
+        """Return the element at *index* (``None`` when empty)."""
+        return self._elements[self._check(index)]
+
+    def slot(self, index: int) -> Slot:
+        """Return a standalone :class:`Slot` snapshot of position *index*."""
+        return Slot(position=index, element=self.get(index))
+
+    @property
+    def filled_count(self) -> int:
+        """Number of filled slots."""
+        return self._filled
+
+    # -- mutation -----------------------------------------------------------
+
+    def fill(self, index: int, element: Any) -> None:
+        """Place *element* in slot *index* (replacing any previous element)."""
+        if element is None:
+            raise ValueError("use empty() to clear a slot")
+        if not self.is_filled(index):
+            self._filled += 1
+            self._mark(index, free=False)
+        self._elements[index] = element
+
+    def empty(self, index: int) -> Optional[Any]:
+        """Remove and return the element from slot *index*."""
+        elem = self._elements[self._check(index)]
+        if elem is not None:
+            self._elements[index] = None
+            self._filled -= 1
+            self._mark(index, free=True)
+        return elem
+
+    def allocate(self, element: Any) -> int:
+        """Fill the first empty slot with *element* and return its position.
+
+        Raises:
+            IndexError: If every slot is already filled
+        """
+        index = self.find_first_empty()
+        if index is None:
+            raise IndexError("no empty slots")
+        self.fill(index, element)
+        return index
+
+    def release(self, index: int) -> Optional[Any]:
+        """Free slot *index* for reuse; returns the element it held."""
+        return self.empty(index)
+
+    def fill_range(
+        self, start: int, stop: int, element: Any = None, *, elements: Optional[Iterable[Any]] = None
+    ) -> None:
+        """Fill slots ``[start, stop)`` with *element*, or one item each from *elements*."""
+        start, stop, _ = slice(start, stop).indices(self.size)
+        if start >= stop:
+            return
+        count = stop - start
+        values = list(elements) if elements is not None else [element] * count
+        if len(values) != count or any(value is None for value in values):
+            raise ValueError(f"need {count} non-None elements for slots {start}..{stop - 1}")
+        previously_filled = count - sum(
+            bin(word).count("1") for word in self._range_words(start, stop)
+        )
+        self._elements[start:stop] = values
+        self._filled += count - previously_filled
+        self._mark_range(start, stop, free=False)
+
+    def empty_range(self, start: int, stop: int) -> List[Optional[Any]]:
+        """Empty slots ``[start, stop)`` and return what they held."""
+        start, stop, _ = slice(start, stop).indices(self.size)
+        if start >= stop:
+            return []
+        removed = self._elements[start:stop]
+        free_before = sum(bin(word).count("1") for word in self._range_words(start, stop))
+        self._elements[start:stop] = [None] * (stop - start)
+        self._filled -= (stop - start) - free_before
+        self._mark_range(start, stop, free=True)
+        return removed
+
+    def _range_words(self, start: int, stop: int) -> Iterator[int]:
+        """Yield leaf words masked to ``[start, stop)``."""
+        leaf = self._levels[0]
+        first, last = start // _WORD, (stop - 1) // _WORD
+        for word in range(first, last + 1):
+            lo = start - word * _WORD if word == first else 0
+            hi = stop - word * _WORD if word == last else _WORD
+            yield leaf[word] & (((1 << (hi - lo)) - 1) << lo)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        return f"SlotArray(size={self.size}, filled={self._filled})"
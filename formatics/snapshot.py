@@ -0,0 +1,222 @@
+"""
+Formatics snapshot: Merkle trees of directory contents.
+
+A :class:`Snapshot` hashes every file in a tree (in parallel) and rolls the
+digests up per directory, so two snapshots can be diffed by descending only
+into subtrees whose digests differ. Files that disappear from one place and
+reappear with the same content elsewhere are reported as moves, expressed as
+:class:`~formatics.filestate.FileState` records.
+"""
+
+import hashlib
+import os
+import struct
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from .filestate import FileState, content_hash
+
+_MAGIC = b"FMSNAP1\0"
+_DIGEST_SIZE = 16
+_RECORD = struct.Struct(f"<IQ{_DIGEST_SIZE}s")
+
+
+@dataclass
+class DirNode:
+    """One directory in the Merkle tree."""
+
+    digest: bytes = b""
+    files: Dict[str, bytes] = field(default_factory=dict)
+    dirs: Dict[str, "DirNode"] = field(default_factory=dict)
+
+    def seal(self) -> bytes:
+        """Compute (and store) this directory's digest from its children."""
+        digest = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+        for name in sorted(self.files):
+            digest.update(b"f" + name.encode("utf-8", "surrogateescape") + b"\0" + self.files[name])
+        for name in sorted(self.dirs):
+            child = self.dirs[name].seal()
+            digest.update(b"d" + name.encode("utf-8", "surrogateescape") + b"\0" + child)
+        self.digest = digest.digest()
+        return self.digest
+
+
+@dataclass
+class SnapshotDiff:
+    """Differences between two snapshots, as paths relative to the roots."""
+
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+    moves: List[FileState] = field(default_factory=list)
+    skipped_subtrees: int = 0
+
+
+class Snapshot:
+    """Merkle snapshot of a directory tree."""
+
+    def __init__(self, root: Path, tree: Optional[DirNode] = None):
+        """
+        Initialize a snapshot.
+
+        Args:
+            root: Directory the snapshot describes
+            tree: Pre-built Merkle tree (from :meth:`build` or :meth:`load`)
+        """
+        self.root = Path(root)
+        self.tree = tree if tree is not None else DirNode()
+        if tree is not None and not tree.digest:
+            tree.seal()
+
+    @property
+    def digest(self) -> bytes:
+        """Digest of the whole tree."""
+        return self.tree.digest
+
+    @classmethod
+    def build(cls, root: Path, workers: Optional[int] = None) -> "Snapshot":
+        """Hash every regular file below *root* with a pool of *workers*."""
+        root = Path(root)
+        rels: List[str] = []
+        for dirpath, _, filenames in os.walk(root):
+            rel_dir = os.path.relpath(dirpath, root)
+            for name in filenames:
+                full = os.path.join(dirpath, name)
+                if os.path.isfile(full) and not os.path.islink(full):
+                    rels.append(os.path.normpath(os.path.join(rel_dir, name)))
+
+        # hashlib releases the GIL on large updates, so threads hash in parallel.
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snapshot") as pool:
+            digests = pool.map(lambda rel: bytes.fromhex(content_hash(root / rel)), rels)
+            tree = DirNode()
+            for rel, digest in zip(rels, digests):
+                _insert(tree, rel, digest)
+        tree.seal()
+        return cls(root, tree)
+
+    def files(self) -> Iterator[Tuple[str, bytes]]:
+        """Yield ``(relative path, digest)`` for every file, sorted by path."""
+        yield from _walk_files(self.tree, "")
+
+    def save(self, path: Path) -> None:
+        """Persist the snapshot as a compact binary file.
+
+        Layout: magic, then one record per file (path length, path byte
+        offset, digest) followed by a blob of the concatenated UTF-8 paths.
+        Directory digests are recomputed on load.
+        """
+        entries = list(self.files())
+        encoded = [rel.encode("utf-8", "surrogateescape") for rel, _ in entries]
+        with open(path, "wb") as handle:
+            handle.write(_MAGIC)
+            handle.write(struct.pack("<Q", len(entries)))
+            offset = 0
+            for raw, (_, digest) in zip(encoded, entries):
+                handle.write(_RECORD.pack(len(raw), offset, digest))
+                offset += len(raw)
+            for raw in encoded:
+                handle.write(raw)
+
+    @classmethod
+    def load(cls, path: Path, root: Optional[Path] = None) -> "Snapshot":
+        """Load a snapshot written by :meth:`save`."""
+        data = Path(path).read_bytes()
+        if not data.startswith(_MAGIC):
+            raise ValueError(f"{path} is not a formatics snapshot")
+        (count,) = struct.unpack_from("<Q", data, len(_MAGIC))
+        records_at = len(_MAGIC) + 8
+        blob_at = records_at + count * _RECORD.size
+        tree = DirNode()
+        for length, offset, digest in _RECORD.iter_unpack(data[records_at:blob_at]):
+            start = blob_at + offset
+            rel = data[start : start + length].decode("utf-8", "surrogateescape")
+            _insert(tree, rel, digest)
+        return cls(root if root is not None else Path(), tree)
+
+    def diff(self, other: "Snapshot") -> SnapshotDiff:
+        """Compare this (older) snapshot with *other* (newer).
+
+        Subtrees with equal digests are skipped in O(1). Removed and added
+        files with identical content are paired up as moves, and are then
+        listed in neither ``added`` nor ``removed``. Each move is a FileState
+        with ``relation="move"`` whose origin is the old location under
+        ``self.root``, whose path is the new location under ``other.root``,
+        and whose ``content_hash`` is the file's digest.
+        """
+        result = SnapshotDiff()
+        removed: Dict[str, bytes] = {}
+        added: Dict[str, bytes] = {}
+        _diff_nodes(self.tree, other.tree, "", result, removed, added)
+
+        # Queues keep pairing O(1) even when many files share one digest
+        # (for example empty __init__.py files).
+        removed_by_digest: Dict[bytes, Deque[str]] = {}
+        for rel, digest in removed.items():
+            removed_by_digest.setdefault(digest, deque()).append(rel)
+
+        for rel, digest in added.items():
+            candidates = removed_by_digest.get(digest)
+            if candidates:
+                old_rel = candidates.popleft()
+                del removed[old_rel]
+                moved = FileState(other.root / rel, origin=self.root / old_rel, content_hash=digest.hex())
+                moved.relation = "move"
+                result.moves.append(moved)
+            else:
+                result.added.append(rel)
+        result.removed = list(removed)
+        return result
+
+    def __repr__(self) -> str:
+        return f"Snapshot(root={self.root}, digest={self.digest.hex()[:12]})"
+
+
+def _insert(tree: DirNode, rel: str, digest: bytes) -> None:
+    *dirs, name = rel.split(os.sep)
+    node = tree
+    for part in dirs:
+        node = node.dirs.setdefault(part, DirNode())
+    node.files[name] = digest
+
+
+def _walk_files(node: DirNode, prefix: str) -> Iterator[Tuple[str, bytes]]:
+    entries = [(name, digest, None) for name, digest in node.files.items()]
+    entries += [(name, None, child) for name, child in node.dirs.items()]
+    for name, digest, child in sorted(entries, key=lambda entry: entry[0]):
+        rel = prefix + name
+        if child is None:
+            yield rel, digest
+        else:
+            yield from _walk_files(child, rel + os.sep)
+
+
+def _diff_nodes(
+    old: DirNode,
+    new: DirNode,
+    prefix: str,
+    result: SnapshotDiff,
+    removed: Dict[str, bytes],
+    added: Dict[str, bytes],
+) -> None:
+    if old.digest == new.digest:
+        result.skipped_subtrees += 1
+        return
+    for name, digest in old.files.items():
+        other = new.files.get(name)
+        if other is None:
+            removed[prefix + name] = digest
+        elif other != digest:
+            result.modified.append(prefix + name)
+    for name in sorted(new.files.keys() - old.files.keys()):
+        added[prefix + name] = new.files[name]
+    for name, child in old.dirs.items():
+        other_child = new.dirs.get(name)
+        if other_child is None:
+            removed.update(_walk_files(child, prefix + name + os.sep))
+        else:
+            _diff_nodes(child, other_child, prefix + name + os.sep, result, removed, added)
+    for name in sorted(new.dirs.keys() - old.dirs.keys()):
+        added.update(_walk_files(new.dirs[name], prefix + name + os.sep))
@@ -0,0 +1,74 @@
+import math
+import random
+
+import pytest
+
+from formatics.form import Anchor, AnchorIndex
+from formatics.form import anchor_index
+
+
+def _brute_nearest_k(anchors, point, k):
+    return sorted(anchors, key=lambda a: math.dist(a.position, point))[:k]
+
+
+@pytest.fixture
+def anchors():
+    rng = random.Random(7)
+    return [
+        Anchor(name=f"a{i}", position=(rng.uniform(-50, 50), rng.uniform(-50, 50), rng.uniform(0, 5)))
+        for i in range(2000)
+    ]
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_queries_match_brute_force(anchors, monkeypatch, use_numpy):
+    if use_numpy and anchor_index.np is None:
+        pytest.skip("NumPy not installed")
+    if not use_numpy:
+        monkeypatch.setattr(anchor_index, "np", None)
+    index = AnchorIndex.build(anchors)
+    rng = random.Random(11)
+    points = [(rng.uniform(-70, 70), rng.uniform(-70, 70), rng.uniform(-5, 10)) for _ in range(50)]
+
+    for point, found in zip(points, index.nearest_k_many(points, 5)):
+        assert [a for _, a in found] == _brute_nearest_k(anchors, point, 5)
+    assert index.nearest_many(points[:3]) == [_brute_nearest_k(anchors, p, 1)[0] for p in points[:3]]
+    for point in points[:10]:
+        expected = {a.name for a in anchors if math.dist(a.position, point) <= 6.0}
+        assert {a.name for a in index.within(point, 6.0)} == expected
+
+
+def test_incremental_insert_and_remove(anchors):
+    index = AnchorIndex(cell_size=4.0)
+    for anchor in anchors[:10]:
+        index.insert(anchor)
+
+    target = anchors[3]
+    assert index.nearest(target.position) is target
+    index.remove(target)
+    assert target not in index and len(index) == 9
+    assert index.nearest(target.position) is _brute_nearest_k(anchors[:3] + anchors[4:10], target.position, 1)[0]
+
+    target.position = (1000.0, 1000.0, 1000.0)
+    index.insert(target)
+    assert index.nearest((999.0, 999.0, 999.0)) is target
+    assert AnchorIndex().nearest((0.0, 0.0, 0.0)) is None
+
+
+def test_queries_far_outside_the_data_visit_only_the_bounding_box(anchors, monkeypatch):
+    index = AnchorIndex.build(anchors)
+    visited = []
+    shell = index._shell
+    monkeypatch.setattr(index, "_shell", lambda center, ring: visited.append(ring) or shell(center, ring))
+
+    for point in [(600.0, 600.0, 600.0), (-900.0, 10.0, 2.0), (0.0, 0.0, -400.0)]:
+        visited.clear()
+        found = index.nearest_k(point, 3)
+        assert [a for _, a in found] == _brute_nearest_k(anchors, point, 3)
+        # The search starts at the first ring that reaches the data and stops a few rings later.
+        first, _ = index._ring_bounds(index._cell(point))
+        assert visited[0] == first > 100 and len(visited) <= 5
+
+    far = (500.0, 500.0, 500.0)
+    expected = {a.name for a in anchors if math.dist(a.position, far) <= 700.0}
+    assert {a.name for a in index.within(far, 700.0)} == expected
@@ -0,0 +1,48 @@
+from array import array
+
+from formatics.form import Element, ElementTable, FormElement
+
+
+def _form():
+    elements = [Element(i, {"unit": "m", "weight": i * 0.5}) for i in range(20)]
+    elements[3] = Element(3, {"unit": "cm"})
+    elements[7] = Element("seven", {"weight": 3.5, "note": "odd"})
+    elements[9] = Element(None)
+    return FormElement(elements, form_type="grid")
+
+
+def test_round_trip_through_form():
+    form = _form()
+    table = ElementTable.from_form(form)
+    assert len(table) == 20 and sorted(table.keys) == ["note", "unit", "weight"]
+    back = table.to_form()
+    assert back.form_type == "grid"
+    assert back.elements == form.elements
+    assert table.column("note") == [None] * 7 + ["odd"] + [None] * 12
+    assert isinstance(table._columns["weight"].data, array)
+
+
+def test_row_views_write_through():
+    table = ElementTable.from_form(_form())
+    row = table[3]
+    assert row == Element(3, {"unit": "cm"})
+    assert dict(row.metadata) == {"unit": "cm"}
+
+    row.metadata["weight"] = 9.0
+    row.value = 30
+    del table[-1].metadata["unit"]
+    assert table[3].to_element() == Element(30, {"unit": "cm", "weight": 9.0})
+    assert "unit" not in table[19].metadata
+    assert row.transform(lambda v: v + 1).value == 31
+    row.metadata["weight"] = "heavy"
+    assert table[4].metadata["weight"] == 2.0 and table[3].metadata["weight"] == "heavy"
+
+
+def test_where_filters_by_one_column():
+    table = ElementTable.from_form(_form())
+    heavy = table.where(lambda w: w >= 8.0, key="weight")
+    assert [row.value for row in heavy] == [16, 17, 18, 19]
+    assert heavy.form_type == "grid"
+    assert [row.value for row in table.where(lambda v: v == "seven")] == ["seven"]
+    assert len(table.where(lambda _: True, key="missing")) == 0
+    assert table.take([9, 0])[0].value is None
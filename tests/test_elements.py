@@ -0,0 +1,155 @@
+import dataclasses
+import pickle
+
+import pytest
+
+from formatics.form import Element, FormElement, LazyElement, TransformPipeline
+
+
+def test_transform_metadata_is_independent():
+    source = Element(1, {"unit": "m"})
+    derived = source.transform(lambda v: v + 1)
+    assert derived.value == 2
+    assert derived.metadata == {"unit": "m"}
+
+    derived.metadata["unit"] = "cm"
+    assert source.metadata == {"unit": "m"}
+    source.metadata["extra"] = True
+    assert "extra" not in derived.metadata
+
+
+def test_transform_chain_shares_metadata_until_accessed():
+    meta = {"k": 1}
+    source = Element(0, meta)
+    first = source.transform(lambda v: v + 1)
+    # The caller still holds ``meta``, so the first step copies it once...
+    assert first._metadata is not meta
+    end = first
+    for _ in range(9):
+        end = end.transform(lambda v: v + 1)
+    # ...and the rest of the chain shares that copy.
+    assert end._metadata is first._metadata
+    assert end.value == 10
+    assert end.metadata == meta and end._metadata is not meta
+    assert dataclasses.asdict(end) == {"value": 10, "metadata": {"k": 1}}
+    assert end == Element(10, {"k": 1})
+
+
+def test_transform_copies_metadata_already_handed_out():
+    source = Element(1, {"a": 1})
+    source.transform(lambda v: v)  # leaves source's dict marked as shared
+    held = source.metadata
+    derived = source.transform(lambda v: v + 1)
+    held["x"] = 1
+    assert derived.metadata == {"a": 1}
+
+    meta = {"a": 1}
+    derived = Element(1, meta).transform(lambda v: v + 1)
+    meta["x"] = 1
+    assert derived.metadata == {"a": 1}
+
+
+# Pickled by the dataclass Element with a plain ``metadata`` field.
+_LEGACY_ELEMENT = (
+    b"\x80\x02cformatics.form.elements\nElement\nq\x00)\x81q\x01}q\x02(X\x05\x00\x00\x00valueq\x03K\x03"
+    b"X\x08\x00\x00\x00metadataq\x04}q\x05X\x04\x00\x00\x00unitq\x06X\x01\x00\x00\x00mq\x07sub."
+)
+_LEGACY_FORM = (
+    b"\x80\x02cformatics.form.elements\nFormElement\nq\x00)\x81q\x01}q\x02(X\x08\x00\x00\x00elementsq\x03]q\x04("
+    b"cformatics.form.elements\nElement\nq\x05)\x81q\x06}q\x07(X\x05\x00\x00\x00valueq\x08K\x01X\x08\x00\x00\x00"
+    b"metadataq\t}q\nX\x01\x00\x00\x00aq\x0bK\x01subh\x05)\x81q\x0c}q\r(h\x08K\x02h\t}q\x0eubeX\t\x00\x00\x00"
+    b"form_typeq\x0fX\x04\x00\x00\x00lineq\x10ub."
+)
+
+
+def test_legacy_pickles_load():
+    element = pickle.loads(_LEGACY_ELEMENT)
+    assert element == Element(3, {"unit": "m"})
+    assert element.metadata == {"unit": "m"}
+    derived = element.transform(lambda v: v + 1)
+    assert derived.value == 4 and derived.metadata == {"unit": "m"}
+
+    form = pickle.loads(_LEGACY_FORM)
+    assert form == FormElement([Element(1, {"a": 1}), Element(2)], "line")
+    assert [e.value for e in form.map(lambda v: v * 10).elements] == [10, 20]
+
+
+def test_equality_does_not_copy_shared_metadata():
+    source = Element(1)
+    source._metadata = {"k": 1}
+    source._metadata_exposed = False
+    left, right = source.transform(str), source.transform(str)
+    assert left == right
+    assert left._metadata is right._metadata is source._metadata
+
+
+def test_lazy_chain_defers_and_fuses():
+    calls = []
+
+    def step(v):
+        calls.append(v)
+        return v * 2
+
+    lazy = Element(1, {"a": 1}).lazy().transform(step).transform(step).transform(step)
+    assert isinstance(lazy, LazyElement) and calls == []
+    assert lazy.value == 8
+    assert lazy.value == 8 and calls == [1, 2, 4]
+
+    result = lazy.materialize()
+    assert result == Element(8, {"a": 1})
+    result.metadata["a"] = 2
+    assert lazy.source.metadata == {"a": 1}
+
+
+def test_pipeline_reuse():
+    pipeline = TransformPipeline().then(lambda v: v + 1).then(str)
+    assert len(pipeline) == 2
+    assert [pipeline(Element(i)).value for i in range(3)] == ["1", "2", "3"]
+    assert Element(5).lazy().transform(abs).pipeline().funcs == (abs,)
+
+
+def _square(value):
+    return value * value
+
+
+def test_iter_compose_streams_values():
+    form = FormElement([Element(i) for i in range(5)], form_type="row")
+    values = form.iter_compose()
+    assert next(values) == 0
+    assert list(values) == [1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_map_matches_per_element_transform(vectorized):
+    form = FormElement([Element(i, {"i": i}) for i in range(10)] + [Element(2.5)], form_type="row")
+    mapped = form.map(_square, vectorized=vectorized, chunksize=3)
+    assert mapped.form_type == "row"
+    expected = [e.transform(_square).value for e in form.elements]
+    assert [(type(v), v) for v in mapped.compose()] == [(type(v), v) for v in expected]
+    assert mapped.elements[4].metadata == {"i": 4}
+
+
+def test_map_vectorized_falls_back_for_non_numeric():
+    form = FormElement([Element("ab"), Element(2**70)])
+    assert form.map(lambda v: v * 2, vectorized=True).compose() == ["abab", 2**71]
+
+
+@pytest.mark.parametrize(
+    "values, func",
+    [
+        ([2**40, 3], _square),  # overflows int64
+        ([1, 2.5, 2**40], lambda v: v * 2),  # mixed ints and floats
+        ([3, -7, 10**15], lambda v: v // 4 - v % 3),
+        ([0.5, 1e300], _square),  # float overflow Python reports as inf
+    ],
+)
+def test_map_vectorized_keeps_python_results(values, func):
+    form = FormElement([Element(v) for v in values])
+    expected = [func(v) for v in values]
+    mapped = form.map(func, vectorized=True).compose()
+    assert [(type(v), v) for v in mapped] == [(type(v), v) for v in expected]
+
+
+def test_map_process_pool():
+    form = FormElement([Element(i) for i in range(1000)])
+    assert form.map(_square, workers=2, chunksize=64).compose() == [i * i for i in range(1000)]
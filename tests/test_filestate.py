@@ -5,9 +5,14 @@ import runpy
 import shutil
 import subprocess
 import sys
+import threading
 from pathlib import Path
 
 
+# Self time (excluding stdlib dependencies) allowed for ``import filestate`` from a deep stack.
+IMPORT_BUDGET_US = int(os.environ.get("FILESTATE_IMPORT_BUDGET_US", "20000"))
+
+
 def _read_origin_line(path: Path) -> str:
     return path.read_text(encoding="utf-8").splitlines()[0]
 
@@ -15,6 +20,9 @@ def _read_origin_line(path: Path) -> str:
 def test_origin_is_recorded_on_first_import(tmp_path, monkeypatch):
     repo_root = Path(__file__).resolve().parents[1]
     monkeypatch.syspath_prepend(str(repo_root))
+    # Other tests (and the tools) may already have imported filestate in this process.
+    monkeypatch.delitem(sys.modules, "filestate", raising=False)
+    monkeypatch.delenv("FILESTATE_DISABLE_AUTO_PRIME", raising=False)
 
     script = tmp_path / "example.py"
     script.write_text("from filestate import folderleap\nprint('hello')\n", encoding="utf-8")
@@ -54,3 +62,199 @@ def test_folder_leap_rewrites_origin_without_trigger(monkeypatch, tmp_path):
     assert result.returncode == 0, result.stderr.decode()
     moved_origin_line = _read_origin_line(copied)
     assert moved_origin_line.split(":", 1)[1].strip() == str(moved_dir.resolve())
+
+
+def test_registry_backend_tracks_leaps_without_touching_script(tmp_path):
+    repo_root = Path(__file__).resolve().parents[1]
+    original_dir = tmp_path / "original"
+    moved_dir = tmp_path / "moved"
+    original_dir.mkdir()
+    moved_dir.mkdir()
+
+    source = "from filestate import folderleap\nprint('hi')\n"
+    script = original_dir / "example.py"
+    script.write_text(source, encoding="utf-8")
+
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join([str(repo_root), env.get("PYTHONPATH", "")])
+    env["FILESTATE_REGISTRY"] = str(tmp_path / "registry.sqlite3")
+
+    # First run records the origin in the registry; the script stays untouched.
+    result = subprocess.run([sys.executable, str(script)], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert script.read_text(encoding="utf-8") == source
+    assert "[folderleap]" not in result.stdout
+
+    moved = moved_dir / script.name
+    os.rename(script, moved)
+
+    # The move is detected via the registry and the handler re-runs the script exactly once.
+    result = subprocess.run([sys.executable, str(moved)], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert moved.read_text(encoding="utf-8") == source
+    assert f"from: {original_dir.resolve()}" in result.stdout
+    assert result.stdout.count("hi\n") == 2
+
+    # Subsequent runs from the new folder are quiet.
+    result = subprocess.run([sys.executable, str(moved)], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert "[folderleap]" not in result.stdout
+
+
+def test_registry_touches_disk_only_when_used(tmp_path, monkeypatch):
+    repo_root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(repo_root))
+    monkeypatch.setenv("FILESTATE_DISABLE_AUTO_PRIME", "1")
+    import filestate
+
+    db_path = tmp_path / "state" / "registry.sqlite3"
+    script = tmp_path / "example.py"
+    script.write_text("print('hi')\n", encoding="utf-8")
+
+    registry = filestate._OriginRegistry(db_path)
+    assert not db_path.parent.exists()
+    assert registry.lookup(script, script.stat()) is None
+    registry.store(script, script.stat(), str(tmp_path))
+    registry.close()
+
+    # Reopening an existing database skips the schema setup and still finds the row.
+    registry = filestate._OriginRegistry(db_path)
+    assert registry.lookup(script, script.stat()) == str(tmp_path)
+    registry.close()
+
+
+def test_import_stays_within_budget_from_deep_call_stack(tmp_path):
+    repo_root = Path(__file__).resolve().parents[1]
+    script = tmp_path / "deep.py"
+    script.write_text(
+        "def dive(n):\n"
+        "    if n:\n"
+        "        return dive(n - 1)\n"
+        "    import filestate  # noqa: F401\n"
+        "\n"
+        "dive(400)\n",
+        encoding="utf-8",
+    )
+
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join([str(repo_root), env.get("PYTHONPATH", "")])
+
+    # Prime once so the measured runs take the common "no leap" path.
+    subprocess.run([sys.executable, str(script)], env=env, check=True)
+
+    timings = []
+    for _ in range(3):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", str(script)],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        for line in result.stderr.splitlines():
+            fields = [field.strip() for field in line.split("|")]
+            if len(fields) == 3 and fields[2] == "filestate":
+                timings.append(int(fields[0].rsplit(" ", 1)[-1]))
+
+    assert timings, "filestate import was not reported by -X importtime"
+    assert min(timings) < IMPORT_BUDGET_US, f"import filestate took {min(timings)}us"
+
+
+def test_concurrent_imports_never_corrupt_the_script(tmp_path):
+    repo_root = Path(__file__).resolve().parents[1]
+    body = "from filestate import folderleap\n" + "".join(f"# filler line {i}\n" for i in range(50000))
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join([str(repo_root), env.get("PYTHONPATH", "")])
+    env["FILESTATE_DISABLE_TRIGGER"] = "1"
+
+    script = tmp_path / "origin_a" / "worker.py"
+    script.parent.mkdir()
+    script.write_text(body, encoding="utf-8")
+    valid = {body}
+
+    for round_dir in ("origin_b", "origin_c", "origin_a_again"):
+        target = tmp_path / round_dir / "worker.py"
+        target.parent.mkdir()
+        shutil.copy(script, target)
+        valid.add(f"# ORIGIN:{target.parent.resolve()}\n{body}")
+        valid.add(target.read_text(encoding="utf-8"))
+
+        procs = [
+            subprocess.Popen([sys.executable, str(target)], env=env, stderr=subprocess.PIPE)
+            for _ in range(16)
+        ]
+        # Every observation made while the workers race must be a complete script.
+        while any(proc.poll() is None for proc in procs):
+            assert target.read_text(encoding="utf-8") in valid
+        for proc in procs:
+            assert proc.wait() == 0, proc.stderr.read().decode()
+
+        assert target.read_text(encoding="utf-8") == f"# ORIGIN:{target.parent.resolve()}\n{body}"
+        assert sorted(p.name for p in target.parent.iterdir()) == ["worker.py"]
+        script = target
+
+
+def test_leap_modes_rerun_the_moved_script_once(tmp_path):
+    repo_root = Path(__file__).resolve().parents[1]
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join([str(repo_root), env.get("PYTHONPATH", "")])
+
+    for mode in ("inprocess", "pool", "async"):
+        original_dir = tmp_path / mode / "original"
+        moved_dir = tmp_path / mode / "moved"
+        original_dir.mkdir(parents=True)
+        moved_dir.mkdir()
+        script = original_dir / "example.py"
+        # The spawn default must not make pooled workers re-import the script as __mp_main__.
+        script.write_text(
+            "import multiprocessing\n"
+            "multiprocessing.set_start_method('spawn', force=True)\n"
+            "from filestate import folderleap\n"
+            "print('<ran>', flush=True)\n",
+            encoding="utf-8",
+        )
+
+        subprocess.run([sys.executable, str(script)], env=env, check=True, capture_output=True)
+        moved = moved_dir / script.name
+        os.rename(script, moved)
+
+        result = subprocess.run(
+            [sys.executable, str(moved)],
+            env=dict(env, FILESTATE_LEAP_MODE=mode),
+            capture_output=True,
+            text=True,
+        )
+        assert result.returncode == 0, result.stderr
+        assert "[folderleap] example.py moved:" in result.stdout
+        assert result.stdout.count("<ran>") == 2, (mode, result.stdout)
+        assert _read_origin_line(moved) == f"# ORIGIN:{moved_dir.resolve()}"
+
+
+def test_async_leap_reports_through_callback(tmp_path, monkeypatch):
+    repo_root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(repo_root))
+    monkeypatch.setenv("FILESTATE_DISABLE_AUTO_PRIME", "1")
+    import filestate
+
+    monkeypatch.setattr(filestate, "_LEAP_CALLBACKS", [])
+    monkeypatch.setattr(filestate, "_PENDING_LEAPS", [])
+
+    marker = tmp_path / "ran.txt"
+    script = tmp_path / "example.py"
+    script.write_text(f"open({str(marker)!r}, 'w').write('ran')\n", encoding="utf-8")
+
+    reported = []
+    done = threading.Event()
+
+    def on_done(path, future):
+        reported.append((path, future.exception()))
+        done.set()
+
+    filestate.add_leap_callback(on_done)
+    future = filestate._on_leap(script, "/old", str(tmp_path), mode="async")
+
+    assert future is not None
+    assert done.wait(timeout=30)
+    assert future in filestate.pending_leaps()
+    assert reported == [(script, None)]
+    assert marker.read_text() == "ran"
@@ -0,0 +1,178 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from formatics.filestate import FileState
+from formatics.folderleap import FolderLeap
+
+
+def test_remap_matches_apply_lazily():
+    leap = FolderLeap(Path("/srv/old"), Path("/srv/new"))
+    paths = ["/srv/old/a.py", Path("/srv/old/pkg/b.py"), "/srv/old"]
+
+    remapped = leap.remap(iter(paths))
+
+    assert next(remapped) == "/srv/new/a.py"
+    assert list(remapped) == ["/srv/new/pkg/b.py", "/srv/new"]
+    assert [str(leap.apply(Path(p))) for p in paths] == ["/srv/new/a.py", "/srv/new/pkg/b.py", "/srv/new"]
+
+
+def test_remap_rejects_paths_outside_source():
+    leap = FolderLeap(Path("/srv/old"), Path("/srv/new"))
+
+    with pytest.raises(ValueError):
+        list(leap.remap(["/srv/older/a.py"]))
+
+
+def test_remap_stream_and_tracked_index():
+    leap = FolderLeap(Path("/srv/old"), Path("/srv/new"))
+    stream = io.StringIO("/srv/old/a.py\n/srv/old/b/c.py\n")
+
+    assert list(leap.remap_stream(stream)) == ["/srv/new/a.py\n", "/srv/new/b/c.py\n"]
+
+    state = FileState(Path("/srv/old/a.py"))
+    leap.track_file(state)
+    assert leap.get_tracked("/srv/old/a.py") is state
+    assert leap.get_tracked(Path("/srv/old/missing.py")) is None
+
+
+def _make_tree(root: Path) -> None:
+    (root / "pkg" / "empty").mkdir(parents=True)
+    (root / "a.py").write_text("print('a')\n", encoding="utf-8")
+    (root / "pkg" / "b.bin").write_bytes(bytes(range(256)) * 4096)
+
+
+def test_execute_renames_on_same_device(tmp_path):
+    from formatics.lineage import LineageStore
+
+    source, target = tmp_path / "src", tmp_path / "dst"
+    _make_tree(source)
+    store = LineageStore()
+
+    states = FolderLeap(source, target).execute(store=store)
+
+    assert not source.exists()
+    assert (target / "pkg" / "b.bin").read_bytes() == bytes(range(256)) * 4096
+    assert (target / "pkg" / "empty").is_dir()
+    by_path = {state.path: state for state in states}
+    assert by_path[target / "a.py"].origin == source / "a.py"
+    assert store.lineage(by_path[target / "a.py"]) == [source / "a.py", target / "a.py"]
+    assert list(tmp_path.iterdir()) == [target]
+
+
+def test_execute_resumes_interrupted_copy(tmp_path, monkeypatch):
+    import formatics.folderleap as folderleap
+
+    source, target = tmp_path / "src", tmp_path / "dst"
+    _make_tree(source)
+    target.mkdir()  # an existing target forces the copy path
+    journal = tmp_path / "leap.journal"
+
+    real_copy = folderleap._copy_file
+    calls = []
+
+    def flaky_copy(src, dst):
+        calls.append(src)
+        if src.endswith("b.bin") and len(calls) <= 2:
+            raise OSError("disk went away")
+        real_copy(src, dst)
+
+    monkeypatch.setattr(folderleap, "_copy_file", flaky_copy)
+    leap = FolderLeap(source, target)
+    with pytest.raises(OSError):
+        leap.execute(workers=1, journal=journal)
+    assert source.exists()
+
+    copied_before = journal.read_text(encoding="utf-8").splitlines()
+    states = leap.execute(workers=1, journal=journal)
+
+    assert not source.exists()
+    assert (target / "a.py").read_text(encoding="utf-8") == "print('a')\n"
+    assert (target / "pkg" / "b.bin").stat().st_size == 256 * 4096
+    assert {state.path for state in states} == {target / "a.py", target / "pkg" / "b.bin"}
+    assert journal.read_text(encoding="utf-8").splitlines()[-1] == "complete\t"
+    # Files finished before the interruption were not copied again.
+    assert sum(c.endswith("a.py") for c in calls) == 1
+    assert copied_before == ["started\t", "copied\ta.py"]
+
+
+def test_execute_into_existing_target_registers_only_copied_files(tmp_path):
+    source, target = tmp_path / "src", tmp_path / "dst"
+    _make_tree(source)
+    target.mkdir()
+    (target / "unrelated.txt").write_text("keep", encoding="utf-8")
+
+    states = FolderLeap(source, target).execute(workers=2)
+
+    assert (target / "unrelated.txt").read_text(encoding="utf-8") == "keep"
+    assert {state.path for state in states} == {target / "a.py", target / "pkg" / "b.bin"}
+    assert {state.origin for state in states} == {source / "a.py", source / "pkg" / "b.bin"}
+
+
+def test_execute_refuses_to_overwrite_existing_files(tmp_path):
+    source, target = tmp_path / "src", tmp_path / "dst"
+    _make_tree(source)
+    target.mkdir()
+    (target / "a.py").write_text("mine", encoding="utf-8")
+
+    with pytest.raises(FileExistsError):
+        FolderLeap(source, target).execute()
+
+    assert (target / "a.py").read_text(encoding="utf-8") == "mine"
+    assert not (target / "pkg" / "b.bin").exists()
+    assert (source / "a.py").exists()
+
+
+def test_copy_file_uses_kernel_transfer(tmp_path):
+    from formatics.folderleap import _copy_file
+
+    source = tmp_path / "big.bin"
+    source.write_bytes(b"x" * (3 << 20))
+    source.chmod(0o640)
+    _copy_file(str(source), str(tmp_path / "copy.bin"))
+
+    assert (tmp_path / "copy.bin").read_bytes() == source.read_bytes()
+    assert (tmp_path / "copy.bin").stat().st_mode & 0o777 == 0o640
+
+
+def test_execute_copies_when_rename_crosses_filesystems(tmp_path, monkeypatch):
+    import errno
+    import os
+
+    source, target = tmp_path / "src", tmp_path / "dst"
+    _make_tree(source)
+    renames = []
+
+    def cross_device_rename(src, dst):
+        renames.append(src)
+        raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+
+    monkeypatch.setattr(os, "rename", cross_device_rename)
+    states = FolderLeap(source, target).execute(workers=2)
+
+    assert renames == [source]
+    assert not source.exists()
+    assert (target / "pkg" / "b.bin").read_bytes() == bytes(range(256)) * 4096
+    assert {state.path for state in states} == {target / "a.py", target / "pkg" / "b.bin"}
+
+
+@pytest.mark.skipif(not hasattr(__import__("os"), "mkfifo"), reason="needs FIFOs")
+def test_special_files_are_refused_before_copying(tmp_path):
+    import os
+
+    from formatics.folderleap import _copy_file
+
+    source, target = tmp_path / "src", tmp_path / "dst"
+    _make_tree(source)
+    os.mkfifo(source / "pkg" / "pipe")
+    target.mkdir()
+
+    with pytest.raises(ValueError, match="special file"):
+        FolderLeap(source, target).execute()
+    assert [p for p in target.rglob("*") if not p.is_dir()] == []
+    assert (source / "a.py").exists()
+
+    with pytest.raises(ValueError, match="not a regular file"):
+        _copy_file(str(source / "pkg" / "pipe"), str(tmp_path / "copy"))
+    assert not (tmp_path / "copy").exists()
@@ -0,0 +1,37 @@
+import shutil
+from pathlib import Path
+
+from formatics.filestate import FileState
+
+
+def test_compact_state_has_no_instance_dict_and_lazy_metadata():
+    state = FileState(Path("/srv/a.py"))
+
+    assert not hasattr(state, "__dict__")
+    assert state._metadata is None
+    state.metadata["tag"] = "x"
+    assert state.metadata == {"tag": "x"}
+    assert isinstance(state.created_ns, int)
+    assert state.created_at.year >= 2024
+
+
+def test_track_move_distinguishes_move_from_copy(tmp_path):
+    source = tmp_path / "a.py"
+    source.write_text("print('a')\n", encoding="utf-8")
+    state = FileState.capture(source, hash_content=True)
+
+    copied = state.track_move(shutil.copy(source, tmp_path / "copy.py"))
+    assert copied.relation == "copy"
+    assert copied.origin == source
+
+    moved = state.track_move(Path(shutil.move(str(source), tmp_path / "moved.py")))
+    assert moved.relation == "move"
+    assert moved.identity() == state.identity()
+    assert moved.get_lineage() == (source, tmp_path / "moved.py")
+
+
+def test_track_move_without_identity_keeps_plain_semantics():
+    moved = FileState(Path("/old/a.py")).track_move(Path("/new/a.py"))
+
+    assert moved.relation is None
+    assert moved.get_lineage() == (Path("/old/a.py"), Path("/new/a.py"))
@@ -0,0 +1,273 @@
+import pickle
+import threading
+from datetime import datetime
+
+import pytest
+
+from formatics.logs import History, HistoryEntry, ShardedHistory
+
+
+def test_unbounded_history_keeps_everything():
+    history = History()
+    for i in range(5):
+        history.record("step", i, index=i)
+    assert len(history) == 5
+    assert [e.element for e in history.get_recent(2)] == [3, 4]
+    assert history.get_recent(0) == []
+    assert history.entries[0].metadata == {"index": 0}
+    assert history.entries[0].timestamp_ns <= history.entries[-1].timestamp_ns
+
+
+def test_ring_buffer_evicts_oldest_in_order():
+    evicted = []
+    history = History(capacity=3, on_evict=evicted.append)
+    for i in range(7):
+        history.record("even" if i % 2 == 0 else "odd", i)
+
+    assert len(history) == 3
+    assert [e.element for e in history] == [4, 5, 6]
+    assert [e.element for e in evicted] == [0, 1, 2, 3]
+    assert [e.element for e in history.get_recent(2)] == [5, 6]
+    assert [e.element for e in history.get_recent(10)] == [4, 5, 6]
+    assert [e.element for e in history.filter_by_action("even")] == [4, 6]
+
+    history.clear()
+    assert len(history) == 0 and history.entries == []
+    history.record("again", 7)
+    assert [e.element for e in history.entries] == [7]
+    with pytest.raises(ValueError):
+        History(capacity=0)
+
+
+def test_bounded_history_forgets_evicted_actions():
+    history = History(capacity=100)
+    for i in range(20_000):
+        history.record(f"action{i}", i)
+    assert len(history._postings) == 100
+    assert all(len(p.seqs) <= 2 * len(p) for p in history._postings.values())
+
+    history = History(capacity=10)
+    for i in range(5_000):
+        history.record("busy" if i % 10 else "rare", i)
+    busy = history._postings["busy"]
+    assert len(busy) == 9 and len(busy.seqs) <= 18
+    assert [e.element for e in history.query("rare")] == [4990]
+
+
+def test_entries_is_a_snapshot_and_assignment_rebuilds_indexes():
+    history = History()
+    for i in range(6):
+        history.record("even" if i % 2 == 0 else "odd", i)
+
+    entries = history.entries
+    assert entries == list(history)
+    for mutate in (lambda: entries.append(entries[0]), entries.clear, lambda: entries.__setitem__(0, None)):
+        with pytest.raises(TypeError):
+            mutate()
+    assert pickle.loads(pickle.dumps(entries)) == entries
+    assert [e.element for e in history.query("odd")] == [1, 3, 5]
+
+    history.entries = [e for e in history if e.action == "even"]
+    assert len(history) == 3
+    assert list(history.query("odd")) == []
+    assert [e.element for e in history.query("even", limit=2, newest_first=True)] == [4, 2]
+
+
+def test_entry_is_compact_and_keeps_datetime_api():
+    moment = datetime(2025, 1, 2, 3, 4, 5, 678901)
+    entry = HistoryEntry(moment, "create", "x")
+    assert entry.timestamp == moment
+    assert entry._metadata is None and entry.metadata == {}
+    assert not hasattr(entry, "__dict__")
+    entry.timestamp = datetime(2025, 1, 2, 3, 4, 6)
+    assert entry.timestamp.second == 6
+    assert entry == HistoryEntry(entry.timestamp, "create", "x")
+
+
+def _brute(history, action, since, until, limit, newest_first):
+    found = [
+        e
+        for e in history
+        if (action is None or e.action == action)
+        and (since is None or e.timestamp_ns >= since)
+        and (until is None or e.timestamp_ns < until)
+    ]
+    if newest_first:
+        found.reverse()
+    return found if limit is None else found[:limit]
+
+
+@pytest.mark.parametrize("capacity", [None, 37])
+@pytest.mark.parametrize("shuffled", [False, True])
+def test_query_matches_linear_scan(capacity, shuffled):
+    history = History(capacity=capacity)
+    actions = ["move", "copy", "move", "delete", "move"]
+    for i in range(200):
+        ns = 1000 + i * 10 if not shuffled else 1000 + (i * 7919) % 2000
+        history.append(HistoryEntry(action=actions[i % 5], element=i, timestamp_ns=ns))
+
+    for action in (None, "move", "delete", "missing"):
+        for since, until in ((None, None), (1500, None), (None, 2100), (1200, 1290), (2500, 1000)):
+            for limit in (None, 0, 3, 1000):
+                for newest_first in (False, True):
+                    expected = _brute(history, action, since, until, limit, newest_first)
+                    got = list(history.query(action, since=since, until=until, limit=limit, newest_first=newest_first))
+                    assert [e.element for e in got] == [e.element for e in expected]
+
+
+def test_query_accepts_datetimes_and_is_lazy():
+    history = History()
+    history.append(HistoryEntry(datetime(2025, 1, 1, 12, 0), "move", "a"))
+    history.append(HistoryEntry(datetime(2025, 1, 1, 12, 5), "move", "b"))
+    history.append(HistoryEntry(datetime(2025, 1, 1, 12, 9), "copy", "c"))
+    results = history.query("move", since=datetime(2025, 1, 1, 12, 1))
+    history.record("move", "later")
+    assert [e.element for e in results] == ["b"]
+    assert [e.element for e in history.query("move", limit=2, newest_first=True)] == ["later", "b"]
+    assert [e.element for e in history.filter_by_action("copy")] == ["c"]
+
+
+def test_sharded_history_merges_threads_in_sequence_order():
+    history = ShardedHistory(capacity=5000)
+
+    def produce(worker):
+        for i in range(500):
+            history.record("step", (worker, i))
+
+    threads = [threading.Thread(target=produce, args=(w,)) for w in range(8)]
+    for thread in threads:
+        thread.start()
+    partial = len(history)
+    for thread in threads:
+        thread.join()
+
+    assert partial <= 4000 and len(history) == 4000
+    entries = history.entries
+    for worker in range(8):
+        assert [e.element[1] for e in entries if e.element[0] == worker] == list(range(500))
+    assert len(list(history.query("step", limit=3))) == 3
+    assert history._shards == []
+
+
+def test_sharded_history_skips_lost_sequence_numbers():
+    history = ShardedHistory()
+    history.record("first", 1)
+    # A number drawn without a row (as a trimmed row leaves behind) must not stall merging.
+    next(history._counter)
+    other = threading.Thread(target=history.record, args=("later", 2))
+    other.start()
+    other.join()
+    assert [e.action for e in history] == ["first", "later"]
+    history.record("last", 3)
+    assert [e.action for e in history] == ["first", "later", "last"]
+
+
+def test_sharded_history_keeps_rows_a_finishing_thread_appends_during_merge():
+    history = ShardedHistory()
+
+    class _Finishing:
+        """A writer that appends its last row and exits while merge looks at it."""
+
+        def __init__(self):
+            self.running = True
+
+        def is_alive(self):
+            if self.running:
+                self.running = False
+                shard.rows.extend((HistoryEntry(action="last", timestamp_ns=1), next(history._counter)))
+            return self.running
+
+    shard = history._shard()
+    shard.thread = _Finishing()
+    for _ in range(2):
+        history.merge()
+    assert [e.action for e in history] == ["last"]
+    assert history._shards == []
+
+
+def test_sharded_history_bounds_writer_only_buffers():
+    evicted = []
+    history = ShardedHistory(capacity=10, on_evict=evicted.append)
+
+    def produce():
+        for i in range(1000):
+            history.record("step", i)
+        assert len(history._local.shard.rows) < 40
+
+    thread = threading.Thread(target=produce)
+    thread.start()
+    thread.join()
+    assert [e.element for e in history] == list(range(990, 1000))
+    assert [e.element for e in evicted] == list(range(990))
+
+
+def test_sharded_history_merges_timestamps_in_order(monkeypatch):
+    from formatics.logs import history as history_module
+
+    # Stamps taken before a preempted thread drew its number arrive out of order.
+    stamps = iter([30, 10, 20, 40])
+    monkeypatch.setattr(history_module, "monotonic_ns", lambda: next(stamps))
+    history = ShardedHistory()
+    for element in "abcd":
+        history.record("step", element)
+    assert [e.timestamp_ns for e in history] == [30, 30, 30, 40]
+    assert history.merge()._time_sorted
+    assert [e.element for e in history.query(since=31)] == ["d"]
+
+
+def test_sharded_history_clear_drops_unmerged_rows():
+    history = ShardedHistory()
+    history.record("step", 1)
+    history.merge()
+    history.record("step", 2)
+    history.clear()
+    assert len(history) == 0 and history._pending == []
+    history.record("step", 3)
+    assert [e.element for e in history] == [3]
+
+
+def test_since_seq_resumes_without_gaps_or_repeats():
+    history = History(capacity=4)
+    for i in range(6):
+        history.record("step", i)
+    assert (history.first_seq, history.end_seq) == (2, 6)
+    assert [e.element for e in history.since_seq(4)] == [4, 5]
+    with pytest.raises(ValueError):
+        history.since_seq(1)
+
+
+# Pickled by formatics before HistoryEntry used __slots__ and History kept indexes.
+_LEGACY_ENTRY = (
+    b"\x80\x02cformatics.logs.history\nHistoryEntry\nq\x00)\x81q\x01}q\x02(X\t\x00\x00\x00timestampq\x03cdatetime\n"
+    b"datetime\nq\x04c_codecs\nencode\nq\x05X\x0b\x00\x00\x00\x07\xc3\xa8\x01\x02\x03\x04\x05\x00\x00\x00q\x06X\x06"
+    b"\x00\x00\x00latin1q\x07\x86q\x08Rq\t\x85q\nRq\x0bX\x06\x00\x00\x00actionq\x0cX\x04\x00\x00\x00moveq\rX\x07"
+    b"\x00\x00\x00elementq\x0eK\x01X\x08\x00\x00\x00metadataq\x0f}q\x10X\x01\x00\x00\x00kq\x11X\x01\x00\x00\x00vq\x12sub."
+)
+_LEGACY_HISTORY = (
+    b"\x80\x02cformatics.logs.history\nHistory\nq\x00)\x81q\x01}q\x02X\x07\x00\x00\x00entriesq\x03]q\x04(cformatics.logs"
+    b".history\nHistoryEntry\nq\x05)\x81q\x06}q\x07(X\t\x00\x00\x00timestampq\x08cdatetime\ndatetime\nq\tc_codecs\n"
+    b"encode\nq\nX\x0b\x00\x00\x00\x07\xc3\xa8\x01\x02\x03\x04\x05\x00\x00\x00q\x0bX\x06\x00\x00\x00latin1q\x0c\x86q"
+    b"\rRq\x0e\x85q\x0fRq\x10X\x06\x00\x00\x00actionq\x11X\x04\x00\x00\x00moveq\x12X\x07\x00\x00\x00elementq\x13K"
+    b"\x01X\x08\x00\x00\x00metadataq\x14}q\x15X\x01\x00\x00\x00kq\x16X\x01\x00\x00\x00vq\x17subh\x05)\x81q\x18}q\x19"
+    b"(h\x08h\th\nX\x0b\x00\x00\x00\x07\xc3\xa8\x01\x02\x03\x04\x06\x00\x00\x00q\x1ah\x0c\x86q\x1bRq\x1c\x85q\x1dRq"
+    b"\x1eh\x11X\x04\x00\x00\x00copyq\x1fh\x13K\x02h\x14}q ubh\x05)\x81q!}q\"(h\x08h\th\nX\x0b\x00\x00\x00\x07\xc3"
+    b"\xa8\x01\x02\x03\x04\x07\x00\x00\x00q#h\x0c\x86q$Rq%\x85q&Rq\'h\x11h\x12h\x13K\x03h\x14}q(ubesb."
+)
+
+
+def test_loads_pickles_from_before_slots_and_indexes():
+    entry = pickle.loads(_LEGACY_ENTRY)
+    assert entry == HistoryEntry(datetime(2024, 1, 2, 3, 4, 5), "move", 1, {"k": "v"})
+    assert entry.timestamp == datetime(2024, 1, 2, 3, 4, 5)
+
+    history = pickle.loads(_LEGACY_HISTORY)
+    assert [(e.action, e.element) for e in history] == [("move", 1), ("copy", 2), ("move", 3)]
+    assert [e.element for e in history.query("move")] == [1, 3]
+    assert [e.element for e in history.query(since=datetime(2024, 1, 2, 3, 4, 6))] == [2, 3]
+    assert history.entries[1]._metadata is None
+    history.record("fresh", 4)
+    assert len(history) == 4 and history.end_seq == 4
+
+    restored = pickle.loads(pickle.dumps(history))
+    assert restored.entries == history.entries
+    assert [e.element for e in restored.query("move")] == [1, 3]
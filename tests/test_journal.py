@@ -0,0 +1,154 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from formatics.form import Element
+from formatics.logs import History, HistoryEntry, Journal
+from formatics.logs.journal import _list_segments
+
+
+def _entries(count, start_ns=1_000_000):
+    return [
+        HistoryEntry(action="move" if i % 2 else "copy", element=Element(i, {"i": i}), timestamp_ns=start_ns + i * 1000)
+        for i in range(count)
+    ]
+
+
+def test_round_trip_with_rotation_and_seek(tmp_path):
+    entries = _entries(2000)
+    with Journal(tmp_path, segment_size=8192, batch_records=64, index_every=16, compact_after=0) as journal:
+        for entry in entries:
+            journal.append(entry)
+        with journal.reader() as reader:
+            assert [e.element for e in reader] == [e.element for e in entries]
+            since = entries[1234].timestamp_ns
+            until = entries[1240].timestamp_ns
+            assert [e.element.value for e in reader.iter_range(since, until)] == list(range(1234, 1240))
+            assert next(iter(reader.seek(since))) == entries[1234]
+    segments = sorted(p.name for p in tmp_path.iterdir() if p.suffix == ".seg")
+    assert len(segments) > 5
+    assert len([p for p in tmp_path.iterdir() if p.suffix == ".idx"]) == len(segments) - 1
+
+
+def test_torn_tail_is_dropped_on_reopen(tmp_path):
+    with Journal(tmp_path, fsync="never") as journal:
+        for entry in _entries(10):
+            journal.append(entry)
+    (segment,) = tmp_path.glob("*.seg")
+    with open(segment, "ab") as handle:
+        handle.write(b"\x40\x00\x00\x00garbage")
+
+    journal = Journal(tmp_path)
+    journal.append(_entries(1, start_ns=5_000_000)[0])
+    history = journal.history()
+    journal.close()
+    assert len(history) == 11
+    assert history.get_recent(1)[0].timestamp_ns == 5_000_000
+
+
+def test_history_writes_through_and_compaction_merges(tmp_path):
+    journal = Journal(tmp_path, segment_size=32768, batch_records=1, fsync="always", compact_after=0)
+    history = History(capacity=50, journal=journal)
+    for i, entry in enumerate(_entries(500)):
+        history.append(entry)
+        if i % 20 == 19:
+            journal.rotate()
+    before = len(list(tmp_path.glob("*.seg")))
+    journal.compact()
+    after = len(list(tmp_path.glob("*.seg")))
+    assert after < before
+
+    restored = journal.history(capacity=50)
+    journal.close()
+    assert [e.element.value for e in restored] == [e.element.value for e in history]
+    with Journal(tmp_path) as reopened, reopened.reader() as reader:
+        assert sum(1 for _ in reader) == 500
+
+
+def test_retention_drops_old_records(tmp_path):
+    journal = Journal(tmp_path, segment_size=2048, compact_after=0, retention_ns=10**9)
+    for entry in _entries(200, start_ns=0):
+        journal.append(entry)
+    journal.record("fresh", "kept")
+    journal.rotate()
+    journal.compact()
+    with journal.reader() as reader:
+        assert [e.action for e in reader] == ["fresh"]
+    journal.close()
+
+
+def test_invalid_fsync_policy(tmp_path):
+    with pytest.raises(ValueError):
+        Journal(os.fspath(tmp_path), fsync="sometimes")
+
+
+class _Crash(Exception):
+    pass
+
+
+def _crash_after(monkeypatch, steps):
+    """Make the (steps + 1)-th rename or unlink raise, as if the process died there."""
+    done = [0]
+
+    def step(real):
+        def wrapper(*args, **kwargs):
+            if done[0] == steps:
+                raise _Crash()
+            done[0] += 1
+            return real(*args, **kwargs)
+
+        return wrapper
+
+    monkeypatch.setattr(os, "replace", step(os.replace))
+    monkeypatch.setattr(Path, "unlink", step(Path.unlink))
+    return done
+
+
+def test_compaction_survives_a_crash_at_every_step(tmp_path, monkeypatch):
+    entries = _entries(120)
+    steps = 0
+    while True:
+        directory = tmp_path / str(steps)
+        journal = Journal(directory, segment_size=1 << 20, index_every=4, compact_after=0)
+        for i, entry in enumerate(entries):
+            journal.append(entry)
+            if i % 30 == 29:
+                journal.rotate()
+        journal.flush()
+        group = [segment for segment in _list_segments(directory) if segment[1] < journal._number]
+        with monkeypatch.context() as patch:
+            done = _crash_after(patch, steps)
+            try:
+                journal._merge(group, None)
+                finished = True
+            except _Crash:
+                finished = False
+        assert done[0] == steps
+        journal.close()
+
+        with Journal(directory, compact_after=0) as reopened:
+            reopened.compact()
+            with reopened.reader() as reader:
+                assert [e.element.value for e in reader] == list(range(120))
+                since, until = entries[47].timestamp_ns, entries[95].timestamp_ns
+                assert [e.element.value for e in reader.iter_range(since, until)] == list(range(47, 95))
+        leftovers = [p.name for p in directory.iterdir() if p.suffix not in (".seg", ".idx")]
+        assert leftovers == []
+        if finished:
+            break
+        steps += 1
+    assert steps > 5
+
+
+def test_out_of_order_records_are_not_lost(tmp_path):
+    entries = _entries(60)
+    shuffled = entries[:20] + entries[40:] + entries[20:40]
+    with Journal(tmp_path, segment_size=4096, index_every=4, compact_after=0) as journal:
+        for entry in shuffled:
+            journal.append(entry)
+    assert (tmp_path / "UNSORTED").exists()
+    with Journal(tmp_path) as reopened, reopened.reader() as reader:
+        since, until = entries[10].timestamp_ns, entries[50].timestamp_ns
+        assert sorted(e.element.value for e in reader.iter_range(since, until)) == list(range(10, 50))
+        assert [e.element.value for e in reader] == [e.element.value for e in shuffled]
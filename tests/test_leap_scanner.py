@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _make_tree(root: Path) -> dict[str, Path]:
+    stay = root / "stay"
+    moved = root / "nested" / "moved"
+    stay.mkdir(parents=True)
+    moved.mkdir(parents=True)
+
+    scripts = {
+        "in_place": stay / "in_place.py",
+        "leapt": moved / "leapt.py",
+        "untagged": stay / "untagged.py",
+        "not_python": moved / "notes.txt",
+    }
+    scripts["in_place"].write_text(f"# ORIGIN:{stay.resolve()}\nprint('a')\n", encoding="utf-8")
+    scripts["leapt"].write_text(f"# ORIGIN:{stay.resolve()}\nprint('b')\n", encoding="utf-8")
+    scripts["untagged"].write_text("print('c')\n", encoding="utf-8")
+    scripts["not_python"].write_text(f"# ORIGIN:{stay.resolve()}\n", encoding="utf-8")
+    return scripts
+
+
+def test_scan_tree_reports_only_leapt_scripts(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(REPO_ROOT))
+    from tools.leap_scanner import ScanStats, scan_tree
+
+    scripts = _make_tree(tmp_path)
+    stats = ScanStats()
+    records = list(scan_tree(tmp_path, workers=4, stats=stats))
+
+    assert [record.path for record in records] == [str(scripts["leapt"].resolve())]
+    assert records[0].origin == str(scripts["in_place"].parent.resolve())
+    assert records[0].current == str(scripts["leapt"].parent.resolve())
+    assert (stats.files, stats.tagged, stats.leaps) == (3, 2, 1)
+
+
+def test_cli_fixes_tags_and_emits_ndjson(tmp_path):
+    scripts = _make_tree(tmp_path)
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join([str(REPO_ROOT), env.get("PYTHONPATH", "")])
+
+    result = subprocess.run(
+        [sys.executable, "-m", "tools.leap_scanner", str(tmp_path), "--format", "ndjson", "--fix"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    lines = [json.loads(line) for line in result.stdout.splitlines()]
+    assert len(lines) == 1 and lines[0]["fixed"] is True
+    leapt = scripts["leapt"].read_text(encoding="utf-8")
+    assert leapt == f"# ORIGIN:{scripts['leapt'].parent.resolve()}\nprint('b')\n"
+
+    rescan = subprocess.run(
+        [sys.executable, "-m", "tools.leap_scanner", str(tmp_path)],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert json.loads(rescan.stdout)["leaps"] == []
+
+
+def test_import_leaves_auto_prime_setting_alone():
+    env = {key: value for key, value in os.environ.items() if key != "FILESTATE_DISABLE_AUTO_PRIME"}
+    env["PYTHONPATH"] = str(REPO_ROOT)
+    code = "import os, tools.leap_scanner; print(os.environ.get('FILESTATE_DISABLE_AUTO_PRIME'))"
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "None"
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _tagged_script(directory: Path, name: str) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    script = directory / name
+    script.write_text(f"# ORIGIN:{directory.resolve()}\nprint('x')\n", encoding="utf-8")
+    return script
+
+
+def _run_watcher(watcher, polling: bool) -> threading.Thread:
+    thread = threading.Thread(target=watcher.run, kwargs={"stop_after": 3.0, "polling": polling})
+    thread.start()
+    time.sleep(0.3)
+    return thread
+
+
+@pytest.mark.parametrize("polling", [False, True])
+def test_watcher_handles_moves_in_batches(tmp_path, monkeypatch, polling):
+    if not polling and not sys.platform.startswith("linux"):
+        pytest.skip("inotify is Linux-only")
+    monkeypatch.syspath_prepend(str(REPO_ROOT))
+    from tools.leap_watcher import LeapWatcher
+
+    root = tmp_path.resolve()
+    moved_file = _tagged_script(root / "a", "one.py")
+    moved_tree = _tagged_script(root / "pkg" / "sub", "two.py")
+    untagged = root / "a" / "plain.py"
+    untagged.write_text("print('plain')\n", encoding="utf-8")
+    (root / "b").mkdir()
+
+    batches = []
+    watcher = LeapWatcher(root, sink=batches.append, debounce=0.1, poll_interval=0.2)
+    thread = _run_watcher(watcher, polling)
+
+    os.rename(moved_file, root / "b" / "one.py")
+    os.rename(untagged, root / "b" / "plain.py")
+    os.rename(root / "pkg", root / "b" / "pkg")
+    thread.join()
+
+    leaps = sorted((record.path, record.origin) for batch in batches for record in batch)
+    assert leaps == [
+        (str(root / "b" / "one.py"), str(root / "a")),
+        (str(root / "b" / "pkg" / "sub" / "two.py"), str(root / "pkg" / "sub")),
+    ]
+    assert (root / "b" / "one.py").read_text(encoding="utf-8").startswith(f"# ORIGIN:{root / 'b'}\n")
+    assert (root / "b" / "plain.py").read_text(encoding="utf-8") == "print('plain')\n"
+
+
+def test_import_leaves_auto_prime_setting_alone():
+    env = {key: value for key, value in os.environ.items() if key != "FILESTATE_DISABLE_AUTO_PRIME"}
+    env["PYTHONPATH"] = str(REPO_ROOT)
+    code = "import os, tools.leap_watcher; print(os.environ.get('FILESTATE_DISABLE_AUTO_PRIME'))"
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "None"
@@ -0,0 +1,37 @@
+from pathlib import Path
+
+from formatics.filestate import FileState
+from formatics.lineage import LineageStore
+
+
+def test_track_move_records_every_hop():
+    store = LineageStore()
+    state = FileState(Path("/srv/a/job.py"))
+
+    for hop in ("/srv/b/job.py", "/srv/b/c/job.py", "/tmp/job_final.py"):
+        state = state.track_move(Path(hop), store=store)
+
+    assert store.lineage(state) == [
+        Path("/srv/a/job.py"),
+        Path("/srv/b/job.py"),
+        Path("/srv/b/c/job.py"),
+        Path("/tmp/job_final.py"),
+    ]
+    assert state.get_lineage() == (Path("/srv/a/job.py"), Path("/tmp/job_final.py"))
+
+
+def test_files_through_directory_uses_shared_prefixes():
+    store = LineageStore()
+    first = store.new_file("/srv/a/one.py")
+    second = store.new_file("/srv/a/two.py")
+    third = store.new_file("/opt/three.py")
+    store.record_move(first, "/srv/b/one.py")
+    store.record_move(third, "/srv/b/deep/three.py")
+
+    assert store.files_through("/srv/a") == [first, second]
+    assert store.files_through("/srv/b") == [first]
+    assert store.files_through("/srv", recursive=True) == [first, second, third]
+    assert store.files_through("/nowhere") == []
+    assert store.current(third) == Path("/srv/b/deep/three.py")
+    # "/srv" and "/srv/b" are interned once and shared by every file below them.
+    assert len(store._dir_parent) == 6
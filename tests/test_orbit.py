@@ -0,0 +1,210 @@
+import pytest
+
+from formatics import orbit as orbit_module
+from formatics.orbit import Orbit, OrbitSet
+
+BACKENDS = [False] + ([True] if orbit_module.np is not None else [])
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+@pytest.mark.parametrize("states", [["raw", "formed", "closed"], [f"s{i}" for i in range(300)]])
+def test_orbit_set_matches_individual_orbits(use_numpy, states):
+    orbits = OrbitSet(states, elements=range(10), use_numpy=use_numpy)
+    reference = [Orbit(element=i, states=list(states)) for i in range(10)]
+
+    def apply(where, action):
+        chosen = range(10)[where] if isinstance(where, slice) else where
+        if isinstance(chosen, list) and chosen and isinstance(chosen[0], bool):
+            chosen = [i for i, flag in enumerate(chosen) if flag]
+        for i in chosen:
+            getattr(reference[i], action)()
+        getattr(orbits, action)(where)
+
+    apply(slice(None), "advance")
+    apply(slice(2, 8, 2), "advance")
+    apply(range(0, 3), "advance")
+    apply([True, False] * 5, "advance")
+    apply([9, 1], "advance")
+    apply([9, 1], "advance")
+    apply(slice(0, 2), "reset")
+    apply([False] * 9 + [True], "reset")
+
+    assert [orbits.current_state(i) for i in range(10)] == [o.current_state() for o in reference]
+    histogram = orbits.histogram()
+    assert sum(histogram.values()) == 10
+    assert {state: n for state, n in histogram.items() if n} == {
+        state: sum(o.current_state() == state for o in reference)
+        for state in {o.current_state() for o in reference}
+    }
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+@pytest.mark.parametrize("count", [3, 300])
+def test_repeated_indices_advance_once_on_every_backend(use_numpy, count):
+    orbits = OrbitSet([f"s{i}" for i in range(count)], elements="abc", use_numpy=use_numpy)
+    orbits.advance([1, 1, 1])
+    orbits.advance([2, -1])
+    assert [orbits.current_state(i) for i in range(3)] == ["s0", "s1", "s1"]
+
+
+SELECTION_BACKENDS = [
+    pytest.param(3, False, True, id="bytearray"),
+    pytest.param(300, False, True, id="array"),
+    pytest.param(3, False, False, id="bytearray-no-numpy"),
+    pytest.param(300, False, False, id="array-no-numpy"),
+] + ([pytest.param(3, True, True, id="numpy")] if orbit_module.np is not None else [])
+
+# (build selection from the numpy module, whether it needs NumPy)
+SELECTIONS = [
+    pytest.param(lambda np: None, False, id="all"),
+    pytest.param(lambda np: slice(1, None, 3), False, id="slice"),
+    pytest.param(lambda np: range(2, 7), False, id="range"),
+    pytest.param(lambda np: [0, 4, -1, 4], False, id="index-list"),
+    pytest.param(lambda np: (i for i in (3, 5)), False, id="generator"),
+    pytest.param(lambda np: [i % 3 == 0 for i in range(10)], False, id="bool-list"),
+    pytest.param(lambda np: [], False, id="empty"),
+    pytest.param(lambda np: np.arange(10) % 4 == 1, True, id="numpy-mask"),
+    pytest.param(lambda np: list(np.arange(10) > 6), True, id="numpy-bool-list"),
+    pytest.param(lambda np: np.array([8, -9], dtype=np.int16), True, id="numpy-indices"),
+    pytest.param(lambda np: np.array([], dtype=np.int64), True, id="numpy-empty"),
+]
+
+
+@pytest.mark.parametrize("count, use_numpy, numpy_available", SELECTION_BACKENDS)
+@pytest.mark.parametrize("select, needs_numpy", SELECTIONS)
+def test_every_selection_form_on_every_backend(monkeypatch, count, use_numpy, numpy_available, select, needs_numpy):
+    np = orbit_module.np
+    if (numpy_available or needs_numpy) and np is None:
+        pytest.skip("NumPy is not installed")
+    if needs_numpy and not numpy_available:
+        pytest.skip("NumPy selections need NumPy")
+    if not numpy_available:
+        monkeypatch.setattr(orbit_module, "np", None)
+    states = [f"s{i}" for i in range(count)]
+    orbits = OrbitSet(states, elements=range(10), use_numpy=use_numpy)
+    orbits.advance(slice(None, None, 2))
+
+    expected = [1 if i % 2 == 0 else 0 for i in range(10)]
+    where = select(np)
+    if where is None:
+        chosen = range(10)
+    elif isinstance(where, slice):
+        chosen = range(10)[where]
+    else:
+        where = list(where)
+        is_mask = where and isinstance(where[0], (bool,) if np is None else (bool, np.bool_))
+        chosen = [i for i, flag in enumerate(where) if flag] if is_mask else where
+    chosen = {i % 10 for i in chosen}
+    for _ in range(2):
+        orbits.advance(select(np))
+    for i in chosen:
+        expected[i] = min(expected[i] + 2, count - 1)
+    assert [orbits._indices[i] for i in range(10)] == expected
+
+    orbits.reset(select(np))
+    for i in chosen:
+        expected[i] = 0
+    assert [orbits._indices[i] for i in range(10)] == expected
+
+
+@pytest.mark.parametrize("count, use_numpy, numpy_available", SELECTION_BACKENDS)
+def test_bad_selections_raise_on_every_backend(monkeypatch, count, use_numpy, numpy_available):
+    if orbit_module.np is None and numpy_available:
+        pytest.skip("NumPy is not installed")
+    if not numpy_available:
+        monkeypatch.setattr(orbit_module, "np", None)
+    orbits = OrbitSet([f"s{i}" for i in range(count)], elements=range(4), use_numpy=use_numpy)
+    for action in (orbits.advance, orbits.reset):
+        with pytest.raises(ValueError):
+            action([True, False])
+        with pytest.raises(IndexError):
+            action([0, 4])
+        with pytest.raises(IndexError):
+            action([-5])
+    assert orbits.histogram() == {**dict.fromkeys(orbits.states, 0), "s0": 4}
+
+
+def test_single_state_orbit_set_accepts_every_selection():
+    orbits = OrbitSet(["only"], elements="ab")
+    orbits.advance([1])
+    orbits.advance([True, False])
+    orbits.advance()
+    assert orbits.histogram() == {"only": 2}
+
+
+def test_orbit_set_stops_at_last_state_and_grows():
+    orbits = OrbitSet(["a", "b"], use_numpy=False)
+    first = orbits.add("x")
+    for _ in range(5):
+        orbits.advance()
+    second = orbits.add("y")
+
+    assert orbits.current_state(first) == "b"
+    assert orbits.orbit(second) == Orbit(element="y", states=["a", "b"], current_index=0)
+    assert orbits.histogram() == {"a": 1, "b": 1}
+
+
+def test_machine_matches_stepwise_advance_on_cycles_and_branches():
+    from formatics.orbit import OrbitMachine
+
+    machine = OrbitMachine(
+        {
+            "seed": "grow",
+            "grow": {"next": "bloom", "prune": "seed"},
+            "bloom": "wilt",
+            "wilt": "grow",
+            "archived": None,
+        }
+    )
+    orbit = machine.orbit("rose")
+
+    assert orbit.advance(1) == "grow"
+    assert orbit.advance(1, label="prune") == "seed"
+    state = machine.index["seed"]
+    for n in (0, 1, 2, 3, 7, 50):
+        expected = state
+        for _ in range(n):
+            expected = machine.step(expected)
+        assert machine.step(state, n) == expected
+    # seed -> grow -> bloom -> wilt -> grow ...: tail 1, period 3.
+    assert machine.cycle_info("seed") == (1, 3)
+    assert machine.step(state, 10**12 + 1) == machine.step(state, 1 + (10**12 % 3))
+    assert machine.period("archived") == 1
+    assert machine.step_many([0, 1, 2], 4) == [machine.step(i, 4) for i in range(3)]
+
+
+def test_machine_from_states_mirrors_linear_orbit():
+    from formatics.orbit import OrbitMachine
+
+    states = ["raw", "formed", "closed"]
+    linear = OrbitMachine.from_states(states).orbit("x")
+    cyclic = OrbitMachine.from_states(states, cyclic=True).orbit("x")
+
+    assert linear.advance(5) == "closed"
+    assert cyclic.advance(5) == "closed"
+    assert cyclic.advance(1) == "raw"
+    cyclic.reset()
+    assert cyclic.current_state() == "raw"
+
+
+def test_machine_builds_jump_tables_once_across_threads():
+    import threading
+
+    from formatics.orbit import OrbitMachine
+
+    machine = OrbitMachine.from_states([f"s{i}" for i in range(97)], cyclic=True)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(machine.step(0, 2**40 + 5))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [(2**40 + 5) % 97] * 8
+    assert len(machine._jumps[OrbitMachine.DEFAULT_LABEL]) == 41
@@ -0,0 +1,113 @@
+import random
+from collections import deque
+
+import pytest
+
+from formatics.paths import Node, PathGraph
+
+
+def _random_graph(count, degree, seed):
+    rng = random.Random(seed)
+    graph = PathGraph()
+    nodes = [graph.add_node(i) for i in range(count)]
+    for node in nodes:
+        for _ in range(degree):
+            graph.connect_nodes(node, rng.choice(nodes))
+    return graph, nodes
+
+
+def _distance(start, end):
+    depth = {start: 0}
+    queue = deque([start])
+    while queue:
+        current = queue.popleft()
+        for neighbor in current.edges:
+            if neighbor not in depth:
+                depth[neighbor] = depth[current] + 1
+                queue.append(neighbor)
+    return depth.get(end)
+
+
+def _assert_valid(path, start, end):
+    assert path[0] is start and path[-1] is end
+    for source, target in zip(path, path[1:]):
+        assert target in source.edges
+
+
+@pytest.mark.parametrize("bidirectional", [False, True])
+def test_find_path_is_shortest(bidirectional):
+    graph, nodes = _random_graph(400, 2, seed=1)
+    rng = random.Random(2)
+    found = 0
+    for _ in range(200):
+        start, end = rng.choice(nodes), rng.choice(nodes)
+        path = graph.find_path(start, end, bidirectional=bidirectional)
+        expected = _distance(start, end)
+        if expected is None:
+            assert path is None
+            continue
+        found += 1
+        _assert_valid(path, start, end)
+        assert len(path) - 1 == expected
+    assert found > 100
+
+
+@pytest.mark.parametrize("bidirectional", [False, True])
+def test_find_path_follows_edge_direction(bidirectional):
+    graph = PathGraph()
+    a, b, c = (graph.add_node(v) for v in "abc")
+    graph.connect_nodes(a, b)
+    graph.connect_nodes(b, c)
+    assert graph.find_path(a, c, bidirectional=bidirectional) == [a, b, c]
+    assert graph.find_path(c, a, bidirectional=bidirectional) is None
+    assert graph.find_path(b, b, bidirectional=bidirectional) == [b]
+
+
+def test_disconnect_updates_reverse_edges():
+    graph = PathGraph()
+    a, b = graph.add_node("a"), graph.add_node("b")
+    graph.connect_nodes(a, b)
+    assert b.predecessors() == [a]
+    a.disconnect(b)
+    assert b.predecessors() == []
+    assert graph.find_path(a, b, bidirectional=True) is None
+
+
+@pytest.mark.parametrize("bidirectional", [False, True])
+def test_constructor_edges_are_searchable_both_ways(bidirectional):
+    b = Node("b")
+    x1 = Node("x1", edges={b})
+    a = Node("a", edges={x1})
+    assert b.predecessors() == [x1]
+    assert PathGraph().find_path(a, b, bidirectional=bidirectional) == [a, x1, b]
+
+
+def test_mutating_edges_keeps_incoming_in_sync():
+    a, b, c, d = (Node(v) for v in "abcd")
+    a.edges.add(b)
+    a.edges |= {c}
+    a.edges.update([d], [b])
+    assert a.edges == {b, c, d} and a.edges | {a} == {a, b, c, d}
+    assert all(n.predecessors() == [a] for n in (b, c, d))
+    assert PathGraph().find_path(a, d, bidirectional=True) == [a, d]
+
+    a.edges.discard(b)
+    a.edges.remove(c)
+    with pytest.raises(KeyError):
+        a.edges.remove(c)
+    assert b.predecessors() == c.predecessors() == [] and d.predecessors() == [a]
+
+    a.edges ^= {b, d}
+    assert a.edges == {b} and d.predecessors() == [] and b.predecessors() == [a]
+    a.edges = {c, d}
+    assert b.predecessors() == [] and list(c.incoming) == list(d.incoming) == [a]
+    a.edges -= {c}
+    a.edges &= {b}
+    assert a.edges == set() and d.predecessors() == []
+    assert PathGraph().find_path(a, d, bidirectional=True) is None
+
+    b.connect(d)
+    b.edges.clear()
+    assert d.predecessors() == []
+    with pytest.raises(AttributeError):
+        d.incoming.add(a)
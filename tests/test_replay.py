@@ -0,0 +1,142 @@
+import random
+import threading
+import time
+
+import pytest
+
+from formatics.logs import History, HistoryEntry, Replay, ShardedHistory
+
+
+def _balance(state, entry):
+    return (state or 0) + entry.metadata["delta"]
+
+
+def _history(count, keys=7, seed=3):
+    rng = random.Random(seed)
+    history = History()
+    for i in range(count):
+        history.append(
+            HistoryEntry(
+                action="adjust",
+                element=f"acct{rng.randrange(keys)}",
+                metadata={"delta": rng.randint(-5, 9)},
+                timestamp_ns=1_000 + i * 10,
+            )
+        )
+    return history
+
+
+def _brute(history, element, t):
+    state = None
+    for entry in history:
+        if entry.timestamp_ns <= t and entry.element == element:
+            state = _balance(state, entry)
+    return state
+
+
+def test_state_at_matches_full_scan_and_stays_bounded():
+    history = _history(3000)
+    replay = Replay(history, apply=_balance, every=50, max_checkpoints=8)
+    assert len(replay.checkpoints) <= 8 and replay.every > 50
+
+    rng = random.Random(5)
+    for _ in range(40):
+        t = rng.randrange(900, 32_000)
+        element = f"acct{rng.randrange(8)}"
+        assert replay.state_at(element, t) == _brute(history, element, t)
+    assert replay.states_at(15_005)["acct1"] == _brute(history, "acct1", 15_005)
+    assert replay.state_at("acct2") == _brute(history, "acct2", 10**12)
+
+
+def test_update_folds_new_entries_and_interval_checkpoints():
+    history = _history(100)
+    replay = Replay(history, apply=_balance, every=10**6, interval=200e-9)
+    assert len(replay.checkpoints) > 1
+    history.append(HistoryEntry(action="adjust", element="acct0", metadata={"delta": 1000}, timestamp_ns=10**6))
+    assert replay.state_at("acct0") == _brute(history, "acct0", 10**6)
+    assert replay.state_at("acct0", 10**6 - 1) == _brute(history, "acct0", 10**6) - 1000
+
+
+def test_bounded_history_reports_evicted_tail():
+    history = History(capacity=50)
+    replay = Replay(history, every=10)
+    for i in range(200):
+        history.append(HistoryEntry(action="set", element=("k", i % 3), timestamp_ns=i))
+        if i % 20 == 0:
+            replay.update()
+    replay.update()
+    assert replay.state_at(("k", 1)) == ("k", 1)
+    assert replay.state_at(("k", 1), 190) == ("k", 1)
+    with pytest.raises(ValueError):
+        replay.state_at(("k", 1), 5)
+
+
+def test_checkpoints_store_only_changed_states():
+    history = History()
+    for i in range(1000):
+        history.append(HistoryEntry(action="set", element=("k", i), timestamp_ns=i))
+    for i in range(1000, 3000):
+        history.append(HistoryEntry(action="set", element=("k", 0), timestamp_ns=i))
+    replay = Replay(history, every=100, max_checkpoints=4)
+    checkpoints = replay.checkpoints
+    assert len(checkpoints) == 4 and len(checkpoints[-1].states) == 1
+    # A full snapshot per checkpoint would hold about 1000 states each.
+    assert sum(len(c.states) for c in checkpoints) <= 1000 + len(checkpoints)
+    assert replay.state_at(("k", 500), 2500) == ("k", 500)
+    assert replay.states_at(999) == {("k", i): ("k", i) for i in range(1000)}
+    assert replay.state_at(("k", 999), 998) is None
+
+
+def test_equal_timestamps_split_across_updates():
+    history = History()
+    replay = Replay(history, apply=_balance, every=1)
+    for step in range(6):
+        for _ in range(3):
+            history.append(HistoryEntry(action="adjust", element="a", metadata={"delta": 1}, timestamp_ns=step))
+        assert replay.update() == 3
+    assert replay.state_at("a") == 18
+    assert [replay.state_at("a", t) for t in range(6)] == [3, 6, 9, 12, 15, 18]
+
+
+def test_replays_a_sharded_history():
+    history = ShardedHistory()
+    for i in range(50):
+        history.record("adjust", "acct", delta=i)
+    replay = Replay(history, apply=_balance, every=8)
+    times = [entry.timestamp_ns for entry in history]
+    assert replay.state_at("acct") == sum(range(50))
+    assert replay.state_at("acct", times[9]) == sum(range(10))
+
+
+def test_replay_keeps_up_with_concurrent_sharded_writers():
+    history = ShardedHistory()
+    replay = Replay(history, apply=_balance, every=500)
+    done = threading.Event()
+
+    def produce(worker):
+        for i in range(2000):
+            history.record("adjust", f"acct{worker % 3}", delta=1)
+
+    def follow():
+        while not done.is_set():
+            replay.update()
+            replay.state_at("acct0", time.monotonic_ns())
+
+    writers = [threading.Thread(target=produce, args=(w,)) for w in range(8)]
+    reader = threading.Thread(target=follow)
+    reader.start()
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    done.set()
+    reader.join()
+
+    folded = {}
+    for entry in history:
+        folded[entry.element] = _balance(folded.get(entry.element), entry)
+    assert sum(replay.states_at().values()) == 16000
+    assert replay.states_at() == folded
+    middle = list(history)[8000].timestamp_ns
+    assert sum(replay.states_at(middle).values()) == sum(1 for e in history if e.timestamp_ns <= middle)
+
@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import pytest
+
+from formatics.form import Element, FormElement
+from formatics.logs import History
+from formatics.serialize import dump_form, dump_history, load_form, load_history, open_form, open_history
+
+
+def _form():
+    return FormElement(
+        [
+            Element(1, {"unit": "m", "scale": 0.5}),
+            Element(2.25),
+            Element("text", {"unit": "m", "flag": True}),
+            Element(None, {"raw": b"\x00\x01"}),
+            Element(2**80, {"nested": {"a": [1, 2]}}),
+            Element(b"blob"),
+        ],
+        form_type="grid",
+    )
+
+
+def test_form_round_trip(tmp_path):
+    path = tmp_path / "form.fmf"
+    form = _form()
+    assert dump_form(form, path) == 6
+    loaded = load_form(path)
+    assert loaded.form_type == "grid"
+    assert loaded.elements == form.elements
+
+
+def test_metadata_keys_keep_their_type(tmp_path):
+    metadata = {1: "int", "1": "str", (2, "b"): [3], 2.5: None, "unit": b"m"}
+    path = tmp_path / "keys.fmf"
+    dump_form(FormElement([Element(0, metadata)]), path)
+
+    with open_form(path) as form_file:
+        loaded = form_file[0].metadata
+    assert loaded == metadata
+    assert [(type(key), key) for key in loaded] == [(type(key), key) for key in metadata]
+
+
+def test_open_form_decodes_lazily(tmp_path):
+    path = tmp_path / "big.fmf"
+    dump_form(FormElement([Element(i, {"kind": "even" if i % 2 == 0 else "odd"}) for i in range(10_000)]), path)
+    with open_form(path) as form_file:
+        assert len(form_file) == 10_000 and form_file.form_type is None
+        view = form_file[-1]
+        assert form_file._strings == {}
+        assert view.value == 9_999 and view.metadata == {"kind": "odd"}
+        assert view == Element(9_999, {"kind": "odd"})
+        assert sum(form_file.values()) == sum(range(10_000))
+        with pytest.raises(IndexError):
+            form_file[10_000]
+
+
+def test_history_round_trip(tmp_path):
+    history = History()
+    history.record("create", Element(1, {"unit": "m"}), user="ann")
+    history.record("note", "plain value")
+    history.entries[0].timestamp = datetime(2025, 3, 4, 5, 6, 7, 891011)
+    path = tmp_path / "history.fmh"
+    dump_history(history, path)
+
+    with open_history(path) as history_file:
+        first = history_file[0]
+        assert first.action == "create" and first.metadata == {"user": "ann"}
+        assert first.element == Element(1, {"unit": "m"})
+    loaded = load_history(path)
+    assert [(e.timestamp, e.action, e.element, e.metadata) for e in loaded.entries] == [
+        (e.timestamp, e.action, e.element, e.metadata) for e in history.entries
+    ]
+    with pytest.raises(ValueError):
+        open_form(path)
+
+
+def test_variable_block_spills_to_disk_while_writing(tmp_path, monkeypatch):
+    from formatics import serialize
+
+    monkeypatch.setattr(serialize, "_SPOOL_LIMIT", 64)
+    payloads = [bytes([i]) * (100 + i) for i in range(50)]
+    form = FormElement([Element(p, {"i": i, "blob": p[:10]}) for i, p in enumerate(payloads)])
+    path = tmp_path / "spilled.fmf"
+    dump_form(form, path)
+
+    with open_form(path) as opened:
+        assert [opened[i].value for i in (0, 25, 49)] == [payloads[0], payloads[25], payloads[49]]
+    assert load_form(path).elements == form.elements
@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+from formatics.slot import Slot, SlotArray
+
+
+def _first_empty(reference):
+    return next((i for i, elem in enumerate(reference) if elem is None), None)
+
+
+@pytest.mark.parametrize("size", [1, 63, 64, 65, 5000, 70_000])
+def test_slot_array_matches_linear_scan(size):
+    rng = random.Random(size)
+    slots = SlotArray(size)
+    reference = [None] * size
+
+    for step in range(1000):
+        action = rng.random()
+        if action < 0.5 and _first_empty(reference) is not None:
+            index = slots.allocate(f"e{step}")
+            assert index == _first_empty(reference)
+            reference[index] = f"e{step}"
+        elif action < 0.8:
+            index = rng.randrange(size)
+            assert slots.release(index) == reference[index]
+            reference[index] = None
+        else:
+            start = rng.randrange(size)
+            stop = min(size, start + rng.randrange(1, 200))
+            if action < 0.9:
+                slots.fill_range(start, stop, "bulk")
+                reference[start:stop] = ["bulk"] * (stop - start)
+            else:
+                assert slots.empty_range(start, stop) == reference[start:stop]
+                reference[start:stop] = [None] * (stop - start)
+
+        assert slots.find_first_empty() == _first_empty(reference)
+        assert slots.filled_count == sum(elem is not None for elem in reference)
+
+
+def test_slot_array_full_and_snapshots():
+    slots = SlotArray(3)
+    slots.fill_range(0, 3, elements=["a", "b", "c"])
+
+    assert slots.find_first_empty() is None
+    with pytest.raises(IndexError):
+        slots.allocate("d")
+    assert slots.slot(1) == Slot(position=1, element="b")
+    assert slots.release(1) == "b"
+    assert slots.allocate("d") == 1
+    assert [slots.is_filled(i) for i in range(3)] == [True, True, True]
@@ -0,0 +1,63 @@
+from pathlib import Path
+
+from formatics.filestate import content_hash
+from formatics.snapshot import Snapshot
+
+
+def _write(root: Path, rel: str, text: str) -> None:
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def test_diff_skips_identical_subtrees_and_detects_moves(tmp_path):
+    old_root, new_root = tmp_path / "v1", tmp_path / "v2"
+    for root in (old_root, new_root):
+        for i in range(20):
+            _write(root, f"stable/pkg{i}/mod.py", f"value = {i}\n")
+    _write(old_root, "app/main.py", "main = 1\n")
+    _write(old_root, "app/old_helper.py", "helper = 1\n")
+    _write(old_root, "gone.txt", "bye\n")
+    _write(new_root, "app/main.py", "main = 2\n")
+    _write(new_root, "lib/helpers/helper.py", "helper = 1\n")
+    _write(new_root, "new.txt", "hi\n")
+
+    before, after = Snapshot.build(old_root, workers=4), Snapshot.build(new_root, workers=4)
+    diff = before.diff(after)
+
+    assert diff.modified == ["app/main.py"]
+    assert diff.removed == ["gone.txt"]
+    assert diff.added == ["new.txt"]
+    assert [(m.origin, m.path, m.relation) for m in diff.moves] == [
+        (old_root / "app/old_helper.py", new_root / "lib/helpers/helper.py", "move")
+    ]
+    assert diff.moves[0].content_hash == content_hash(new_root / "lib/helpers/helper.py")
+    # The identical "stable" directory is compared by digest only.
+    assert diff.skipped_subtrees == 1
+
+
+def test_diff_pairs_many_identical_files_in_order(tmp_path):
+    old_root, new_root = tmp_path / "v1", tmp_path / "v2"
+    for i in range(300):
+        _write(old_root, f"old/p{i:03}/__init__.py", "")
+        _write(new_root, f"new/p{i:03}/__init__.py", "")
+
+    diff = Snapshot.build(old_root).diff(Snapshot.build(new_root))
+
+    assert diff.added == [] and diff.removed == []
+    assert len(diff.moves) == 300
+    assert {m.relation for m in diff.moves} == {"move"}
+    assert {m.origin for m in diff.moves} == {old_root / f"old/p{i:03}/__init__.py" for i in range(300)}
+
+
+def test_snapshot_round_trips_through_compact_file(tmp_path):
+    _write(tmp_path / "tree", "a.py", "a\n")
+    _write(tmp_path / "tree", "b/c.py", "c\n")
+    snapshot = Snapshot.build(tmp_path / "tree")
+
+    snapshot.save(tmp_path / "tree.snap")
+    loaded = Snapshot.load(tmp_path / "tree.snap", root=tmp_path / "tree")
+
+    assert loaded.digest == snapshot.digest
+    assert list(loaded.files()) == list(snapshot.files())
+    assert loaded.diff(snapshot).skipped_subtrees == 1
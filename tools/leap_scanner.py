@@ -0,0 +1,223 @@
+"""Report scripts whose ``# ORIGIN:`` tag no longer matches their folder.
+
+The scanner walks a tree with a pool of ``os.scandir`` workers, reads only a
+bounded first-line prefix of each candidate file and compares the embedded
+origin with the directory the file now lives in. Leaps are emitted as JSON or
+NDJSON and can optionally be fixed in bulk, using the same atomic, locked
+update that ``filestate`` performs on import.
+
+Run from the repository root::
+
+    python -m tools.leap_scanner /srv/deploy --format ndjson --fix
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from types import ModuleType
+from typing import Iterator, List, Optional, Sequence, Set, Tuple
+
+
+def _import_filestate() -> ModuleType:
+    """Import :mod:`filestate` without auto-priming, which would tag this tool itself.
+
+    The opt-out variable is only set for the duration of the import, so the rest
+    of the process keeps the caller's settings.
+    """
+    key = "FILESTATE_DISABLE_AUTO_PRIME"
+    previous = os.environ.get(key)
+    os.environ[key] = "1"
+    try:
+        import filestate
+    finally:
+        if previous is None:
+            del os.environ[key]
+        else:
+            os.environ[key] = previous
+    return filestate
+
+
+filestate = _import_filestate()
+
+DEFAULT_SUFFIXES = (".py",)
+DEFAULT_EXCLUDES = frozenset({".git", "__pycache__"})
+
+
+@dataclass
+class LeapRecord:
+    """A tagged script found outside the directory recorded in its tag."""
+
+    path: str
+    origin: str
+    current: str
+    fixed: bool = False
+
+
+@dataclass
+class ScanStats:
+    """Counters collected while scanning."""
+
+    directories: int = 0
+    files: int = 0
+    tagged: int = 0
+    leaps: int = 0
+    errors: int = 0
+
+
+def _scan_directory(
+    directory: str, suffixes: Tuple[str, ...], excludes: Set[str]
+) -> Tuple[List[str], List[LeapRecord], int, int, int]:
+    """Scan one directory level; return subdirectories, leaps and counters."""
+    subdirs: List[str] = []
+    leaps: List[LeapRecord] = []
+    files = tagged = errors = 0
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                name = entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if name not in excludes:
+                            subdirs.append(entry.path)
+                        continue
+                    if not name.endswith(suffixes) or not entry.is_file(follow_symlinks=False):
+                        continue
+                    files += 1
+                    origin = filestate._peek_origin(entry.path)
+                except OSError:
+                    errors += 1
+                    continue
+                if origin is None:
+                    continue
+                tagged += 1
+                if origin != directory:
+                    leaps.append(LeapRecord(path=entry.path, origin=origin, current=directory))
+    except OSError:
+        errors += 1
+    return subdirs, leaps, files, tagged, errors
+
+
+def scan_tree(
+    root: Path,
+    workers: Optional[int] = None,
+    suffixes: Sequence[str] = DEFAULT_SUFFIXES,
+    excludes: Set[str] = DEFAULT_EXCLUDES,
+    stats: Optional[ScanStats] = None,
+) -> Iterator[LeapRecord]:
+    """Yield a :class:`LeapRecord` for every leapt script below *root*.
+
+    Directories are scanned concurrently; records are yielded as soon as the
+    directory containing them has been read, so output can be streamed.
+    """
+    root_dir = str(Path(root).resolve())
+    suffix_tuple = tuple(suffixes)
+    stats = stats if stats is not None else ScanStats()
+    workers = workers or min(32, (os.cpu_count() or 1) * 4)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="leapscan") as pool:
+        pending: Set[Future] = {pool.submit(_scan_directory, root_dir, suffix_tuple, excludes)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                subdirs, leaps, files, tagged, errors = future.result()
+                stats.directories += 1
+                stats.files += files
+                stats.tagged += tagged
+                stats.leaps += len(leaps)
+                stats.errors += errors
+                for subdir in subdirs:
+                    pending.add(pool.submit(_scan_directory, subdir, suffix_tuple, excludes))
+                yield from leaps
+
+
+def fix_leaps(records: Sequence[LeapRecord], workers: Optional[int] = None) -> None:
+    """Rewrite the origin tag of every record to its current directory, in parallel."""
+
+    def fix(record: LeapRecord) -> None:
+        _, written = filestate._update_origin(Path(record.path), record.current)
+        record.fixed = written
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="leapfix") as pool:
+        for _ in pool.map(fix, records):
+            pass
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "root",
+        nargs="?",
+        default=".",
+        type=Path,
+        help="directory to scan (defaults to current working directory)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=("json", "ndjson"),
+        default="json",
+        help="report format: one JSON document or one JSON object per line",
+    )
+    parser.add_argument(
+        "--fix",
+        action="store_true",
+        help="rewrite the origin tag of every leapt script to its current directory",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="number of scanning threads (defaults to 4x the CPU count, max 32)",
+    )
+    parser.add_argument(
+        "--suffix",
+        action="append",
+        dest="suffixes",
+        help="file suffix to inspect; repeatable (defaults to .py)",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        help="directory name to skip; repeatable (.git and __pycache__ are always skipped)",
+    )
+    args = parser.parse_args(argv)
+
+    stats = ScanStats()
+    scan = scan_tree(
+        args.root,
+        workers=args.workers,
+        suffixes=args.suffixes or DEFAULT_SUFFIXES,
+        excludes=set(DEFAULT_EXCLUDES) | set(args.exclude),
+        stats=stats,
+    )
+
+    if args.format == "ndjson" and not args.fix:
+        for record in scan:
+            sys.stdout.write(json.dumps(asdict(record)) + "\n")
+        return 0
+
+    records = list(scan)
+    if args.fix:
+        fix_leaps(records, workers=args.workers)
+
+    if args.format == "ndjson":
+        for record in records:
+            sys.stdout.write(json.dumps(asdict(record)) + "\n")
+    else:
+        report = {
+            "root": str(args.root.resolve()),
+            "stats": asdict(stats),
+            "leaps": [asdict(record) for record in records],
+        }
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
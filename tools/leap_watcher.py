@@ -0,0 +1,301 @@
+"""Watch a tree and handle folder leaps as soon as scripts are moved.
+
+On Linux the watcher subscribes to inotify move events through ``ctypes``
+(no extra dependencies), pairs ``IN_MOVED_FROM``/``IN_MOVED_TO`` by cookie and
+treats any tagged script that lands in a new folder as a leap. Events are
+debounced and processed in batches: each leapt script gets its ``# ORIGIN:``
+tag updated atomically and is then handed to the registered ``filestate`` leap
+handler. Where inotify is unavailable the watcher falls back to periodic scans
+with :mod:`tools.leap_scanner`.
+
+Run from the repository root::
+
+    python -m tools.leap_watcher /srv/deploy --mode async
+"""
+from __future__ import annotations
+
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from tools.leap_scanner import DEFAULT_EXCLUDES, DEFAULT_SUFFIXES, LeapRecord, _import_filestate, scan_tree
+
+filestate = _import_filestate()
+
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_ONLYDIR
+_EVENT_HEADER = struct.Struct("iIII")
+
+LeapSink = Callable[[List[LeapRecord]], None]
+
+
+class InotifyUnavailable(OSError):
+    """Raised when the platform or filesystem cannot provide inotify watches."""
+
+
+class _Inotify:
+    """Minimal ctypes binding for the inotify syscalls the watcher needs."""
+
+    def __init__(self) -> None:
+        if not sys.platform.startswith("linux"):
+            raise InotifyUnavailable("inotify is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        try:
+            self._init = libc.inotify_init1
+            self._add = libc.inotify_add_watch
+        except AttributeError as exc:
+            raise InotifyUnavailable(str(exc)) from exc
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = self._init(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise InotifyUnavailable(err, os.strerror(err))
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._add(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def read_events(self, timeout: Optional[float]) -> List[Tuple[int, int, int, str]]:
+        """Return ``(wd, mask, cookie, name)`` tuples, waiting up to *timeout* seconds."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as exc:
+            if exc.errno == errno.EAGAIN:
+                return []
+            raise
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            events.append((wd, mask, cookie, name))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+@dataclass
+class LeapWatcher:
+    """Event-driven folder-leap detection over a directory tree.
+
+    Args:
+        root: Directory to watch recursively.
+        sink: Called with each debounced batch of leaps, after tags are updated.
+        debounce: Quiet period (seconds) before a batch of moves is processed.
+        max_batch: Process a batch early once this many scripts are pending.
+        poll_interval: Rescan period for the polling fallback.
+    """
+
+    root: Path
+    sink: Optional[LeapSink] = None
+    debounce: float = 0.25
+    max_batch: int = 512
+    poll_interval: float = 5.0
+    suffixes: Tuple[str, ...] = DEFAULT_SUFFIXES
+    excludes: Set[str] = field(default_factory=lambda: set(DEFAULT_EXCLUDES))
+    _watches: Dict[int, str] = field(default_factory=dict, init=False, repr=False)
+    _moved_from: Dict[int, str] = field(default_factory=dict, init=False, repr=False)
+    _pending: Set[str] = field(default_factory=set, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.root = Path(self.root).resolve()
+        if self.sink is None:
+            self.sink = dispatch_leaps
+
+    # -- inotify mode -------------------------------------------------------
+
+    def _watch_tree(self, inotify: _Inotify, top: str) -> None:
+        """Add watches for *top* and every directory below it."""
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            try:
+                wd = inotify.add_watch(directory, _WATCH_MASK)
+            except OSError:
+                continue
+            self._watches[wd] = directory
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.name not in self.excludes and entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+            except OSError:
+                continue
+
+    def _queue_file(self, path: str) -> None:
+        if path.endswith(self.suffixes):
+            self._pending.add(path)
+
+    def _queue_tree(self, top: str) -> None:
+        """Queue every candidate script below a directory that was moved in."""
+        for record in scan_tree(Path(top), suffixes=self.suffixes, excludes=self.excludes):
+            self._pending.add(record.path)
+
+    def _handle_event(self, inotify: _Inotify, wd: int, mask: int, cookie: int, name: str) -> None:
+        if mask & IN_Q_OVERFLOW:
+            # Events were dropped; fall back to a full rescan of the tree.
+            self._queue_tree(str(self.root))
+            return
+        directory = self._watches.get(wd)
+        if mask & IN_IGNORED:
+            self._watches.pop(wd, None)
+            return
+        if directory is None or not name:
+            return
+        path = os.path.join(directory, name)
+        if mask & IN_MOVED_FROM:
+            self._moved_from[cookie] = directory
+        elif mask & IN_MOVED_TO:
+            old_dir = self._moved_from.pop(cookie, None)
+            if mask & IN_ISDIR:
+                self._watch_tree(inotify, path)
+                self._queue_tree(path)
+            elif old_dir != directory:
+                # Unpaired MOVED_TO means the file came from outside the tree.
+                self._queue_file(path)
+        elif mask & IN_CREATE and mask & IN_ISDIR:
+            self._watch_tree(inotify, path)
+
+    def _run_inotify(self, stop_after: Optional[float]) -> None:
+        inotify = _Inotify()
+        try:
+            self._watch_tree(inotify, str(self.root))
+            deadline = None if stop_after is None else time.monotonic() + stop_after
+            while deadline is None or time.monotonic() < deadline:
+                timeout = self.debounce if self._pending else 1.0
+                if deadline is not None:
+                    timeout = max(0.0, min(timeout, deadline - time.monotonic()))
+                events = inotify.read_events(timeout)
+                for event in events:
+                    self._handle_event(inotify, *event)
+                if self._pending and (not events or len(self._pending) >= self.max_batch):
+                    self.flush()
+            self.flush()
+        finally:
+            inotify.close()
+
+    # -- polling fallback ---------------------------------------------------
+
+    def _run_polling(self, stop_after: Optional[float]) -> None:
+        deadline = None if stop_after is None else time.monotonic() + stop_after
+        while True:
+            self._queue_tree(str(self.root))
+            self.flush()
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            time.sleep(self.poll_interval)
+
+    # -- shared -------------------------------------------------------------
+
+    def flush(self) -> List[LeapRecord]:
+        """Update tags for all pending scripts and pass the real leaps to the sink."""
+        pending, self._pending = self._pending, set()
+        # Moves out of the tree never get a matching MOVED_TO.
+        self._moved_from.clear()
+        batch: List[LeapRecord] = []
+        for path in sorted(pending):
+            current = os.path.dirname(path)
+            try:
+                # Scripts that never imported filestate carry no tag and are left alone.
+                if filestate._peek_origin(path) in (None, current):
+                    continue
+                origin, written = filestate._update_origin(Path(path), current)
+            except OSError:
+                continue
+            # A concurrent import of the script may already have fixed the tag.
+            if written and origin is not None:
+                batch.append(LeapRecord(path=path, origin=origin, current=current, fixed=True))
+        if batch and self.sink is not None:
+            self.sink(batch)
+        return batch
+
+    def run(self, stop_after: Optional[float] = None, polling: bool = False) -> None:
+        """Watch until interrupted (or for *stop_after* seconds)."""
+        if not polling:
+            try:
+                self._run_inotify(stop_after)
+                return
+            except InotifyUnavailable:
+                pass
+        self._run_polling(stop_after)
+
+
+def dispatch_leaps(batch: List[LeapRecord]) -> None:
+    """Default sink: hand every leap in *batch* to the configured leap handler."""
+    for record in batch:
+        filestate._on_leap(Path(record.path), record.origin, record.current)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "root",
+        nargs="?",
+        default=".",
+        type=Path,
+        help="directory to watch (defaults to current working directory)",
+    )
+    parser.add_argument(
+        "--mode",
+        default=None,
+        help="leap handler mode (overrides FILESTATE_LEAP_MODE)",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=0.25,
+        help="seconds of quiet before a batch of moves is handled",
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="force the scan-based polling fallback",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=5.0,
+        help="seconds between rescans in polling mode",
+    )
+    args = parser.parse_args(argv)
+
+    if args.mode:
+        os.environ[filestate.LEAP_MODE_ENV] = args.mode
+
+    watcher = LeapWatcher(args.root, debounce=args.debounce, poll_interval=args.poll_interval)
+    try:
+        watcher.run(polling=args.poll)
+    except KeyboardInterrupt:
+        watcher.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())